@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+benchmark_chat_answers.py
+Time-to-first-token and total latency of streamed chat answers
+
+By default runs AnswerGenerator against the mock Ollama server (started
+in-process with simulated model latency), once cold and once from the
+answer cache. With --server it instead measures the /api/chat/answer SSE
+endpoint of a running camera server.
+
+Usage:
+    python benchmark_chat_answers.py
+    python benchmark_chat_answers.py --first-token-delay 0.4 --token-delay 0.03 --runs 20
+    python benchmark_chat_answers.py --ollama-url http://localhost:11434 --model gemma3:4b
+    python benchmark_chat_answers.py --server http://localhost:5000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import requests
+
+from chat_answerer import AnswerGenerator
+from mock_ollama_server import start_mock_server
+
+QUESTIONS = [
+    "Was a package delivered?",
+    "Did anyone walk past the front door?",
+    "Were there any vehicles in the driveway?",
+    "Was there an animal in the yard?",
+    "Did someone ride a bicycle past?",
+]
+
+SAMPLE_SOURCES = [
+    {'camera_id': 0, 'interval': 'minute', 'timestamp': '2026-01-01T09:00:00',
+     'summary': 'A courier carried a box to the front door and left it on the step.'},
+    {'camera_id': 0, 'interval': '5_minutes', 'timestamp': '2026-01-01T09:05:00',
+     'summary': 'A person walked past the front door with a dog.'},
+    {'camera_id': 1, 'interval': 'minute', 'timestamp': '2026-01-01T09:02:00',
+     'summary': 'A van parked in the driveway for two minutes.'},
+    {'camera_id': 2, 'interval': '10_minutes', 'timestamp': '2026-01-01T09:10:00',
+     'summary': 'A cyclist rode along the street. No other activity.'},
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, samples):
+    if not samples:
+        print(f"{label}: no samples")
+        return
+    first = [s['first_token_ms'] for s in samples]
+    total = [s['total_ms'] for s in samples]
+    print(f"{label} ({len(samples)} runs)")
+    print(f"  first token  p50 {statistics.median(first):8.1f} ms   p95 {percentile(first, 95):8.1f} ms")
+    print(f"  full answer  p50 {statistics.median(total):8.1f} ms   p95 {percentile(total, 95):8.1f} ms")
+
+
+def bench_generator(generator, runs):
+    cold, warm = [], []
+    for run in range(runs):
+        question = f"{QUESTIONS[run % len(QUESTIONS)]} (run {run})"
+        for samples in (cold, warm):
+            stats = {}
+            for _ in generator.stream_answer(question, SAMPLE_SOURCES, stats):
+                pass
+            samples.append(stats)
+    report("Cold (model call)", cold)
+    report("Warm (answer cache)", warm)
+    print(f"  cache: {generator.stats()}")
+
+
+def bench_server(server_url, runs):
+    samples = []
+    for run in range(runs):
+        question = QUESTIONS[run % len(QUESTIONS)]
+        started = time.time()
+        first_token = None
+        with requests.post(f"{server_url}/api/chat/answer", json={'query': question}, stream=True, timeout=120) as response:
+            if response.status_code != 200:
+                print(f"✗ {response.status_code}: {response.text}")
+                return
+            event = None
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if line.startswith('event: '):
+                    event = line[len('event: '):]
+                elif line.startswith('data: ') and event == 'token' and first_token is None:
+                    first_token = time.time()
+                elif line.startswith('data: ') and event == 'error':
+                    print(f"✗ {json.loads(line[len('data: '):])}")
+        finished = time.time()
+        samples.append({
+            'first_token_ms': ((first_token or finished) - started) * 1000,
+            'total_ms': (finished - started) * 1000
+        })
+    report(f"{server_url}/api/chat/answer", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streamed chat answer latency')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--ollama-url', help='Benchmark a real Ollama instead of the mock server')
+    parser.add_argument('--model', default='gemma3:4b')
+    parser.add_argument('--server', help='Benchmark a running camera server SSE endpoint instead')
+    parser.add_argument('--first-token-delay', type=float, default=0.25, help='Mock model latency before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='Mock model latency per token')
+    args = parser.parse_args()
+
+    if args.server:
+        bench_server(args.server.rstrip('/'), args.runs)
+        return
+
+    ollama_url = args.ollama_url
+    if not ollama_url:
+        server, ollama_url = start_mock_server(first_token_delay=args.first_token_delay, token_delay=args.token_delay)
+        print(f"✓ Mock Ollama server at {ollama_url}")
+
+    bench_generator(AnswerGenerator(ollama_url, args.model), args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+camera_registry.py
+In-memory camera configuration, reloaded when cameras.json changes
+
+The file is parsed once and served from memory. A watcher thread stats it
+every `check_interval`; when its mtime or size changed it is re-parsed and
+diffed against the previous configuration, and listeners receive the
+cameras that were added, removed or changed (with the changed keys) so
+only those cameras' pipelines are started, stopped or restarted.
+
+Cameras are identified like everywhere else in camera_server: by their
+'id' field, or their position in the file when they have none. Without
+explicit ids, removing a camera from the middle of the list shifts the
+cameras after it, which then show up as changed.
+
+A file that fails to parse (an editor's partial write) is ignored until the
+next change; the previous configuration stays in effect.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_CAMERAS_FILE = '/Users/vibhorkashyap/Documents/code/cameras.json'
+
+
+def camera_diff(old: Dict[int, Dict], new: Dict[int, Dict]) -> Dict:
+    """
+    Differences between two {camera_id: config} maps
+
+    Returns:
+        {'added': {id: config}, 'removed': {id: config},
+         'changed': {id: {'old': config, 'new': config, 'keys': [changed keys]}}}
+    """
+    changed = {}
+    for camera_id in old.keys() & new.keys():
+        keys = sorted(key for key in old[camera_id].keys() | new[camera_id].keys()
+                      if old[camera_id].get(key) != new[camera_id].get(key))
+        if keys:
+            changed[camera_id] = {'old': old[camera_id], 'new': new[camera_id], 'keys': keys}
+    return {
+        'added': {camera_id: new[camera_id] for camera_id in new.keys() - old.keys()},
+        'removed': {camera_id: old[camera_id] for camera_id in old.keys() - new.keys()},
+        'changed': changed,
+    }
+
+
+class CameraRegistry:
+    """Parsed cameras.json shared by the API, the stream supervisor and the capture services"""
+
+    def __init__(self, path: str = DEFAULT_CAMERAS_FILE, check_interval: float = 2.0):
+        """
+        Initialize camera registry (the file is loaded immediately)
+
+        Args:
+            path: Camera configuration file (JSON list of camera objects)
+            check_interval: Seconds between mtime checks of the watcher thread
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.signature = None
+        self.config: List[Dict] = []
+        self.by_id: Dict[int, Dict] = {}
+        self.loaded_at = None
+        self.reloads = 0
+        self.last_error = None
+        self.thread = None
+
+        # Callables invoked as listener(diff) from the watcher thread after a reload
+        self.listeners: List[Callable[[Dict], None]] = []
+
+        self.reload()
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def reload(self) -> Optional[Dict]:
+        """Re-read the file if it changed; returns the diff, or None if nothing changed"""
+        signature = self._signature()
+        if signature == self.signature:
+            return None
+
+        if signature is None:
+            config = []  # File removed: no cameras, same as load_cameras() always did
+        else:
+            try:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+                if not isinstance(config, list):
+                    raise ValueError('expected a JSON list of cameras')
+            except (OSError, ValueError) as e:
+                # Most likely caught mid-write; try again when the file changes next
+                self.signature = signature
+                self.last_error = str(e)
+                print(f"⚠️  Ignoring invalid {self.path}: {e}")
+                return None
+
+        by_id = {camera.get('id', idx): camera for idx, camera in enumerate(config)}
+        with self.lock:
+            diff = camera_diff(self.by_id, by_id)
+            first_load = self.loaded_at is None
+            self.signature = signature
+            self.config = config
+            self.by_id = by_id
+            self.loaded_at = time.time()
+            self.last_error = None
+            if not first_load:
+                self.reloads += 1
+
+        if first_load or not any(diff.values()):
+            return None
+        print(f"✓ Reloaded {self.path}: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+              f"{len(diff['changed'])} changed")
+        return diff
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                diff = self.reload()
+            except Exception as e:
+                print(f"⚠️  Camera config reload failed: {e}")
+                continue
+            if diff is None:
+                continue
+            for listener in self.listeners:
+                try:
+                    listener(diff)
+                except Exception as e:
+                    print(f"Error in camera config listener: {e}")
+
+    def start(self):
+        """Start watching the file for changes"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._watch_loop, daemon=True)
+            self.thread.start()
+
+    def cameras(self) -> List[Dict]:
+        """Camera configs in file order (copies; callers may add keys)"""
+        with self.lock:
+            return [dict(camera) for camera in self.config]
+
+    def items(self) -> List[Tuple[int, Dict]]:
+        """(camera_id, config copy) in file order"""
+        with self.lock:
+            return [(camera_id, dict(camera)) for camera_id, camera in self.by_id.items()]
+
+    def get(self, camera_id: int) -> Optional[Dict]:
+        with self.lock:
+            camera = self.by_id.get(camera_id)
+            return dict(camera) if camera is not None else None
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'path': self.path,
+                'cameras': len(self.config),
+                'loaded_at': self.loaded_at,
+                'reloads': self.reloads,
+                'last_error': self.last_error,
+                'watching': self.thread is not None,
+            }
@@ -4,12 +4,15 @@ camera_server.py
 Flask server with HLS streaming support for camera grid display
 """
 
-from flask import Flask, render_template, jsonify, send_file, request
+from flask import Flask, render_template, jsonify, send_file, request, Response, stream_with_context
+import fcntl
 import json
 import os
+import shutil
 import subprocess
 import threading
 import time
+from collections import deque
 from datetime import datetime
 import cv2
 
@@ -45,6 +48,49 @@ except ImportError:
     OLLAMA_FRAME_CAPTURE_AVAILABLE = False
     print("Warning: OllamaFrameCaptureService not available")
 
+# Import semantic index (local embeddings + NumPy vector search)
+try:
+    from semantic_index import SemanticIndex, EmbeddingClient
+    SEMANTIC_INDEX_AVAILABLE = True
+except ImportError:
+    SEMANTIC_INDEX_AVAILABLE = False
+    print("Warning: SemanticIndex not available")
+
+# Import answer generator (streamed RAG answers via Ollama)
+try:
+    from chat_answerer import AnswerGenerator
+    ANSWER_GENERATOR_AVAILABLE = True
+except ImportError:
+    ANSWER_GENERATOR_AVAILABLE = False
+    print("Warning: AnswerGenerator not available")
+
+# Import analytics store (structured summary fields in SQLite)
+try:
+    from summary_analytics import SummaryAnalyticsStore, METRICS, AGGREGATES, BUCKETS
+    ANALYTICS_AVAILABLE = True
+except ImportError:
+    ANALYTICS_AVAILABLE = False
+    print("Warning: SummaryAnalyticsStore not available")
+
+from stream_probe import CodecProbeCache, choose_encoding, describe_decision
+from hls_ladder import LOW_VARIANT_DIR, low_variant_args, full_variant, write_master_playlist
+from llhls_packager import LL_DIR, LLHLSPackager, playlist_live_edge, playlist_position, part_position, wait_for_playlist
+from stream_supervisor import StreamSupervisor
+from camera_registry import CameraRegistry
+from ffmpeg_telemetry import IngestTelemetry, STATS_PERIOD
+from segment_cache import SegmentCache
+from dvr_archive import DVRArchive, parse_program_date_time
+from snapshot_cache import SnapshotCache, SNAPSHOT_SIZES
+from mosaic_stream import MOSAIC_DIR, MosaicStream
+from stream_stats import StreamStats
+from metrics import REGISTRY, CONTENT_TYPE, HLS_REQUESTS, HLS_SEGMENT_AGE, merge_exposition
+from tracing import TRACER, filter_traces, chrome_trace
+from memory_report import process_memory, tracemalloc_top, unaccounted_bytes
+from shared_state import SharedState
+from summary_store import SummaryLogStore, encode_cursor, decode_cursor, since_key
+from query_cache import QueryCache
+from timeline_index import TimelineIndex, EVENT_TYPES
+
 app = Flask(__name__)
 
 # Configuration
@@ -53,72 +99,201 @@ HLS_DIR = '/Users/vibhorkashyap/Documents/code/hls_streams'
 CLIPS_DIR = '/Users/vibhorkashyap/Documents/code/clips'
 SUMMARIES_DIR = '/Users/vibhorkashyap/Documents/code/video_summaries'
 OLLAMA_SUMMARIES_DIR = '/Users/vibhorkashyap/Documents/code/ollama_video_summaries'
+EMBEDDINGS_DIR = '/Users/vibhorkashyap/Documents/code/summary_embeddings'
+EMBEDDING_MODEL = 'nomic-embed-text'
+ANALYTICS_DB = '/Users/vibhorkashyap/Documents/code/summary_analytics/analytics.db'
+SHARED_STATE_DB = '/Users/vibhorkashyap/Documents/code/shared_state/state.db'
+DVR_DIR = '/Users/vibhorkashyap/Documents/code/dvr_archive'
+HYBRID_SEMANTIC_WEIGHT = 0.6  # Blend of semantic vs keyword score in hybrid search
 FFMPEG_PROCESSES = {}
+# 'all' (one process does everything), 'ingest' (streams and analysis, see
+# ingest_daemon.py) or 'api' (HTTP only, reads the ingest daemon's SHARED_STATE)
+SERVICES_ROLE = os.environ.get('CAMERA_SERVER_ROLE', 'all')
+STATE_PUBLISH_INTERVAL = 2  # Seconds between stream state publishes in the ingest role
+MEMORY_PUBLISH_INTERVAL = 60  # Seconds between memory reports published in the ingest role
+SHARED_STATE = None  # Will be initialized on startup (ingest/api roles)
+HLS_VIDEO_MODE = os.environ.get('HLS_VIDEO_MODE', 'auto')  # 'auto' (copy when browser-compatible), 'copy', 'transcode'
+HLS_ABR = os.environ.get('HLS_ABR', '0') == '1'  # Add a low-resolution rendition + master playlist per camera
+HLS_LOW_LATENCY = os.environ.get('HLS_LOW_LATENCY', '0') == '1'  # Also package an LL-HLS (fMP4 parts) rendition
+LLHLS_PART_TARGET = 0.5  # Seconds per LL-HLS part
+LLHLS_PACKAGERS = {}  # camera_id -> LLHLSPackager fed by that camera's ffmpeg
+STREAM_SUPERVISOR = None  # Will be initialized on startup (restarts exited/stalled ffmpeg)
+CAMERA_REGISTRY = CameraRegistry(CAMERAS_FILE)  # Parsed cameras.json, reloaded when the file changes
+STREAM_CONFIG_KEYS = {'rtsp_url', 'substream_url'}  # Camera fields that need an ffmpeg restart when edited
+HLS_CACHE = SegmentCache()  # Live playlists/segments shared by every viewer
+SNAPSHOT_CACHE = SnapshotCache(HLS_DIR)  # Latest decoded frame + JPEGs per camera
+STREAM_STATS = StreamStats(HLS_DIR)  # Segment counts/sizes kept up to date from playlist changes
+HLS_DVR = os.environ.get('HLS_DVR', '0') == '1'  # Archive live segments for time-indexed VOD playback
+DVR_MAX_BYTES_PER_CAMERA = int(float(os.environ.get('DVR_MAX_GB_PER_CAMERA', '20')) * 1024 ** 3)
+DVR_ARCHIVE = None  # Will be initialized on startup when HLS_DVR is enabled
+HLS_MOSAIC = os.environ.get('HLS_MOSAIC', '0') == '1'  # Composite all cameras into one grid stream
+MOSAIC_THRESHOLD = int(os.environ.get('MOSAIC_THRESHOLD', '9'))  # Dashboard plays the mosaic above this many cameras
+MOSAIC_STREAM = None  # Will be initialized on startup when HLS_MOSAIC is enabled
+TRACER.sample_rate = float(os.environ.get('TRACE_SAMPLE_RATE', '0.1'))  # Fraction of capture traces kept
+TRACER.slow_threshold = float(os.environ.get('TRACE_SLOW_SECONDS', '30'))  # Slower traces are always kept
+INGEST_TELEMETRY = IngestTelemetry()  # ffmpeg -progress snapshots per camera
+STREAM_ENCODINGS = {}  # camera_id -> encoding decision used for its ffmpeg process
 VIDEO_SUMMARIZER = None  # Will be initialized on startup (OpenAI)
 OLLAMA_SUMMARIZER = None  # Will be initialized on startup (Gemma 3:4b)
 FRAME_CAPTURE_SERVICE = None  # Will be initialized on startup (OpenAI)
 OLLAMA_FRAME_CAPTURE_SERVICE = None  # Will be initialized on startup (Ollama)
 MOTION_MANAGER = None
 ANALYZER = None
+SEMANTIC_INDEX = None  # Will be initialized on startup (embeddings via Ollama)
+CHAT_CACHE = QueryCache(max_entries=256)  # /api/chat results, invalidated per camera
+ANSWER_GENERATOR = None  # Will be initialized on startup (answers via Ollama)
+ANALYTICS_STORE = None  # Will be initialized on startup (structured summary fields)
 
 # Create HLS directory if it doesn't exist
 os.makedirs(HLS_DIR, exist_ok=True)
 
+# Held by the one process that runs start_services() (see gunicorn.conf.py)
+STARTUP_LOCK_FILE = os.path.join(HLS_DIR, '.startup.lock')
+STARTUP_LOCK = None
+STARTUP_MUTEX = threading.Lock()
+
+# ffprobe results per stream URL, reused across restarts
+CODEC_CACHE = CodecProbeCache(os.path.join(HLS_DIR, 'codec_cache.json'))
+
+# Append-only Ollama summary log (written by OllamaSummarizer)
+OLLAMA_SUMMARY_STORE = SummaryLogStore(OLLAMA_SUMMARIES_DIR)
+TIMELINE_INDEX = TimelineIndex(OLLAMA_SUMMARY_STORE, CLIPS_DIR)  # Clips, analyses and summaries by time
+
 def load_cameras():
-    """Load camera data from JSON file"""
-    if os.path.exists(CAMERAS_FILE):
-        with open(CAMERAS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    """Camera configs from CAMERA_REGISTRY (cameras.json, re-parsed only when it changes)"""
+    return CAMERA_REGISTRY.cameras()
 
 
-def start_hls_stream(camera_id, rtsp_url):
-    """Start ffmpeg process to convert RTSP to HLS"""
+def hls_output_args(playlist_path):
+    """HLS muxer options shared by every rendition"""
+    # Increased buffer to keep more segments available, ensuring longer LIVE status
+    return [
+        '-f', 'hls',
+        '-hls_time', '3',  # Increased to 3 seconds per segment (more stable)
+        '-hls_list_size', '15',  # Keep 15 segments (45 seconds total buffer)
+        '-hls_init_time', '3',  # Initial segment time
+        '-hls_flags', 'delete_segments+append_list+program_date_time+independent_segments',
+        '-hls_segment_type', 'mpegts',
+        '-start_number', '0',
+        playlist_path
+    ]
+
+
+def full_output_args(playlist_path):
+    """
+    Output arguments for the full rendition
+    
+    In low-latency mode the tee muxer writes the same packets both to the
+    regular HLS output (used by frame capture) and as fragmented MP4 to
+    stdout for the LL-HLS packager, so the stream is still encoded once.
+    """
+    if not HLS_LOW_LATENCY:
+        return hls_output_args(playlist_path)
+    
+    hls_args = hls_output_args(playlist_path)[:-1]
+    hls_options = ':'.join(f'{hls_args[i].lstrip("-")}={hls_args[i + 1]}' for i in range(0, len(hls_args), 2))
+    # Fragments every part target (and on keyframes) so parts don't depend on the GOP length
+    fmp4_options = ':'.join([
+        'f=mp4',
+        'movflags=empty_moov+default_base_moof+frag_keyframe',
+        f'frag_duration={int(LLHLS_PART_TARGET * 1_000_000)}',
+    ])
+    return ['-f', 'tee', f'[{hls_options}]{playlist_path}|[{fmp4_options}]pipe:1']
+
+
+def start_hls_stream(camera_id, rtsp_url, substream_url=None):
+    """
+    Start ffmpeg process to convert RTSP to HLS
+    
+    With HLS_ABR enabled the same process also writes a low-resolution
+    rendition (from the camera substream when given) plus master.m3u8.
+    """
     stream_dir = os.path.join(HLS_DIR, f'stream_{camera_id}')
     os.makedirs(stream_dir, exist_ok=True)
     
     playlist_path = os.path.join(stream_dir, 'playlist.m3u8')
     
-    # Clean up old files before starting
+    # Clean up old files before starting (the rotated ffmpeg log survives restarts)
     for f in os.listdir(stream_dir):
+        if f.startswith('ffmpeg.log'):
+            continue
+        path = os.path.join(stream_dir, f)
         try:
-            os.remove(os.path.join(stream_dir, f))
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
         except:
             pass
     
+    # Copy browser-compatible H.264 straight through; transcode only when needed
+    info = CODEC_CACHE.get(rtsp_url) if HLS_VIDEO_MODE == 'auto' else None
+    encoding = choose_encoding(info, HLS_VIDEO_MODE)
+    STREAM_ENCODINGS[camera_id] = {k: v for k, v in encoding.items() if not k.endswith('_args')}
+    STREAM_ENCODINGS[camera_id]['source'] = info
+    print(f"✓ {describe_decision(camera_id, info, encoding)}")
+    
     # FFmpeg command to convert RTSP to HLS with optimized real-time settings
-    # Increased buffer to keep more segments available, ensuring longer LIVE status
+    # (with -c:v copy, segments are cut on the camera's own keyframes)
+    # Machine-readable progress goes to its own pipe; -nostats keeps the
+    # status line out of the log
+    progress_read, progress_write = os.pipe()
     cmd = [
         'ffmpeg',
+        '-nostats',
+        '-progress', f'pipe:{progress_write}',
+        '-stats_period', str(STATS_PERIOD),
         '-rtsp_transport', 'tcp',
         '-i', rtsp_url,
-        '-c:v', 'libx264',
-        '-preset', 'ultrafast',
-        '-b:v', '1200k',
-        '-maxrate', '1500k',
-        '-bufsize', '2000k',
-        '-g', '20',  # GOP size = 20 frames for better segment boundaries
-        '-c:a', 'aac',
-        '-b:a', '128k',
-        '-f', 'hls',
-        '-hls_time', '3',  # Increased to 3 seconds per segment (more stable)
-        '-hls_list_size', '15',  # Keep 15 segments (45 seconds total buffer)
-        '-hls_init_time', '3',  # Initial segment time
-        '-hls_flags', 'delete_segments+append_list+program_date_time+independent_segments',
-        '-hls_segment_type', 'mpegts',
-        '-start_number', '0',
-        playlist_path
     ]
     
+    if HLS_ABR:
+        sub_info = CODEC_CACHE.get(substream_url) if substream_url else None
+        low_inputs, low_output, low = low_variant_args(info, substream_url, sub_info, encoding['audio_args'])
+        low_dir = os.path.join(stream_dir, LOW_VARIANT_DIR)
+        os.makedirs(low_dir, exist_ok=True)
+        
+        # Explicit maps: with a substream input ffmpeg would otherwise pick streams itself
+        cmd += low_inputs
+        cmd += ['-map', '0:v:0', '-map', '0:a:0?', *encoding['video_args'], *encoding['audio_args']]
+        cmd += full_output_args(playlist_path)
+        cmd += low_output + hls_output_args(os.path.join(low_dir, 'playlist.m3u8'))
+        
+        write_master_playlist(stream_dir, full_variant(info, encoding), low)
+        STREAM_ENCODINGS[camera_id]['low_variant'] = low
+        print(f"✓ Camera {camera_id}: ABR ladder with {low['source']} low rendition")
+    else:
+        if HLS_LOW_LATENCY:
+            # The tee muxer only sees explicitly mapped streams
+            cmd += ['-map', '0:v:0', '-map', '0:a:0?']
+        cmd += [*encoding['video_args'], *encoding['audio_args']]
+        cmd += full_output_args(playlist_path)
+    
     try:
-        logfile = open(os.path.join(stream_dir, 'ffmpeg.log'), 'w')
         process = subprocess.Popen(
             cmd,
-            stdout=logfile,
-            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE if HLS_LOW_LATENCY else subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            pass_fds=(progress_write,),
             preexec_fn=os.setsid
         )
+    except Exception as e:
+        os.close(progress_read)
+        print(f"✗ Failed to start HLS stream for camera {camera_id}: {e}")
+        return False
+    finally:
+        os.close(progress_write)  # ffmpeg holds its own copy
+    
+    try:
         FFMPEG_PROCESSES[camera_id] = process
+        INGEST_TELEMETRY.attach(camera_id, os.fdopen(progress_read, 'r'), process.stderr,
+                                os.path.join(stream_dir, 'ffmpeg.log'))
+        
+        if HLS_LOW_LATENCY:
+            packager = LLHLSPackager(stream_dir, part_target=LLHLS_PART_TARGET)
+            packager.start(process.stdout)
+            LLHLS_PACKAGERS[camera_id] = packager
+            print(f"✓ Camera {camera_id}: LL-HLS parts every {LLHLS_PART_TARGET}s")
         print(f"✓ Started HLS stream for camera {camera_id}")
         return True
     except Exception as e:
@@ -126,24 +301,71 @@ def start_hls_stream(camera_id, rtsp_url):
         return False
 
 
+def mosaic_input_playlist(camera_id):
+    """Playlist the mosaic reads for a camera: the low rendition in ABR mode (already tile-sized)"""
+    stream_dir = os.path.join(HLS_DIR, f'stream_{camera_id}')
+    if HLS_ABR:
+        return os.path.join(stream_dir, LOW_VARIANT_DIR, 'playlist.m3u8')
+    return os.path.join(stream_dir, 'playlist.m3u8')
+
+
 def stop_hls_stream(camera_id):
     """Stop ffmpeg process for a camera"""
     if camera_id in FFMPEG_PROCESSES:
         try:
-            process = FFMPEG_PROCESSES[camera_id]
-            os.killpg(os.getpgid(process.pid), 15)
-            del FFMPEG_PROCESSES[camera_id]
+            process = FFMPEG_PROCESSES.pop(camera_id)
+            if process.poll() is None:
+                os.killpg(os.getpgid(process.pid), 15)
+                try:
+                    process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    os.killpg(os.getpgid(process.pid), 9)
+                    process.wait()
+            packager = LLHLS_PACKAGERS.pop(camera_id, None)
+            if packager:
+                packager.stop()
             print(f"✓ Stopped HLS stream for camera {camera_id}")
         except Exception as e:
             print(f"✗ Failed to stop HLS stream: {e}")
 
 
 def init_streams():
-    """Initialize HLS streams for all cameras"""
-    cameras = load_cameras()
-    for idx, camera in enumerate(cameras):
-        start_hls_stream(idx, camera['rtsp_url'])
-        time.sleep(1)  # Small delay between starting streams
+    """Start HLS streams for all cameras in parallel under the stream supervisor"""
+    global STREAM_SUPERVISOR
+    STREAM_SUPERVISOR = StreamSupervisor(start_hls_stream, stop_hls_stream, FFMPEG_PROCESSES, HLS_DIR)
+    STREAM_SUPERVISOR.start_all(load_cameras())
+
+
+def apply_camera_changes(diff):
+    """
+    Follow a cameras.json reload in the ingest process
+    
+    Removed cameras have their stream stopped and their buffered frames
+    dropped; cameras whose stream URLs changed are restarted; added cameras
+    are started. Cameras with other edits (name, ...) keep running: the
+    capture services read names from CAMERA_REGISTRY on every cycle. The
+    mosaic and the DVR archive follow FFMPEG_PROCESSES on their own.
+    """
+    restart = {camera_id: change['new'] for camera_id, change in diff['changed'].items()
+               if STREAM_CONFIG_KEYS & set(change['keys'])}
+    start = {**diff['added'], **restart}
+    
+    if STREAM_SUPERVISOR:
+        for camera_id in list(diff['removed']) + list(restart):
+            STREAM_SUPERVISOR.remove_camera(camera_id)
+        for camera_id, camera in start.items():
+            threading.Thread(target=STREAM_SUPERVISOR.add_camera, args=(camera_id, camera), daemon=True).start()
+    
+    for camera_id in diff['removed']:
+        STREAM_ENCODINGS.pop(camera_id, None)
+        INGEST_TELEMETRY.forget(camera_id)
+        for summarizer in (OLLAMA_SUMMARIZER, VIDEO_SUMMARIZER):
+            if summarizer:
+                summarizer.drop_frames(camera_id)
+    
+    if MOTION_MANAGER:
+        MOTION_MANAGER.cameras_config = CAMERA_REGISTRY.cameras()
+        MOTION_MANAGER.apply_camera_changes(diff)
 
 
 @app.route('/')
@@ -158,6 +380,20 @@ def chat_page():
     return render_template('chat.html')
 
 
+def add_hls_urls(camera, camera_id):
+    """Full-rendition playlist and snapshot, plus master and low-rendition playlists in ABR mode"""
+    camera['hls_url'] = f'/hls/stream_{camera_id}/playlist.m3u8'
+    camera['snapshot_url'] = f'/api/cameras/{camera_id}/snapshot'
+    if HLS_ABR:
+        camera['hls_master_url'] = f'/hls/stream_{camera_id}/master.m3u8'
+        camera['hls_low_url'] = f'/hls/stream_{camera_id}/{LOW_VARIANT_DIR}/playlist.m3u8'
+    if HLS_LOW_LATENCY:
+        camera['hls_ll_url'] = f'/hls/stream_{camera_id}/{LL_DIR}/playlist.m3u8'
+    if HLS_DVR:
+        camera['dvr_url'] = f'/api/dvr/{camera_id}'
+    return camera
+
+
 @app.route('/api/cameras')
 def get_cameras():
     """API endpoint to get all cameras with HLS stream URLs"""
@@ -165,7 +401,7 @@ def get_cameras():
     
     # Add HLS stream URLs
     for idx, camera in enumerate(cameras):
-        camera['hls_url'] = f'/hls/stream_{idx}/playlist.m3u8'
+        add_hls_urls(camera, camera.get('id', idx))
     
     return jsonify(cameras)
 
@@ -173,73 +409,689 @@ def get_cameras():
 @app.route('/api/cameras/<int:camera_id>')
 def get_camera(camera_id):
     """API endpoint to get specific camera"""
-    cameras = load_cameras()
-    if camera_id < len(cameras):
-        camera = cameras[camera_id]
-        camera['hls_url'] = f'/hls/stream_{camera_id}/playlist.m3u8'
+    camera = CAMERA_REGISTRY.get(camera_id)
+    if camera is not None:
+        add_hls_urls(camera, camera_id)
         return jsonify(camera)
     return jsonify({"error": "Camera not found"}), 404
 
 
+def ingest_document(key, local):
+    """
+    State owned by the ingest side: computed in this process, or read from
+    SHARED_STATE (as last published by the ingest daemon) in the api role
+    """
+    if SERVICES_ROLE == 'api':
+        value, _ = SHARED_STATE.get(key) if SHARED_STATE else (None, None)
+        return value
+    return local()
+
+
+def publish_ingest_state():
+    """Publish stream state to SHARED_STATE for API workers (ingest role)"""
+    traces_published = None
+    memory_published = 0
+    while True:
+        try:
+            documents = {
+                'streams.encoding': STREAM_ENCODINGS,
+                'streams.telemetry': INGEST_TELEMETRY.summary(),
+            }
+            if STREAM_SUPERVISOR:
+                documents['streams.health'] = STREAM_SUPERVISOR.stats()
+            if MOSAIC_STREAM:
+                documents['streams.mosaic'] = MOSAIC_STREAM.stats()
+            for camera_id in list(INGEST_TELEMETRY.cameras):
+                documents[f'streams.telemetry.{camera_id}'] = INGEST_TELEMETRY.latest(camera_id, history=True)
+            # Frame/motion/LLM counters live here; API workers append them to /metrics
+            documents['metrics'] = REGISTRY.render(collect=False)
+            if TRACER.kept != traces_published:
+                traces_published = TRACER.kept
+                documents['debug.traces'] = recent_traces()
+            if time.time() - memory_published >= MEMORY_PUBLISH_INTERVAL:
+                memory_published = time.time()
+                documents['debug.memory'] = memory_report()
+            SHARED_STATE.put_many(documents)
+        except Exception as e:
+            print(f"⚠️  Publishing ingest state failed: {e}")
+        time.sleep(STATE_PUBLISH_INTERVAL)
+
+
+def ingest_event_listener(kind):
+    """Summary/clip listener that forwards the change to API workers through SHARED_STATE"""
+    def listener(camera_id, record=None, *_):
+        SHARED_STATE.publish(kind, camera_id, record if kind in ('summary', 'video_summary') else None)
+    return listener
+
+
+def apply_ingest_event(event):
+    """Fold a change published by the ingest daemon into this API worker's views"""
+    camera_id, record = event['camera_id'], event['payload']
+    if event['kind'] == 'summary' and OLLAMA_SUMMARIZER:
+        OLLAMA_SUMMARIZER.summaries.append_new(camera_id, record['interval'], record)
+    elif event['kind'] == 'video_summary' and VIDEO_SUMMARIZER:
+        VIDEO_SUMMARIZER.summaries.append_new(camera_id, record['interval'], record)
+    elif event['kind'] == 'indexed' and SEMANTIC_INDEX:
+        SEMANTIC_INDEX.reload(camera_id)
+    CHAT_CACHE.bump(camera_id)
+
+
+@app.route('/api/shared-state')
+def get_shared_state():
+    """Process role and how fresh the ingest daemon's published state is"""
+    result = {'role': SERVICES_ROLE, 'pid': os.getpid(), 'timestamp': datetime.now().isoformat()}
+    if SHARED_STATE:
+        result['shared_state'] = SHARED_STATE.stats()
+    return jsonify(result)
+
+
+def collect_stream_metrics():
+    """Refresh HLS_SEGMENT_AGE from the live playlists (runs on every /metrics scrape)"""
+    live = set()
+    for idx, camera in enumerate(load_cameras()):
+        camera_id = camera.get('id', idx)
+        edge = playlist_live_edge(os.path.join(HLS_DIR, f'stream_{camera_id}', 'playlist.m3u8'))
+        if edge:
+            HLS_SEGMENT_AGE.labels(camera_id).set(edge['edge_age'])
+            live.add(str(camera_id))
+    for (camera,) in list(HLS_SEGMENT_AGE.children):
+        if camera not in live:
+            HLS_SEGMENT_AGE.remove(camera)
+
+
+REGISTRY.on_collect(collect_stream_metrics)
+
+
+@app.route('/metrics')
+def get_metrics():
+    """
+    Prometheus text exposition of the pipeline metrics
+    
+    In the api role the frame, motion, clip and LLM metrics come from the
+    ingest daemon's last published REGISTRY and are merged with this
+    worker's own (HLS requests, segment age).
+    """
+    body = REGISTRY.render()
+    if SERVICES_ROLE == 'api':
+        body = merge_exposition(body, ingest_document('metrics', lambda: '') or '')
+    return Response(body, content_type=CONTENT_TYPE)
+
+
+def recent_traces():
+    return {'tracer': TRACER.stats(), 'traces': TRACER.recent()}
+
+
+@app.route('/api/debug/traces')
+def get_traces():
+    """
+    Recent frame-to-summary traces (sampled, plus every slow one)
+    
+    Query params:
+        limit: Maximum traces, newest first (default 50)
+        min_ms: Only traces at least this long
+        camera_id: Only traces of one camera
+        format: json (default) or chrome (trace-event JSON for chrome://tracing / Perfetto)
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+        min_ms = float(request.args.get('min_ms', 0))
+        camera_id = int(request.args['camera_id']) if request.args.get('camera_id') else None
+    except ValueError:
+        return jsonify({"error": "limit, min_ms and camera_id must be numbers"}), 400
+    
+    recent = ingest_document('debug.traces', recent_traces) or {'tracer': None, 'traces': []}
+    traces = filter_traces(recent['traces'], limit, min_ms, camera_id)
+    if request.args.get('format') == 'chrome':
+        return jsonify(chrome_trace(traces))
+    return jsonify({
+        'traces': traces,
+        'count': len(traces),
+        'tracer': recent['tracer'],
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+def memory_report():
+    """Bytes held by each component of this process, against its RSS"""
+    hls_cache = HLS_CACHE.stats()
+    components = {
+        'snapshot_cache': SNAPSHOT_CACHE.memory_usage(),
+        'hls_cache': {'bytes': hls_cache['bytes'], 'entries': hls_cache['entries']},
+        'chat_cache': {'entries': CHAT_CACHE.stats()['entries']},
+    }
+    if OLLAMA_SUMMARIZER:
+        components['ollama_summarizer'] = OLLAMA_SUMMARIZER.memory_usage()
+    if VIDEO_SUMMARIZER:
+        components['video_summarizer'] = VIDEO_SUMMARIZER.memory_usage()
+    if MOTION_MANAGER:
+        components['motion_detection'] = MOTION_MANAGER.memory_usage()
+    if SEMANTIC_INDEX:
+        components['semantic_index'] = SEMANTIC_INDEX.memory_usage()
+    
+    process = process_memory()
+    accounted = sum(component.get('bytes', 0) for component in components.values())
+    return {
+        'role': SERVICES_ROLE,
+        'pid': os.getpid(),
+        'process': process,
+        'accounted_bytes': accounted,
+        # Interpreter, OpenCV/FFmpeg native buffers and libraries
+        'unaccounted_bytes': unaccounted_bytes(process['rss_bytes'], accounted),
+        'components': components,
+    }
+
+
+@app.route('/api/debug/memory')
+def get_memory():
+    """
+    Memory held by frame buffers, caches and summary stores, against process RSS
+    
+    Query params:
+        top: Also list the N largest tracemalloc allocation sites and the
+            biggest growth since the previous call (needs PYTHONTRACEMALLOC=1)
+    
+    In the api role the ingest daemon's last published report is under 'ingest'.
+    """
+    try:
+        top = int(request.args.get('top', 0))
+    except ValueError:
+        return jsonify({"error": "top must be a number"}), 400
+    
+    result = memory_report()
+    if top > 0:
+        result['tracemalloc'] = tracemalloc_top(top)
+    if SERVICES_ROLE == 'api':
+        result['ingest'] = ingest_document('debug.memory', lambda: None)
+    result['timestamp'] = datetime.now().isoformat()
+    return jsonify(result)
+
+
+@app.route('/api/streams/encoding')
+def get_stream_encodings():
+    """Per-camera codec probe results and the copy/transcode decision"""
+    return jsonify({
+        'mode': HLS_VIDEO_MODE,
+        'cameras': ingest_document('streams.encoding', lambda: STREAM_ENCODINGS) or {},
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@app.route('/api/streams/health')
+def get_stream_health():
+    """Per-camera ffmpeg status, uptime and restart counts from the stream supervisor"""
+    health = ingest_document('streams.health', lambda: STREAM_SUPERVISOR.stats() if STREAM_SUPERVISOR else None)
+    if not health:
+        return jsonify({"error": "Stream supervisor not initialized"}), 503
+    
+    health['timestamp'] = datetime.now().isoformat()
+    return jsonify(health)
+
+
+@app.route('/api/streams/telemetry')
+def get_stream_telemetry():
+    """Latest ffmpeg fps, bitrate, speed and dropped/duplicated frames for every camera"""
+    return jsonify({
+        'stats_period': STATS_PERIOD,
+        'cameras': ingest_document('streams.telemetry', INGEST_TELEMETRY.summary) or {},
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@app.route('/api/mosaic')
+def get_mosaic():
+    """
+    Mosaic stream URL, grid layout (camera per tile) and when the dashboard should use it
+    """
+    result = {
+        'enabled': HLS_MOSAIC,
+        'threshold': MOSAIC_THRESHOLD,
+        'hls_url': f'/hls/{MOSAIC_DIR}/playlist.m3u8',
+        'timestamp': datetime.now().isoformat()
+    }
+    stats = ingest_document('streams.mosaic', lambda: MOSAIC_STREAM.stats() if MOSAIC_STREAM else None)
+    if stats:
+        result.update(stats)
+    else:
+        result['status'] = 'stopped'
+    return jsonify(result)
+
+
+@app.route('/api/streams/<int:camera_id>/telemetry')
+def get_camera_telemetry(camera_id):
+    """Ingest telemetry for one camera with its recent history"""
+    telemetry = ingest_document(f'streams.telemetry.{camera_id}',
+                                lambda: INGEST_TELEMETRY.latest(camera_id, history=True))
+    if telemetry is None:
+        return jsonify({"error": "No telemetry for camera"}), 404
+    return jsonify(telemetry)
+
+
+@app.route('/api/streams/<int:camera_id>/latency')
+def get_stream_latency(camera_id):
+    """
+    Live-edge latency probe for a camera
+    
+    edge_age is how far the newest published media lags wall-clock time;
+    expected_player_latency adds the hold-back a player keeps behind the edge.
+    """
+    stream_dir = os.path.join(HLS_DIR, f'stream_{camera_id}')
+    result = {'camera_id': camera_id, 'low_latency': HLS_LOW_LATENCY}
+    
+    # Read from the playlists themselves so API workers measure the same thing as the ingest process
+    for key, playlist_path in (('hls', os.path.join(stream_dir, 'playlist.m3u8')),
+                               ('ll_hls', os.path.join(stream_dir, LL_DIR, 'playlist.m3u8'))):
+        edge = playlist_live_edge(playlist_path)
+        if edge:
+            # LL-HLS players sit PART-HOLD-BACK behind the edge, others three target durations
+            hold_back = edge['part_hold_back'] or 3 * edge['target_duration']
+            edge['expected_player_latency'] = round(edge['edge_age'] + hold_back, 3)
+            result[key] = edge
+    
+    packager = LLHLS_PACKAGERS.get(camera_id)
+    if packager and 'll_hls' in result:
+        result['ll_hls']['packager'] = packager.stats()
+    
+    if 'hls' not in result and 'll_hls' not in result:
+        return jsonify({"error": "Stream not running"}), 404
+    result['timestamp'] = datetime.now().isoformat()
+    return jsonify(result)
+
+
+def wait_for_ll_hls(stream_id, segment_file):
+    """
+    Blocking playlist reload and preload-hinted part requests for LL-HLS
+    
+    Returns an error response, or None once the requested playlist update
+    or part is available (or the stream is not in low-latency mode).
+    """
+    if not segment_file.startswith(f'{LL_DIR}/'):
+        return None
+    try:
+        packager = LLHLS_PACKAGERS.get(int(stream_id.replace('stream_', '')))
+    except ValueError:
+        return None
+    
+    # Without the packager in this process (api role), poll the playlist it writes
+    playlist_path = os.path.join(HLS_DIR, stream_id, LL_DIR, 'playlist.m3u8')
+    if packager:
+        timeout = 3 * packager.target_duration
+        position = packager.next_position()
+        wait = packager.wait_for
+    elif SERVICES_ROLE == 'api' and os.path.exists(playlist_path):
+        edge = playlist_live_edge(playlist_path)
+        timeout = 3 * (edge['target_duration'] if edge else 2)
+        position = playlist_position(playlist_path)
+        wait = lambda msn, part, timeout: wait_for_playlist(playlist_path, msn, part, timeout)
+    else:
+        return None
+    
+    name = segment_file[len(LL_DIR) + 1:]
+    if name == 'playlist.m3u8' and request.args.get('_HLS_msn') is not None:
+        try:
+            msn = int(request.args['_HLS_msn'])
+            part = int(request.args['_HLS_part']) if request.args.get('_HLS_part') is not None else None
+        except ValueError:
+            return jsonify({"error": "Invalid _HLS_msn/_HLS_part"}), 400
+        # Requests more than two segments ahead of the live edge are client errors
+        if position and msn > position[0] + 2:
+            return jsonify({"error": "_HLS_msn too far in the future"}), 400
+        if not wait(msn, part, timeout):
+            return jsonify({"error": "Playlist update not available in time"}), 503
+    elif name.startswith('part_') and name.endswith('.m4s'):
+        # EXT-X-PRELOAD-HINT parts are requested before they exist
+        hinted = part_position(name)
+        if hinted:
+            wait(*hinted, timeout)
+    return None
+
+
+def cached_hls_response(file_path, mimetype, cache_control):
+    """Response for a live HLS file from HLS_CACHE, honouring If-None-Match and Range"""
+    cached = HLS_CACHE.get(file_path)
+    if cached is None:
+        return None
+    
+    response = Response(cached.data, mimetype=mimetype)
+    response.set_etag(cached.etag)
+    response.last_modified = datetime.fromtimestamp(cached.mtime)
+    response.headers['Cache-Control'] = cache_control
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(cached.data))
+
+
+@app.route('/api/cameras/<int:camera_id>/snapshot')
+def get_camera_snapshot(camera_id):
+    """
+    Latest still from a camera as JPEG, served from SNAPSHOT_CACHE
+    
+    Query params:
+        size: thumb (320px wide), medium (640px, default) or full
+        max_age: Oldest acceptable snapshot in seconds since its segment was
+            published (waits briefly for a newer one)
+    """
+    size = request.args.get('size', 'medium')
+    if size not in SNAPSHOT_SIZES:
+        return jsonify({"error": f"size must be one of {', '.join(SNAPSHOT_SIZES)}"}), 400
+    try:
+        max_age = float(request.args['max_age']) if request.args.get('max_age') else None
+    except ValueError:
+        return jsonify({"error": "max_age must be a number of seconds"}), 400
+    
+    result = SNAPSHOT_CACHE.jpeg(camera_id, size, max_age)
+    if result is None:
+        error = "No snapshot within max_age" if max_age is not None else "No snapshot available"
+        response = jsonify({"error": error, "camera_id": camera_id})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    data, snapshot = result
+    response = Response(data, mimetype='image/jpeg')
+    response.set_etag(f'{snapshot.etag}-{size}')
+    response.last_modified = datetime.fromtimestamp(snapshot.captured_at)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Snapshot-Age'] = f'{snapshot.age():.1f}'
+    return response.make_conditional(request)
+
+
+@app.route('/api/snapshots/stats')
+def get_snapshot_stats():
+    """Decodes, cache hits and per-camera snapshot age of the snapshot cache"""
+    stats = SNAPSHOT_CACHE.stats()
+    stats['timestamp'] = datetime.now().isoformat()
+    return jsonify(stats)
+
+
+@app.route('/api/streams/cache-stats')
+def get_hls_cache_stats():
+    """Hit/miss/coalesced counts of the in-memory HLS segment cache"""
+    stats = HLS_CACHE.stats()
+    stats['timestamp'] = datetime.now().isoformat()
+    return jsonify(stats)
+
+
+def is_hls_stream_id(stream_id):
+    """True for the directories the HLS pipelines write: stream_<camera id> and the mosaic"""
+    if stream_id.startswith('stream_') and stream_id[len('stream_'):].isdigit():
+        return True
+    return stream_id == MOSAIC_DIR
+
+
 @app.route('/hls/<path:filename>')
 def serve_hls(filename):
     """Serve HLS playlist and segments with no-cache headers"""
-    from flask import make_response
-    
     # Extract stream ID
     parts = filename.split('/')
-    if len(parts) >= 2:
+    if len(parts) >= 2 and is_hls_stream_id(parts[0]):
         stream_id = parts[0]
-        segment_file = parts[1] if len(parts) > 1 else ''
+        # Renditions live in subdirectories (stream_N/low/...); never leave HLS_DIR
+        segment_file = '/'.join(p for p in parts[1:] if p not in ('', '.', '..'))
         
         stream_path = os.path.join(HLS_DIR, stream_id)
         
         if segment_file:
             file_path = os.path.join(stream_path, segment_file)
+            error = wait_for_ll_hls(stream_id, segment_file)
+            if error:
+                return error
         else:
             file_path = os.path.join(stream_path, 'playlist.m3u8')
         
-        if os.path.exists(file_path):
-            # Set appropriate content type
-            if file_path.endswith('.m3u8'):
-                response = make_response(send_file(file_path, mimetype='application/vnd.apple.mpegurl'))
-                # Don't cache playlists - they change frequently
-                response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
+        # Set appropriate content type
+        if file_path.endswith('.m3u8'):
+            # Don't cache playlists - they change frequently
+            response = cached_hls_response(file_path, 'application/vnd.apple.mpegurl',
+                                           'no-cache, no-store, must-revalidate, max-age=0')
+            if response is not None:
                 response.headers['Pragma'] = 'no-cache'
                 response.headers['Expires'] = '0'
                 return response
-            elif file_path.endswith('.ts'):
-                response = make_response(send_file(file_path, mimetype='video/mp2t'))
-                # Cache segments for short time since they don't change
-                response.headers['Cache-Control'] = 'public, max-age=60'
+        elif file_path.endswith('.ts'):
+            # Cache segments for short time since they don't change
+            response = cached_hls_response(file_path, 'video/mp2t', 'public, max-age=60')
+            if response is not None:
+                return response
+        elif file_path.endswith('.m4s') or file_path.endswith('.mp4'):
+            # LL-HLS parts, segments and init section never change once written
+            mimetype = 'video/iso.segment' if file_path.endswith('.m4s') else 'video/mp4'
+            response = cached_hls_response(file_path, mimetype, 'public, max-age=60')
+            if response is not None:
                 return response
     
     return jsonify({"error": "File not found"}), 404
 
 
-@app.before_request
-def startup():
-    """Initialize streams on first request"""
-    if not hasattr(app, 'streams_initialized'):
+HLS_REQUEST_TYPES = {'.m3u8': 'playlist', '.ts': 'segment', '.m4s': 'part', '.mp4': 'init'}
+
+
+@app.after_request
+def count_hls_request(response):
+    """Count /hls responses in HLS_REQUESTS by camera, file type and status"""
+    if request.endpoint == 'serve_hls':
+        parts = request.view_args['filename'].split('/')
+        stream_id = parts[0]
+        if not is_hls_stream_id(stream_id):
+            camera = 'other'  # Keep label values bounded
+        else:
+            camera = 'mosaic' if stream_id == MOSAIC_DIR else stream_id[len('stream_'):]
+        extension = os.path.splitext(parts[-1])[1] if len(parts) > 1 and parts[-1] else '.m3u8'
+        HLS_REQUESTS.labels(camera, HLS_REQUEST_TYPES.get(extension, 'other'), response.status_code).inc()
+    return response
+
+
+def parse_dvr_time(value):
+    """Epoch milliseconds of an ISO timestamp (naive = server local time), None if missing or invalid"""
+    if not value:
+        return None
+    return parse_program_date_time(value)
+
+
+@app.route('/api/dvr')
+def get_dvr_stats():
+    """Archived range, size and budget use of every camera's DVR archive"""
+    if not DVR_ARCHIVE:
+        return jsonify({"error": "DVR archive not enabled (set HLS_DVR=1)"}), 503
+    
+    stats = DVR_ARCHIVE.stats()
+    stats['timestamp'] = datetime.now().isoformat()
+    return jsonify(stats)
+
+
+@app.route('/api/dvr/<int:camera_id>')
+def get_camera_dvr(camera_id):
+    """Archived range of one camera plus the URL template for VOD playlists"""
+    if not DVR_ARCHIVE:
+        return jsonify({"error": "DVR archive not enabled (set HLS_DVR=1)"}), 503
+    
+    stats = DVR_ARCHIVE.stats(camera_id)
+    stats['vod_url'] = f'/api/dvr/{camera_id}/vod.m3u8?start=<iso>&end=<iso>'
+    return jsonify(stats)
+
+
+@app.route('/api/dvr/<int:camera_id>/seek')
+def seek_dvr(camera_id):
+    """
+    Archived segment holding a timestamp
+    
+    Query params:
+        time: ISO timestamp
+    """
+    if not DVR_ARCHIVE:
+        return jsonify({"error": "DVR archive not enabled (set HLS_DVR=1)"}), 503
+    timestamp_ms = parse_dvr_time(request.args.get('time'))
+    if timestamp_ms is None:
+        return jsonify({"error": "time must be an ISO timestamp"}), 400
+    
+    segment = DVR_ARCHIVE.seek(camera_id, timestamp_ms)
+    if segment is None:
+        return jsonify({"error": "Nothing archived at or after this time"}), 404
+    segment['url'] = f'/dvr/{camera_id}/{segment["start_ms"]}.ts'
+    segment['segment_start'] = datetime.fromtimestamp(segment['start_ms'] / 1000).isoformat()
+    return jsonify(segment)
+
+
+@app.route('/api/dvr/<int:camera_id>/vod.m3u8')
+def get_dvr_vod_playlist(camera_id):
+    """
+    VOD playlist of the archived segments in [start, end]
+    
+    Query params:
+        start: ISO timestamp (required)
+        end: ISO timestamp (default: now)
+    """
+    if not DVR_ARCHIVE:
+        return jsonify({"error": "DVR archive not enabled (set HLS_DVR=1)"}), 503
+    start_ms = parse_dvr_time(request.args.get('start'))
+    end_ms = parse_dvr_time(request.args.get('end')) if request.args.get('end') else int(time.time() * 1000)
+    if start_ms is None or end_ms is None:
+        return jsonify({"error": "start and end must be ISO timestamps"}), 400
+    if end_ms <= start_ms:
+        return jsonify({"error": "end must be after start"}), 400
+    
+    playlist = DVR_ARCHIVE.vod_playlist(camera_id, start_ms, end_ms,
+                                        lambda segment_start: f'/dvr/{camera_id}/{segment_start}.ts')
+    if playlist is None:
+        return jsonify({"error": "No archived video in this window"}), 404
+    response = Response(playlist, mimetype='application/vnd.apple.mpegurl')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/dvr/<int:camera_id>/<int:start_ms>.ts')
+def serve_dvr_segment(camera_id, start_ms):
+    """Archived segment (immutable once written)"""
+    path = DVR_ARCHIVE.segment_path(camera_id, start_ms) if DVR_ARCHIVE else None
+    if path is None or not os.path.exists(path):
+        return jsonify({"error": "File not found"}), 404
+    response = send_file(path, mimetype='video/mp2t', conditional=True)
+    response.headers['Cache-Control'] = 'public, max-age=86400, immutable'
+    return response
+
+
+def acquire_startup_lock():
+    """Take the deployment-wide startup lock without blocking, True if this process now holds it"""
+    global STARTUP_LOCK
+    lock_file = open(STARTUP_LOCK_FILE, 'a+')
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    STARTUP_LOCK = lock_file  # Released by the kernel when this process exits
+    return True
+
+
+def start_services():
+    """
+    Start streams, summarizers and capture services once per deployment
+    
+    Every gunicorn worker imports this module, so the work is guarded by an
+    exclusive lock on STARTUP_LOCK_FILE that the first worker keeps for its
+    lifetime; other workers (and repeat calls) skip it. Returns True in the
+    process that owns the services.
+    
+    With CAMERA_SERVER_ROLE=api no ingest work is started here: the process
+    loads the summary/index/analytics stores read-only and follows the
+    events ingest_daemon.py publishes to SHARED_STATE.
+    """
+    global SHARED_STATE
+    with STARTUP_MUTEX:
+        if hasattr(app, 'streams_initialized'):
+            return STARTUP_LOCK is not None
         app.streams_initialized = True
-        threading.Thread(target=init_streams, daemon=True).start()
+        
+        ingest = SERVICES_ROLE != 'api'
+        if ingest and not acquire_startup_lock():
+            print(f"⚠️  Services already running in another process (pid {open(STARTUP_LOCK_FILE).read().strip()}), "
+                  f"worker {os.getpid()} only serves requests")
+            return False
+        
+        follow_from = None
+        if SERVICES_ROLE != 'all':
+            SHARED_STATE = SharedState(SHARED_STATE_DB)
+            # Events published while the stores below load are replayed (append_new skips duplicates)
+            follow_from = SHARED_STATE.last_seq()
+            print(f"✓ Shared state at {SHARED_STATE_DB} ({SERVICES_ROLE} role)")
+        
+        def change_listener(kind):
+            """Chat cache invalidation, or an event for API workers in the ingest role"""
+            return ingest_event_listener(kind) if SERVICES_ROLE == 'ingest' else CHAT_CACHE.bump
+        
+        # Every role serves the current cameras.json; only the ingest side restarts pipelines
+        CAMERA_REGISTRY.start()
+        if ingest:
+            CAMERA_REGISTRY.listeners.append(apply_camera_changes)
+            threading.Thread(target=init_streams, daemon=True).start()
+        
+        # Live segments are linked into the archive by whichever process runs ffmpeg
+        if HLS_DVR:
+            global DVR_ARCHIVE
+            DVR_ARCHIVE = DVRArchive(DVR_DIR, HLS_DIR, DVR_MAX_BYTES_PER_CAMERA, read_only=not ingest)
+            if ingest:
+                DVR_ARCHIVE.start(lambda: list(FFMPEG_PROCESSES.keys()))
+            print(f"✓ DVR archive at {DVR_DIR} ({DVR_MAX_BYTES_PER_CAMERA / 1024 ** 3:g} GB per camera)")
+        
+        if HLS_MOSAIC and ingest:
+            global MOSAIC_STREAM
+            MOSAIC_STREAM = MosaicStream(HLS_DIR, mosaic_input_playlist, hls_output_args)
+            MOSAIC_STREAM.start(lambda: list(FFMPEG_PROCESSES.keys()))
         
         # Initialize Ollama Summarizer (Gemma 3:4b) with frame capture
         try:
             global OLLAMA_SUMMARIZER, OLLAMA_FRAME_CAPTURE_SERVICE
             if OLLAMA_SUMMARIZER_AVAILABLE:
                 OLLAMA_SUMMARIZER = OllamaSummarizer(HLS_DIR, OLLAMA_SUMMARIES_DIR)
+                if ingest:
+                    OLLAMA_SUMMARIZER.summary_listeners.append(change_listener('summary'))
                 print("✓ Ollama Summarizer (Gemma 3:4b) initialized")
                 
+                if ANSWER_GENERATOR_AVAILABLE:
+                    global ANSWER_GENERATOR
+                    ANSWER_GENERATOR = AnswerGenerator(OLLAMA_SUMMARIZER.ollama_url, OLLAMA_SUMMARIZER.model)
+                
+                # Structured counts/objects/activity for analytics, backfilled from the log
+                if ANALYTICS_AVAILABLE:
+                    global ANALYTICS_STORE
+                    ANALYTICS_STORE = SummaryAnalyticsStore(ANALYTICS_DB)
+                    if ingest:
+                        OLLAMA_SUMMARIZER.summary_listeners.append(ANALYTICS_STORE.add_summary)
+                        threading.Thread(
+                            target=ANALYTICS_STORE.backfill,
+                            args=(OLLAMA_SUMMARY_STORE,),
+                            daemon=True
+                        ).start()
+                    print("✓ Summary analytics store initialized")
+                
                 # Start Ollama frame capture service for continuous analysis
-                if OLLAMA_FRAME_CAPTURE_AVAILABLE:
+                if OLLAMA_FRAME_CAPTURE_AVAILABLE and ingest:
                     OLLAMA_FRAME_CAPTURE_SERVICE = OllamaFrameCaptureService(
                         HLS_DIR, 
                         OLLAMA_SUMMARIZER, 
-                        capture_interval=15  # Capture every 15 seconds
+                        capture_interval=15,  # Capture every 15 seconds
+                        snapshot_cache=SNAPSHOT_CACHE,
+                        camera_registry=CAMERA_REGISTRY
                     )
                     OLLAMA_FRAME_CAPTURE_SERVICE.start()
                     print("✓ Ollama Frame Capture Service started")
+                
+                # Embed new summaries and backfill the ones already on disk
+                if SEMANTIC_INDEX_AVAILABLE:
+                    global SEMANTIC_INDEX
+                    SEMANTIC_INDEX = SemanticIndex(
+                        EMBEDDINGS_DIR,
+                        EmbeddingClient(OLLAMA_SUMMARIZER.ollama_url, EMBEDDING_MODEL)
+                    )
+                    if ingest:
+                        OLLAMA_SUMMARIZER.summary_listeners.append(SEMANTIC_INDEX.add_summary)
+                        SEMANTIC_INDEX.listeners.append(change_listener('indexed'))
+                        threading.Thread(
+                            target=SEMANTIC_INDEX.index_store,
+                            args=(OLLAMA_SUMMARY_STORE,),
+                            daemon=True
+                        ).start()
+                    print(f"✓ Semantic index initialized ({EMBEDDING_MODEL})")
         except Exception as e:
             print(f"⚠️  Ollama Summarizer initialization failed: {e}")
         
@@ -248,14 +1100,18 @@ def startup():
             global VIDEO_SUMMARIZER, FRAME_CAPTURE_SERVICE
             if SUMMARIZER_AVAILABLE:
                 VIDEO_SUMMARIZER = VideoSummarizer(HLS_DIR, SUMMARIES_DIR)
+                if SERVICES_ROLE == 'ingest':
+                    VIDEO_SUMMARIZER.summary_listeners.append(change_listener('video_summary'))
                 print("✓ Video Summarizer (OpenAI) initialized")
                 
                 # Start frame capture service for continuous analysis
-                if FRAME_CAPTURE_AVAILABLE:
+                if FRAME_CAPTURE_AVAILABLE and ingest:
                     FRAME_CAPTURE_SERVICE = FrameCaptureService(
                         HLS_DIR, 
                         VIDEO_SUMMARIZER, 
-                        capture_interval=15  # Capture every 15 seconds
+                        capture_interval=15,  # Capture every 15 seconds
+                        snapshot_cache=SNAPSHOT_CACHE,
+                        camera_registry=CAMERA_REGISTRY
                     )
                     FRAME_CAPTURE_SERVICE.start()
                     print("✓ Frame Capture Service started")
@@ -268,10 +1124,27 @@ def startup():
             global MOTION_MANAGER
             cameras = load_cameras()
             MOTION_MANAGER = MotionDetectionManager(cameras)
+            if ingest:
+                MOTION_MANAGER.clip_listeners.append(change_listener('clip'))
             # Uncomment to enable motion detection:
             # MOTION_MANAGER.start_all()
         except ImportError:
             print("⚠️  OpenCV not available. Motion detection disabled.")
+        
+        if SERVICES_ROLE == 'ingest':
+            threading.Thread(target=publish_ingest_state, daemon=True).start()
+        elif SERVICES_ROLE == 'api':
+            SHARED_STATE.follow(apply_ingest_event, start_seq=follow_from)
+            print(f"✓ API worker {os.getpid()} following ingest events from seq {follow_from}")
+        
+        return ingest
+
+
+@app.before_request
+def startup():
+    """Initialize services on first request (development server; wsgi.py starts them under gunicorn)"""
+    if not hasattr(app, 'streams_initialized'):
+        start_services()
 
 
 @app.route('/api/clips/<int:camera_id>')
@@ -308,91 +1181,151 @@ def get_clips(camera_id):
         return jsonify([])
 
 
+def parse_query_time(value):
+    """Parse an ISO timestamp from a chat request, returns None if missing or invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def summary_result(event):
+    """Shape a timeline summary event like the /api/chat summary results"""
+    return {
+        **event['record'],
+        "match_score": event['match_score'],
+        "matched_words": event['matched_words'],
+        "relative_timestamp": event['timestamp']
+    }
+
+
+def clip_result(event):
+    """Shape a timeline clip event like the /api/chat clip results"""
+    return {
+        **event['record'],
+        "match_score": event['match_score'],
+        "matched_words": event['matched_words']
+    }
+
+
+def search_timeline(query, camera_id=None, start_time=None, end_time=None, event_types=EVENT_TYPES):
+    """One ranked timeline query across cameras and event types"""
+    return TIMELINE_INDEX.search(
+        query,
+        [camera_id] if camera_id is not None else None,
+        start_dt=parse_query_time(start_time),
+        end_dt=parse_query_time(end_time),
+        event_types=event_types
+    )
+
+
 def search_ollama_summaries(query, camera_id=None, start_time=None, end_time=None):
-    """Search Ollama-generated temporal summaries"""
-    relevant_summaries = []
-    query_lower = query.lower()
-    query_words = [w for w in query_lower.split() if len(w) > 2]  # Filter out short words
-    
-    # Determine which cameras to search
-    cameras_to_search = [camera_id] if camera_id is not None else range(4)
-    
-    # Parse time filters
-    start_dt = None
-    end_dt = None
-    if start_time:
-        try:
-            start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        except:
-            pass
-    if end_time:
-        try:
-            end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-        except:
-            pass
+    """Search Ollama-generated temporal summaries (keyword matches first, then newest)"""
+    return [summary_result(e) for e in search_timeline(query, camera_id, start_time, end_time, ('summary',))]
+
+
+def search_semantic_summaries(query, camera_id=None, start_time=None, end_time=None, top_k=50):
+    """Search Ollama summaries and frame captions by embedding similarity"""
+    if not SEMANTIC_INDEX:
+        return []
     
-    for cam_id in cameras_to_search:
-        camera_dir = os.path.join(OLLAMA_SUMMARIES_DIR, f'camera_{cam_id}')
-        
-        if not os.path.exists(camera_dir):
-            continue
-        
-        # Search through all summary files (minute, 5_minutes, 10_minutes, 30_minutes, hour)
-        for summary_file in os.listdir(camera_dir):
-            if not summary_file.endswith('.json'):
-                continue
-            
-            try:
-                file_path = os.path.join(camera_dir, summary_file)
-                with open(file_path, 'r') as f:
-                    summary_data = json.load(f)
-                
-                # Parse timestamp and interval
-                try:
-                    summary_timestamp = datetime.fromisoformat(summary_data.get('timestamp', ''))
-                except:
-                    continue
-                
-                interval = summary_data.get('interval', '')
-                summary_text = summary_data.get('summary', '').lower()
-                
-                # Skip error messages (timeout errors, etc)
-                if 'error' in summary_text or 'timeout' in summary_text or 'connection' in summary_text.lower():
-                    continue
-                
-                # Filter by time range if provided
-                if start_dt and summary_timestamp < start_dt:
-                    continue
-                
-                if end_dt and summary_timestamp > end_dt:
-                    continue
-                
-                # Perform semantic search - match query words in summary
-                match_score = 0
-                matched_words = []
-                for word in query_words:
-                    if word in summary_text:
-                        match_score += 1
-                        matched_words.append(word)
-                
-                # Include summary even if no keywords matched (for time-based searches)
-                # But prioritize keyword matches
-                relevant_summaries.append({
-                    **summary_data,
-                    "match_score": match_score,
-                    "matched_words": matched_words,
-                    "file_name": summary_file,
-                    "relative_timestamp": summary_timestamp.isoformat()
-                })
-            
-            except Exception as e:
-                print(f"Error reading summary file {summary_file}: {e}")
-                continue
+    cameras_to_search = [camera_id] if camera_id is not None else SEMANTIC_INDEX.camera_ids()
+    return SEMANTIC_INDEX.search(
+        query,
+        cameras_to_search,
+        k=top_k,
+        start_dt=parse_query_time(start_time),
+        end_dt=parse_query_time(end_time)
+    )
+
+
+def search_hybrid_summaries(query, camera_id=None, start_time=None, end_time=None, semantic_weight=HYBRID_SEMANTIC_WEIGHT):
+    """Blend keyword and semantic scores over Ollama summaries"""
+    keyword_results = search_ollama_summaries(query, camera_id, start_time, end_time)
+    semantic_results = search_semantic_summaries(query, camera_id, start_time, end_time)
     
-    # Sort by match score (descending) and timestamp (newest first)
-    relevant_summaries.sort(key=lambda x: (-x['match_score'], -datetime.fromisoformat(x['relative_timestamp']).timestamp()))
+    query_words = [w for w in query.lower().split() if len(w) > 2]
+    max_keyword_score = max(1, len(query_words))
+    
+    merged = {}
+    for summary in keyword_results:
+        key = (summary.get('camera_id'), SemanticIndex.summary_key(summary))
+        merged[key] = {
+            **summary,
+            'keyword_score': summary['match_score'] / max_keyword_score,
+            'semantic_score': 0.0
+        }
+    
+    for summary in semantic_results:
+        key = (summary.get('camera_id'), SemanticIndex.summary_key(summary))
+        if key in merged:
+            merged[key]['semantic_score'] = summary['semantic_score']
+            merged[key]['matched_text'] = summary.get('matched_text')
+        else:
+            merged[key] = {
+                **summary,
+                'match_score': 0,
+                'matched_words': [],
+                'keyword_score': 0.0,
+                'relative_timestamp': summary.get('timestamp')
+            }
+    
+    results = list(merged.values())
+    for result in results:
+        result['hybrid_score'] = round(
+            semantic_weight * result['semantic_score'] + (1 - semantic_weight) * result['keyword_score'], 4
+        )
+    
+    # Highest blended score first, newest first among ties
+    results.sort(key=lambda x: x.get('timestamp') or '', reverse=True)
+    results.sort(key=lambda x: -x['hybrid_score'])
+    return results
+
+
+def run_chat_search(query, camera_id, start_time, end_time, search_type, semantic_weight=HYBRID_SEMANTIC_WEIGHT):
+    """Run the summary and clip searches behind /api/chat, returns (summaries, clips)"""
+    ollama_summaries = []
+    clips_results = []
+    
+    # Keyword summaries and clips come from a single timeline query
+    if search_type == 'all':
+        for event in search_timeline(query, camera_id, start_time, end_time, ('summary', 'clip')):
+            if event['type'] == 'summary':
+                ollama_summaries.append(summary_result(event))
+            else:
+                clips_results.append(clip_result(event))
+    elif search_type == 'summaries':
+        ollama_summaries = search_ollama_summaries(query, camera_id, start_time, end_time)
+    elif search_type == 'clips':
+        clips_results = [clip_result(e) for e in search_timeline(query, camera_id, start_time, end_time, ('clip',))]
+    elif search_type == 'semantic':
+        ollama_summaries = search_semantic_summaries(query, camera_id, start_time, end_time)
+    elif search_type == 'hybrid':
+        ollama_summaries = search_hybrid_summaries(query, camera_id, start_time, end_time, semantic_weight)
     
-    return relevant_summaries
+    return ollama_summaries, clips_results
+
+
+def cached_chat_search(query, camera_id, start_time, end_time, search_type, semantic_weight=HYBRID_SEMANTIC_WEIGHT):
+    """
+    run_chat_search() through CHAT_CACHE, returns ((top summaries, count, top clips, count), from_cache)
+    
+    Identical (normalized) queries are served from cache until a summary
+    or clip is written for a camera they depend on.
+    """
+    cache_key = CHAT_CACHE.make_key(query, camera_id, start_time, end_time, search_type, semantic_weight)
+    cached = CHAT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached, True
+    
+    ollama_summaries, clips_results = run_chat_search(
+        query, camera_id, start_time, end_time, search_type, semantic_weight
+    )
+    cached = (ollama_summaries[:10], len(ollama_summaries), clips_results[:5], len(clips_results))
+    CHAT_CACHE.put(cache_key, cached)
+    return cached, False
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -403,67 +1336,29 @@ def chat():
     camera_id = data.get('camera_id', None)
     start_time = data.get('start_time', None)
     end_time = data.get('end_time', None)
-    search_type = data.get('search_type', 'all')  # 'all', 'summaries', 'clips'
+    search_type = data.get('search_type', 'all')  # 'all', 'summaries', 'clips', 'semantic', 'hybrid'
+    
+    if search_type in ['semantic', 'hybrid'] and not SEMANTIC_INDEX:
+        return jsonify({'error': 'Semantic index not initialized'}), 503
     
     try:
-        ollama_summaries = []
-        clips_results = []
-        
-        # Search Ollama summaries
-        if search_type in ['all', 'summaries']:
-            ollama_summaries = search_ollama_summaries(query, camera_id, start_time, end_time)
-        
-        # Search motion-detected clips
-        if search_type in ['all', 'clips']:
-            if camera_id is not None:
-                clip_dir = os.path.join(CLIPS_DIR, f'camera_{camera_id}')
-                metadata_file = os.path.join(clip_dir, 'metadata.json')
-                
-                if os.path.exists(metadata_file):
-                    with open(metadata_file, 'r') as f:
-                        clips = json.load(f)
-                    
-                    # Filter by time range
-                    if start_time or end_time:
-                        filtered_clips = []
-                        for clip in clips:
-                            clip_time = datetime.fromisoformat(clip['timestamp'])
-                            if start_time and clip_time < datetime.fromisoformat(start_time):
-                                continue
-                            if end_time and clip_time > datetime.fromisoformat(end_time):
-                                continue
-                            filtered_clips.append(clip)
-                        clips = filtered_clips
-                    
-                    # Simple semantic search on descriptions
-                    query_lower = query.lower()
-                    for clip in clips:
-                        description = clip.get('description', '').lower()
-                        if any(word in description for word in query_lower.split()):
-                            clips_results.append(clip)
-            else:
-                # Search all cameras' clips
-                for cam_id in range(4):
-                    clip_dir = os.path.join(CLIPS_DIR, f'camera_{cam_id}')
-                    metadata_file = os.path.join(clip_dir, 'metadata.json')
-                    
-                    if os.path.exists(metadata_file):
-                        with open(metadata_file, 'r') as f:
-                            clips = json.load(f)
-                            for clip in clips:
-                                clip['camera_id'] = cam_id
-                                clips_results.append(clip)
+        semantic_weight = float(data.get('semantic_weight', HYBRID_SEMANTIC_WEIGHT))
+        
+        cached, from_cache = cached_chat_search(query, camera_id, start_time, end_time, search_type, semantic_weight)
+        top_summaries, summaries_count, top_clips, clips_count = cached
         
         # Generate comprehensive response
         response = {
             "query": query,
             "camera_id": camera_id,
+            "search_type": search_type,
             "timestamp": datetime.now().isoformat(),
-            "ollama_summaries": ollama_summaries[:10],  # Return top 10 summaries
-            "ollama_summaries_count": len(ollama_summaries),
-            "motion_clips": clips_results[:5],  # Return top 5 clips
-            "motion_clips_count": len(clips_results),
-            "summary": f"Found {len(ollama_summaries)} video summaries and {len(clips_results)} motion events matching '{query}'"
+            "ollama_summaries": top_summaries,  # Return top 10 summaries
+            "ollama_summaries_count": summaries_count,
+            "motion_clips": top_clips,  # Return top 5 clips
+            "motion_clips_count": clips_count,
+            "cached": from_cache,
+            "summary": f"Found {summaries_count} video summaries and {clips_count} motion events matching '{query}'"
         }
         
         return jsonify(response)
@@ -477,69 +1372,197 @@ def chat():
         }), 500
 
 
-def get_stream_metadata(camera_id):
-    """Extract metadata from HLS stream"""
-    stream_dir = os.path.join(HLS_DIR, f'stream_{camera_id}')
-    playlist_path = os.path.join(stream_dir, 'playlist.m3u8')
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/chat/answer', methods=['GET', 'POST'])
+def chat_answer():
+    """
+    Stream a grounded answer to a chat question as Server-Sent Events
     
-    metadata = {
-        'camera_id': camera_id,
-        'stream_path': stream_dir,
-        'total_segments': 0,
-        'total_size_mb': 0,
-        'playlist_size_kb': 0,
-        'segments_info': [],
-        'status': 'offline'
-    }
+    Events: 'sources' (retrieved summaries, sent before generation starts),
+    'token' ({"text": ...} per generated chunk), then 'done' with timings and
+    whether the answer came from cache, or 'error'.
+    """
+    data = request.get_json(silent=True) or request.args
+    query = data.get('query', '')
+    camera_id = data.get('camera_id', None)
+    if camera_id is not None:
+        try:
+            camera_id = int(camera_id)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'camera_id must be a number'}), 400
+    start_time = data.get('start_time', None)
+    end_time = data.get('end_time', None)
+    search_type = data.get('search_type', 'hybrid' if SEMANTIC_INDEX else 'summaries')
     
-    try:
-        # Get directory size
-        total_size = 0
-        segment_files = []
-        
-        if os.path.exists(stream_dir):
-            for filename in os.listdir(stream_dir):
-                filepath = os.path.join(stream_dir, filename)
-                if os.path.isfile(filepath):
-                    size = os.path.getsize(filepath)
-                    total_size += size
-                    
-                    if filename.endswith('.ts'):
-                        segment_files.append({
-                            'name': filename,
-                            'size_kb': round(size / 1024, 2),
-                            'mtime': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
-                        })
-                    elif filename == 'playlist.m3u8':
-                        metadata['playlist_size_kb'] = round(size / 1024, 2)
-        
-        metadata['total_segments'] = len(segment_files)
-        metadata['total_size_mb'] = round(total_size / (1024 * 1024), 2)
-        metadata['segments_info'] = sorted(segment_files, key=lambda x: x['name'], reverse=True)[:15]
-        
-        # Read playlist to extract timing info
-        if os.path.exists(playlist_path):
-            with open(playlist_path, 'r') as f:
-                playlist_content = f.read()
-                metadata['status'] = 'online'
-                
-                # Extract program date time
-                lines = playlist_content.split('\n')
-                for i, line in enumerate(lines):
-                    if 'EXT-X-PROGRAM-DATE-TIME' in line:
-                        time_str = line.split(':')[1]
-                        metadata['last_timestamp'] = time_str
-                    elif 'EXT-X-MEDIA-SEQUENCE' in line:
-                        seq = line.split(':')[1]
-                        metadata['media_sequence'] = int(seq)
-                    elif 'EXT-X-TARGETDURATION' in line:
-                        dur = line.split(':')[1]
-                        metadata['target_duration'] = int(dur)
+    if not ANSWER_GENERATOR:
+        return jsonify({'error': 'Answer generator not initialized'}), 503
+    if search_type not in ['summaries', 'semantic', 'hybrid']:
+        return jsonify({'error': f'Unsupported search_type for answers: {search_type}'}), 400
+    if search_type in ['semantic', 'hybrid'] and not SEMANTIC_INDEX:
+        return jsonify({'error': 'Semantic index not initialized'}), 503
     
+    try:
+        semantic_weight = float(data.get('semantic_weight', HYBRID_SEMANTIC_WEIGHT))
+        (top_summaries, _, _, _), _ = cached_chat_search(
+            query, camera_id, start_time, end_time, search_type, semantic_weight
+        )
     except Exception as e:
-        metadata['error'] = str(e)
+        print(f"Error in chat answer retrieval: {e}")
+        return jsonify({'error': str(e)}), 500
+    
+    sources = ANSWER_GENERATOR.select_sources(top_summaries)
+    
+    def generate():
+        yield sse_event('sources', [{
+            'ref': idx,
+            'camera_id': s.get('camera_id'),
+            'interval': s.get('interval'),
+            'timestamp': s.get('timestamp'),
+            'summary': s.get('summary')
+        } for idx, s in enumerate(sources, start=1)])
+        
+        stats = {}
+        try:
+            for text in ANSWER_GENERATOR.stream_answer(query, sources, stats):
+                yield sse_event('token', {'text': text})
+            yield sse_event('done', stats)
+        except Exception as e:
+            print(f"Error streaming chat answer: {e}")
+            yield sse_event('error', {'error': str(e)})
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a reverse proxy hold tokens back
+    })
+
+
+@app.route('/api/chat/cache-stats')
+def get_chat_cache_stats():
+    """Hit ratio and size of the /api/chat query cache and the answer cache"""
+    return jsonify({
+        **CHAT_CACHE.stats(),
+        'answers': ANSWER_GENERATOR.stats() if ANSWER_GENERATOR else None,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+def analytics_window():
+    """Camera and time filters shared by the analytics endpoints"""
+    camera_id = request.args.get('camera_id', type=int)
+    return (
+        [camera_id] if camera_id is not None else None,
+        parse_query_time(request.args.get('start_time')),
+        parse_query_time(request.args.get('end_time'))
+    )
+
+
+@app.route('/api/analytics/timeseries')
+def get_analytics_timeseries():
+    """
+    Aggregate structured summary fields into time buckets
+    
+    Query params: metric (people|vehicles|activity), agg (max|min|avg|sum|count),
+    bucket (minute|5_minutes|hour|day), interval (summary interval, default minute),
+    camera_id, start_time, end_time, per_camera
+    """
+    if not ANALYTICS_STORE:
+        return jsonify({'error': 'Analytics store not initialized'}), 503
+    
+    camera_ids, start_dt, end_dt = analytics_window()
+    metric = request.args.get('metric', 'people')
+    agg = request.args.get('agg', 'max')
+    bucket = request.args.get('bucket', 'hour')
+    interval = request.args.get('interval', 'minute')
+    per_camera = request.args.get('per_camera', 'false').lower() in ('1', 'true', 'yes')
+    
+    started = time.time()
+    try:
+        series = ANALYTICS_STORE.timeseries(metric, agg, bucket, interval, camera_ids, start_dt, end_dt, per_camera)
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'metrics': list(METRICS),
+            'aggregates': list(AGGREGATES),
+            'buckets': list(BUCKETS)
+        }), 400
+    
+    return jsonify({
+        'metric': metric,
+        'agg': agg,
+        'bucket': bucket,
+        'interval': interval,
+        'series': series,
+        'query_ms': round((time.time() - started) * 1000, 2),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@app.route('/api/analytics/objects')
+def get_analytics_objects():
+    """Most frequent object classes in summaries (camera_id, start_time, end_time, interval, limit)"""
+    if not ANALYTICS_STORE:
+        return jsonify({'error': 'Analytics store not initialized'}), 503
     
-    return metadata
+    camera_ids, start_dt, end_dt = analytics_window()
+    started = time.time()
+    objects = ANALYTICS_STORE.object_totals(
+        request.args.get('interval', 'minute'), camera_ids, start_dt, end_dt,
+        limit=request.args.get('limit', 20, type=int)
+    )
+    return jsonify({
+        'objects': objects,
+        'query_ms': round((time.time() - started) * 1000, 2),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@app.route('/api/analytics/stats')
+def get_analytics_stats():
+    """Row count and time span of the analytics store"""
+    if not ANALYTICS_STORE:
+        return jsonify({'error': 'Analytics store not initialized'}), 503
+    return jsonify({**ANALYTICS_STORE.stats(), 'timestamp': datetime.now().isoformat()})
+
+
+@app.route('/api/timeline')
+def get_timeline():
+    """Time-ordered events (summaries, clips, analyses) across cameras, optionally ranked by a query"""
+    camera_id = request.args.get('camera_id', type=int)
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 200, type=int)
+    types = request.args.get('types')
+    event_types = [t for t in types.split(',') if t in EVENT_TYPES] if types else EVENT_TYPES
+    
+    start_dt = parse_query_time(request.args.get('start_time'))
+    end_dt = parse_query_time(request.args.get('end_time'))
+    camera_ids = [camera_id] if camera_id is not None else None
+    
+    try:
+        if query:
+            events = TIMELINE_INDEX.search(query, camera_ids, start_dt, end_dt, event_types, limit=limit)
+        else:
+            # Newest `limit` events in the window, returned oldest first
+            events = deque(TIMELINE_INDEX.iter_events(camera_ids, start_dt, end_dt, event_types), maxlen=limit)
+            events = [TIMELINE_INDEX.public_event(e) for e in events]
+        
+        return jsonify({
+            'events': events,
+            'count': len(events),
+            'query': query,
+            'event_types': list(event_types),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def get_stream_metadata(camera_id):
+    """Extract metadata from HLS stream (maintained incrementally by STREAM_STATS)"""
+    return STREAM_STATS.metadata(camera_id)
 
 
 @app.route('/api/stream-summary')
@@ -559,10 +1582,12 @@ def get_stream_summary():
         
         total_size = 0
         total_segments = 0
+        metadata_by_camera = []
         
         for idx, camera in enumerate(cameras):
             camera_id = camera.get('id', idx)
             metadata = get_stream_metadata(camera_id)
+            metadata_by_camera.append(metadata)
             
             total_size += metadata['total_size_mb']
             total_segments += metadata['total_segments']
@@ -622,7 +1647,7 @@ def get_stream_summary():
                 'cameras_count': len(cameras),
                 'total_segments': total_segments,
                 'total_size_mb': total_size,
-                'metadata_by_camera': [get_stream_metadata(c.get('id', idx)) for idx, c in enumerate(cameras)]
+                'metadata_by_camera': metadata_by_camera
             })
     
     except Exception as e:
@@ -704,30 +1729,111 @@ def get_camera_stream_summary(camera_id):
         }), 500
 
 
+def summaries_page(summarizer):
+    """
+    Cursor-paginated summary read shared by /api/ollama/summaries and /api/video-summaries
+    
+    Query parameters:
+        cursor: next_cursor from a previous response; returns only newer records
+        since: ISO timestamp; returns only records stamped after it
+        limit: maximum records to return (default 100, max 1000)
+        camera_id, interval: optional filters
+    
+    Returns None when no paging parameter is present (legacy nested response).
+    Raises ValueError on malformed parameters.
+    """
+    args = request.args
+    if not any(name in args for name in ('cursor', 'since', 'limit')):
+        return None
+    
+    limit = min(max(int(args.get('limit', 100)), 1), 1000)
+    camera_id = args.get('camera_id', type=int)
+    interval = args.get('interval')
+    if interval and interval not in summarizer.INTERVALS:
+        raise ValueError(f'Invalid interval. Valid intervals: {list(summarizer.INTERVALS.keys())}')
+    
+    after_key = None
+    if args.get('cursor'):
+        after_key = decode_cursor(args['cursor'])
+    elif args.get('since'):
+        since = parse_query_time(args['since'])
+        if since is None:
+            raise ValueError(f"Invalid since timestamp: {args['since']}")
+        after_key = since_key(since)
+    
+    records = summarizer.get_summaries_page(camera_id, interval, after_key, limit)
+    
+    # With nothing new, hand the same cursor back so clients can keep polling
+    next_cursor = encode_cursor(records[-1]) if records else args.get('cursor')
+    
+    return {
+        'records': records,
+        'count': len(records),
+        'next_cursor': next_cursor,
+        'has_more': after_key is not None and len(records) == limit,
+        'timestamp': datetime.now().isoformat()
+    }
+
+
 @app.route('/api/video-summaries')
 def get_video_summaries():
-    """Get all video summaries with temporal hierarchy"""
+    """
+    Get all video summaries with temporal hierarchy
+    
+    Supports ?cursor=&since=&limit=&camera_id=&interval= for incremental reads
+    (flat, oldest-first records plus next_cursor; see summaries_page)
+    """
     if not VIDEO_SUMMARIZER:
         return jsonify({'error': 'Video summarizer not initialized'}), 503
     
     try:
+        page = summaries_page(VIDEO_SUMMARIZER)
+        if page is not None:
+            page['intervals'] = list(VIDEO_SUMMARIZER.INTERVALS.keys())
+            return jsonify(page)
+        
         summaries = VIDEO_SUMMARIZER.get_all_summaries()
         return jsonify({
             'summaries': summaries,
             'timestamp': datetime.now().isoformat(),
             'intervals': list(VIDEO_SUMMARIZER.INTERVALS.keys())
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/video-summaries/<int:camera_id>')
 def get_camera_video_summaries(camera_id):
-    """Get video summaries for a specific camera"""
+    """
+    Get video summaries for a specific camera
+    
+    Without query parameters returns the recent in-memory window.
+    With ?start_time=&end_time=[&interval=] returns that range from disk.
+    """
     if not VIDEO_SUMMARIZER:
         return jsonify({'error': 'Video summarizer not initialized'}), 503
     
     try:
+        # Older history (explicit time range) is served from the summary log on disk
+        start_time = request.args.get('start_time')
+        end_time = request.args.get('end_time')
+        if start_time or end_time:
+            interval = request.args.get('interval')
+            history = VIDEO_SUMMARIZER.get_summary_history(
+                camera_id, parse_query_time(start_time), parse_query_time(end_time), interval
+            )
+            return jsonify({
+                'camera_id': camera_id,
+                'interval': interval,
+                'start_time': start_time,
+                'end_time': end_time,
+                'summaries': history,
+                'count': len(history),
+                'timestamp': datetime.now().isoformat()
+            })
+        
         summaries = VIDEO_SUMMARIZER.get_all_summaries(camera_id)
         
         if not summaries:
@@ -806,37 +1912,28 @@ def capture_frame_for_summary():
     """
     if not VIDEO_SUMMARIZER:
         return jsonify({'error': 'Video summarizer not initialized'}), 503
+    if SERVICES_ROLE == 'api':
+        return jsonify({'error': 'Frame capture runs in the ingest daemon'}), 503
     
     try:
         data = request.get_json() or {}
         camera_id = data.get('camera_id', 0)
         
-        # Get latest segment for this camera
         stream_dir = os.path.join(HLS_DIR, f'stream_{camera_id}')
         if not os.path.exists(stream_dir):
             return jsonify({'error': f'Stream directory not found for camera {camera_id}'}), 404
         
-        # Find latest .ts file
-        ts_files = [f for f in os.listdir(stream_dir) if f.endswith('.ts')]
-        if not ts_files:
-            return jsonify({'error': f'No segments found for camera {camera_id}'}), 404
-        
-        latest_segment = os.path.join(stream_dir, sorted(ts_files)[-1])
-        
-        # Capture frame
-        cap = cv2.VideoCapture(latest_segment)
-        ret, frame = cap.read()
-        cap.release()
-        
-        if not ret:
+        # Latest frame from the snapshot cache (decoded once per segment)
+        snapshot = SNAPSHOT_CACHE.get(camera_id)
+        if snapshot is None:
             return jsonify({'error': 'Failed to capture frame'}), 500
         
         # Add to summarizer
-        VIDEO_SUMMARIZER.add_frame(camera_id, frame)
+        VIDEO_SUMMARIZER.add_frame(camera_id, snapshot.frame)
         
         return jsonify({
             'camera_id': camera_id,
-            'segment': os.path.basename(latest_segment),
+            'segment': snapshot.segment,
             'status': 'Frame captured and queued for analysis'
         })
     
@@ -848,11 +1945,21 @@ def capture_frame_for_summary():
 
 @app.route('/api/ollama/summaries')
 def get_ollama_summaries():
-    """Get all Ollama video summaries (Gemma 3:4b)"""
+    """
+    Get all Ollama video summaries (Gemma 3:4b)
+    
+    Supports ?cursor=&since=&limit=&camera_id=&interval= for incremental reads
+    (flat, oldest-first records plus next_cursor; see summaries_page)
+    """
     if not OLLAMA_SUMMARIZER:
         return jsonify({'error': 'Ollama summarizer not initialized'}), 503
     
     try:
+        page = summaries_page(OLLAMA_SUMMARIZER)
+        if page is not None:
+            page.update({'model': 'gemma3:4b', 'backend': 'ollama'})
+            return jsonify(page)
+        
         summaries = OLLAMA_SUMMARIZER.get_all_summaries()
         return jsonify({
             'summaries': summaries,
@@ -861,17 +1968,42 @@ def get_ollama_summaries():
             'backend': 'ollama',
             'intervals': list(OLLAMA_SUMMARIZER.INTERVALS.keys())
         })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/ollama/summaries/<int:camera_id>')
 def get_ollama_camera_summaries(camera_id):
-    """Get Ollama summaries for a specific camera"""
+    """
+    Get Ollama summaries for a specific camera
+    
+    Without query parameters returns the recent in-memory window.
+    With ?start_time=&end_time=[&interval=] returns that range from disk.
+    """
     if not OLLAMA_SUMMARIZER:
         return jsonify({'error': 'Ollama summarizer not initialized'}), 503
     
     try:
+        # Older history (explicit time range) is served from the summary log on disk
+        start_time = request.args.get('start_time')
+        end_time = request.args.get('end_time')
+        if start_time or end_time:
+            interval = request.args.get('interval')
+            history = OLLAMA_SUMMARIZER.get_summary_history(
+                camera_id, parse_query_time(start_time), parse_query_time(end_time), interval
+            )
+            return jsonify({
+                'camera_id': camera_id,
+                'interval': interval,
+                'start_time': start_time,
+                'end_time': end_time,
+                'summaries': history,
+                'count': len(history),
+                'timestamp': datetime.now().isoformat()
+            })
+        
         summaries = OLLAMA_SUMMARIZER.get_all_summaries(camera_id)
         
         if not summaries:
@@ -966,6 +2098,19 @@ def get_ollama_status():
 
 def cleanup_streams():
     """Cleanup streams (called on shutdown only)"""
+    if STARTUP_LOCK is None:
+        return  # Services belong to another process
+    
+    # Stop the supervisor first so it doesn't restart the streams being stopped
+    if STREAM_SUPERVISOR:
+        STREAM_SUPERVISOR.stop()
+    
+    if DVR_ARCHIVE:
+        DVR_ARCHIVE.stop()
+    
+    if MOSAIC_STREAM:
+        MOSAIC_STREAM.stop()
+    
     for camera_id in list(FFMPEG_PROCESSES.keys()):
         stop_hls_stream(camera_id)
     
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+chat_answerer.py
+Grounded natural-language answers to chat questions, streamed token by token
+from a local Ollama model
+
+The answer is generated only from the retrieved summaries, which are passed
+to the model as numbered sources. Answers are cached by (question, exact
+retrieval set), so the same question over unchanged data is answered without
+another model call.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+
+class AnswerGenerator:
+    """Retrieval-augmented answers over video summaries using Ollama /api/generate"""
+
+    # Sources and characters per source sent to the model; small prompts keep
+    # time-to-first-token low on a 4B model
+    MAX_SOURCES = 6
+    MAX_SOURCE_CHARS = 600
+
+    def __init__(self, ollama_base_url: str = "http://localhost:11434", model: str = "gemma3:4b",
+                 cache_size: int = 128, timeout: int = 60):
+        """
+        Initialize answer generator
+
+        Args:
+            ollama_base_url: URL to Ollama API endpoint
+            model: Generation model
+            cache_size: Answers kept for identical question and retrieval sets
+            timeout: Seconds to wait between streamed chunks
+        """
+        self.ollama_url = ollama_base_url
+        self.model = model
+        self.cache_size = cache_size
+        self.timeout = timeout
+
+        self.cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def source_key(summary: Dict) -> Tuple:
+        return summary.get('camera_id'), summary.get('interval'), summary.get('timestamp')
+
+    def cache_key(self, query: str, sources: List[Dict]) -> Tuple:
+        normalized = ' '.join(re.sub(r"[^\w\s]", ' ', (query or '').lower()).split())
+        return (self.model, normalized) + tuple(self.source_key(s) for s in sources)
+
+    def select_sources(self, summaries: List[Dict]) -> List[Dict]:
+        """Top summaries worth grounding on, in retrieval order"""
+        candidates = [s for s in summaries if s.get('summary')]
+
+        # Keyword search also returns unmatched summaries for time-only queries;
+        # ground on matches only when there are any
+        def relevance(summary):
+            for field in ('hybrid_score', 'semantic_score', 'match_score'):
+                if field in summary:
+                    return summary[field] or 0
+            return 0
+
+        relevant = [s for s in candidates if relevance(s) > 0]
+        return (relevant or candidates)[:self.MAX_SOURCES]
+
+    def build_prompt(self, query: str, sources: List[Dict]) -> str:
+        lines = []
+        for idx, source in enumerate(sources, start=1):
+            interval = (source.get('interval') or '').replace('_', ' ')
+            text = ' '.join(source.get('summary', '').split())[:self.MAX_SOURCE_CHARS]
+            lines.append(f"[{idx}] Camera {source.get('camera_id')}, {interval} ending {source.get('timestamp')}: {text}")
+
+        return f"""You answer questions about security camera footage using only the summaries below.
+
+Summaries:
+{chr(10).join(lines)}
+
+Question: {query}
+
+Answer in 1-3 sentences. Cite the summaries you used as [n]. If the summaries do not contain the answer, say so."""
+
+    def _cache_get(self, key: Tuple) -> Optional[str]:
+        with self.lock:
+            answer = self.cache.get(key)
+            if answer is None:
+                self.cache_misses += 1
+                return None
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return answer
+
+    def _cache_put(self, key: Tuple, answer: str):
+        with self.lock:
+            self.cache[key] = answer
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def stream_answer(self, query: str, sources: List[Dict], stats: Dict = None) -> Iterator[str]:
+        """
+        Yield answer text chunks as the model produces them
+
+        Args:
+            query: User question
+            sources: Summaries from select_sources()
+            stats: Optional dict filled with 'cached', 'first_token_ms' and 'total_ms'
+        """
+        stats = stats if stats is not None else {}
+        started = time.time()
+        key = self.cache_key(query, sources)
+
+        cached = self._cache_get(key)
+        if cached is not None:
+            stats.update({'cached': True, 'first_token_ms': round((time.time() - started) * 1000, 1)})
+            yield cached
+            stats['total_ms'] = stats['first_token_ms']
+            return
+
+        stats['cached'] = False
+        if not sources:
+            answer = "No matching summaries were found for that question."
+            stats['first_token_ms'] = round((time.time() - started) * 1000, 1)
+            yield answer
+            stats['total_ms'] = stats['first_token_ms']
+            return
+
+        response = requests.post(
+            f"{self.ollama_url}/api/generate",
+            json={
+                "model": self.model,
+                "prompt": self.build_prompt(query, sources),
+                "stream": True,
+                "keep_alive": "10m",  # Keep the model loaded between questions
+                "options": {"temperature": 0.2, "num_predict": 200}
+            },
+            stream=True,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+        chunks = []
+        complete = False
+        try:
+            # chunk_size=None hands over each chunk as it arrives instead of buffering 512 bytes
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get('error'):
+                    raise RuntimeError(data['error'])
+
+                text = data.get('response', '')
+                if text:
+                    if not chunks:
+                        stats['first_token_ms'] = round((time.time() - started) * 1000, 1)
+                    chunks.append(text)
+                    yield text
+
+                if data.get('done'):
+                    complete = True
+                    break
+        finally:
+            response.close()
+
+        stats['total_ms'] = round((time.time() - started) * 1000, 1)
+        # Only complete answers are reused; a client disconnect leaves no partial entry
+        if complete:
+            self._cache_put(key, ''.join(chunks).strip())
+
+    def answer(self, query: str, sources: List[Dict]) -> str:
+        """Non-streaming convenience wrapper around stream_answer()"""
+        return ''.join(self.stream_answer(query, sources)).strip()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'model': self.model,
+                'cached_answers': len(self.cache),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'hit_ratio': round(self.cache_hits / lookups, 4) if lookups else 0.0
+            }
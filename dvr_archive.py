@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+dvr_archive.py
+Rolling DVR archive of the live HLS segments with a time index
+
+The live playlist only keeps the last 15 segments (ffmpeg deletes older
+ones). The archiver follows each camera's playlist and hard-links every new
+segment into an hourly directory before ffmpeg deletes it, so nothing is
+copied:
+
+    dvr_archive/camera_<id>/YYYYMMDD/HH/<start_ms>.ts
+    dvr_archive/camera_<id>/YYYYMMDD/HH/index.bin
+
+index.bin is append-only, one fixed-size record per segment (start time,
+duration, size, flags). In memory each camera keeps the records as parallel
+arrays sorted by start time (about 19 bytes per segment), so resolving a
+timestamp or the segments of a [start, end] window is a bisect. VOD
+playlists for any window are generated from the index and point at the
+archived files.
+
+Retention is a per-camera byte budget: the oldest segments are deleted
+first, whole hour directories once they are empty. retained_from records
+the oldest kept segment for processes that only read the archive.
+"""
+
+import os
+import shutil
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+INDEX_FILE = 'index.bin'
+WATERMARK_FILE = 'retained_from'
+RECORD = struct.Struct('<qIIH')  # start_ms, duration_ms, size, flags
+FLAG_DISCONTINUITY = 1  # Timestamps don't continue from the previous segment (gap or ffmpeg restart)
+GAP_TOLERANCE_MS = 1000
+
+
+def parse_program_date_time(value: str) -> Optional[int]:
+    """Epoch milliseconds of an EXT-X-PROGRAM-DATE-TIME value"""
+    try:
+        return int(round(datetime.fromisoformat(value.strip().replace('Z', '+00:00')).timestamp() * 1000))
+    except ValueError:
+        return None
+
+
+def playlist_segments(playlist_path: str) -> Optional[List[Tuple[int, str, Optional[int], int, bool]]]:
+    """
+    Segments listed in a live media playlist
+
+    Returns:
+        [(media sequence number, uri, start_ms or None, duration_ms, discontinuity)],
+        None if the playlist can't be read. Segments without their own
+        PROGRAM-DATE-TIME continue from the previous one.
+    """
+    try:
+        with open(playlist_path, 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    segments = []
+    msn = 0
+    start_ms = None
+    duration_ms = 0
+    discontinuity = False
+    for line in lines:
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            msn = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            start_ms = parse_program_date_time(line.split(':', 1)[1])
+        elif line.startswith('#EXTINF:'):
+            duration_ms = int(round(float(line.split(':', 1)[1].split(',')[0]) * 1000))
+        elif line == '#EXT-X-DISCONTINUITY':
+            discontinuity = True
+        elif line and not line.startswith('#'):
+            segments.append((msn, line, start_ms, duration_ms, discontinuity))
+            msn += 1
+            if start_ms is not None:
+                start_ms += duration_ms
+            discontinuity = False
+    return segments
+
+
+def hour_key(start_ms: int) -> str:
+    """YYYYMMDD/HH (local time) directory a segment is archived under"""
+    return time.strftime('%Y%m%d/%H', time.localtime(start_ms / 1000))
+
+
+def format_program_date_time(start_ms: int) -> str:
+    return datetime.fromtimestamp(start_ms / 1000).astimezone().isoformat(timespec='milliseconds')
+
+
+class CameraArchive:
+    """Time index of one camera's archived segments (parallel arrays sorted by start)"""
+
+    def __init__(self, camera_dir: str):
+        self.camera_dir = camera_dir
+        self.starts = array('q')
+        self.durations = array('I')
+        self.sizes = array('I')
+        self.flags = array('H')
+        self.total_bytes = 0
+
+        self.index_offsets: Dict[str, int] = {}  # hour key -> bytes of index.bin read
+        self.last_refresh = 0.0
+
+        # Archiver position in the live playlist
+        self.playlist_mtime = None
+        self.last_msn = None
+
+    def end_ms(self) -> Optional[int]:
+        return self.starts[-1] + self.durations[-1] if self.starts else None
+
+    def append(self, start_ms: int, duration_ms: int, size: int, flags: int):
+        self.starts.append(start_ms)
+        self.durations.append(duration_ms)
+        self.sizes.append(size)
+        self.flags.append(flags)
+        self.total_bytes += size
+
+    def trim_before(self, start_ms: int) -> int:
+        """Drop index entries older than start_ms, returns how many"""
+        count = bisect_left(self.starts, start_ms)
+        if count:
+            self.total_bytes -= sum(self.sizes[:count])
+            for values in (self.starts, self.durations, self.sizes, self.flags):
+                del values[:count]
+        return count
+
+    def read_indexes(self):
+        """Load index records appended since the last read (all of them the first time)"""
+        try:
+            days = sorted(d for d in os.listdir(self.camera_dir) if d.isdigit())
+        except OSError:
+            return
+        newest = max(self.index_offsets) if self.index_offsets else ''
+        for day in days:
+            if day < newest[:8]:
+                continue
+            try:
+                hours = sorted(h for h in os.listdir(os.path.join(self.camera_dir, day)) if h.isdigit())
+            except OSError:
+                continue
+            for hour in hours:
+                key = f'{day}/{hour}'
+                if key < newest:
+                    continue
+                offset = self.index_offsets.get(key, 0)
+                try:
+                    with open(os.path.join(self.camera_dir, key, INDEX_FILE), 'rb') as f:
+                        f.seek(offset)
+                        data = f.read()
+                except OSError:
+                    continue
+                # A record still being written is picked up by the next read
+                data = data[:len(data) - len(data) % RECORD.size]
+                last = self.starts[-1] if self.starts else None
+                for start_ms, duration_ms, size, flags in RECORD.iter_unpack(data):
+                    if last is None or start_ms > last:
+                        self.append(start_ms, duration_ms, size, flags)
+                        last = start_ms
+                self.index_offsets[key] = offset + len(data)
+
+        watermark = self.read_watermark()
+        if watermark is not None:
+            self.trim_before(watermark)
+            for key in [k for k in self.index_offsets if k < hour_key(watermark)]:
+                del self.index_offsets[key]
+
+    def read_watermark(self) -> Optional[int]:
+        try:
+            with open(os.path.join(self.camera_dir, WATERMARK_FILE), 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def write_watermark(self, start_ms: int):
+        tmp_path = os.path.join(self.camera_dir, WATERMARK_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(str(start_ms))
+        os.replace(tmp_path, os.path.join(self.camera_dir, WATERMARK_FILE))
+
+    def window(self, start_ms: int, end_ms: int) -> Tuple[int, int]:
+        """Index range [lo, hi) of the segments overlapping [start_ms, end_ms)"""
+        lo = bisect_right(self.starts, start_ms) - 1
+        if lo < 0 or self.starts[lo] + self.durations[lo] <= start_ms:
+            lo += 1
+        hi = bisect_left(self.starts, end_ms)
+        return lo, max(lo, hi)
+
+
+class DVRArchive:
+    """Archives live HLS segments per camera and serves time-indexed lookups and VOD playlists"""
+
+    def __init__(self, archive_dir: str, hls_dir: str, max_bytes_per_camera: int = 20 * 1024 ** 3,
+                 check_interval: float = 1.0, read_only: bool = False, refresh_interval: float = 1.0):
+        """
+        Initialize DVR archive
+
+        Args:
+            archive_dir: Root of the archive (camera_<id>/YYYYMMDD/HH/...)
+            hls_dir: Root HLS directory (live playlists at stream_<id>/playlist.m3u8)
+            max_bytes_per_camera: Disk budget per camera; the oldest segments are deleted beyond it
+            check_interval: Seconds between live playlist checks
+            read_only: Process that only serves the archive (the ingest daemon writes it)
+            refresh_interval: Minimum seconds between index re-reads in read-only mode
+        """
+        self.archive_dir = archive_dir
+        self.hls_dir = hls_dir
+        self.max_bytes_per_camera = max_bytes_per_camera
+        self.check_interval = check_interval
+        self.read_only = read_only
+        self.refresh_interval = refresh_interval
+
+        self.cameras: Dict[int, CameraArchive] = {}
+        self.lock = threading.RLock()
+        self.running = False
+        self.thread = None
+
+        self.archived = 0
+        self.evicted = 0
+        self.missed = 0  # Segments deleted by ffmpeg before they could be linked
+
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def camera_dir(self, camera_id: int) -> str:
+        return os.path.join(self.archive_dir, f'camera_{camera_id}')
+
+    def _camera(self, camera_id: int) -> CameraArchive:
+        """Loaded index of a camera, refreshed from disk in read-only mode (lock held)"""
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            camera = self.cameras[camera_id] = CameraArchive(self.camera_dir(camera_id))
+            camera.read_indexes()
+            camera.last_refresh = time.time()
+        elif self.read_only and time.time() - camera.last_refresh >= self.refresh_interval:
+            camera.read_indexes()
+            camera.last_refresh = time.time()
+        return camera
+
+    def camera_ids(self) -> List[int]:
+        camera_ids = set(self.cameras)
+        for name in os.listdir(self.archive_dir):
+            if name.startswith('camera_'):
+                try:
+                    camera_ids.add(int(name.split('_', 1)[1]))
+                except ValueError:
+                    pass
+        return sorted(camera_ids)
+
+    # ------------------------------------------------------------------
+    # Archiving
+    # ------------------------------------------------------------------
+
+    def start(self, camera_ids: Callable[[], Iterable[int]]):
+        """
+        Start following live playlists
+
+        Args:
+            camera_ids: Returns the cameras whose streams are currently running
+        """
+        if self.read_only or self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._archive_loop, args=(camera_ids,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _archive_loop(self, camera_ids: Callable[[], Iterable[int]]):
+        while self.running:
+            for camera_id in list(camera_ids()):
+                try:
+                    self.archive_camera(camera_id)
+                except Exception as e:
+                    print(f"⚠️  DVR archiving failed for camera {camera_id}: {e}")
+            time.sleep(self.check_interval)
+
+    def archive_camera(self, camera_id: int) -> int:
+        """Link segments the live playlist gained since the last check, returns how many"""
+        playlist_path = os.path.join(self.hls_dir, f'stream_{camera_id}', 'playlist.m3u8')
+        try:
+            mtime = os.path.getmtime(playlist_path)
+        except OSError:
+            return 0
+
+        with self.lock:
+            camera = self._camera(camera_id)
+            if mtime == camera.playlist_mtime:
+                return 0
+            camera.playlist_mtime = mtime
+
+        segments = playlist_segments(playlist_path) or []
+        added = 0
+        for msn, uri, start_ms, duration_ms, discontinuity in segments:
+            if start_ms is None:
+                continue  # Without program_date_time a segment can't be placed in time
+            with self.lock:
+                last_start = camera.starts[-1] if camera.starts else None
+                if last_start is not None and start_ms <= last_start:
+                    continue  # Already archived (also after a server restart)
+                end_ms = camera.end_ms()
+                restarted = camera.last_msn is not None and msn <= camera.last_msn
+                if discontinuity or restarted or end_ms is None or abs(start_ms - end_ms) > GAP_TOLERANCE_MS:
+                    flags = FLAG_DISCONTINUITY
+                else:
+                    flags = 0
+
+            size = self._link_segment(camera, os.path.join(os.path.dirname(playlist_path), uri), start_ms,
+                                      duration_ms, flags)
+            with self.lock:
+                camera.last_msn = msn
+                if size is None:
+                    self.missed += 1
+                    continue
+                camera.append(start_ms, duration_ms, size, flags)
+                self.archived += 1
+                added += 1
+
+        if added:
+            self._enforce_budget(camera)
+        return added
+
+    def _link_segment(self, camera: CameraArchive, source: str, start_ms: int, duration_ms: int,
+                      flags: int) -> Optional[int]:
+        """Hard-link (or copy across filesystems) a live segment and index it, returns its size"""
+        key = hour_key(start_ms)
+        hour_dir = os.path.join(camera.camera_dir, key)
+        os.makedirs(hour_dir, exist_ok=True)
+        target = os.path.join(hour_dir, f'{start_ms}.ts')
+        try:
+            try:
+                os.link(source, target)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(source, target)
+            size = os.path.getsize(target)
+        except OSError:
+            return None
+
+        record = RECORD.pack(start_ms, duration_ms, size, flags)
+        with open(os.path.join(hour_dir, INDEX_FILE), 'ab') as f:
+            f.write(record)
+        with self.lock:
+            camera.index_offsets[key] = camera.index_offsets.get(key, 0) + len(record)
+        return size
+
+    def _enforce_budget(self, camera: CameraArchive):
+        """Delete the oldest segments until the camera fits its byte budget"""
+        with self.lock:
+            excess = camera.total_bytes - self.max_bytes_per_camera
+            if excess <= 0 or len(camera.starts) < 2:
+                return
+            count = 0
+            while excess > 0 and count < len(camera.starts) - 1:
+                excess -= camera.sizes[count]
+                count += 1
+            evicted = list(camera.starts[:count])
+            retained_from = camera.starts[count]
+            camera.trim_before(retained_from)
+            self.evicted += count
+
+        camera.write_watermark(retained_from)
+        for start_ms in evicted:
+            try:
+                os.remove(os.path.join(camera.camera_dir, hour_key(start_ms), f'{start_ms}.ts'))
+            except OSError:
+                pass
+
+        # Hours (and days) entirely before the oldest kept segment go as a whole
+        first_hour = hour_key(retained_from)
+        for key in sorted({hour_key(start_ms) for start_ms in evicted}):
+            if key < first_hour:
+                shutil.rmtree(os.path.join(camera.camera_dir, key), ignore_errors=True)
+                with self.lock:
+                    camera.index_offsets.pop(key, None)
+                day_dir = os.path.join(camera.camera_dir, key[:8])
+                try:
+                    os.rmdir(day_dir)  # Only succeeds once the day is empty
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def segment_path(self, camera_id: int, start_ms: int) -> Optional[str]:
+        """File of the archived segment starting at start_ms, None if it isn't in the index"""
+        with self.lock:
+            camera = self._camera(camera_id)
+            i = bisect_left(camera.starts, start_ms)
+            if i == len(camera.starts) or camera.starts[i] != start_ms:
+                return None
+        return os.path.join(camera.camera_dir, hour_key(start_ms), f'{start_ms}.ts')
+
+    def seek(self, camera_id: int, timestamp_ms: int) -> Optional[Dict]:
+        """
+        Segment holding a timestamp
+
+        Returns:
+            {'start_ms', 'duration_ms', 'offset_ms', 'exact'}; when the
+            timestamp falls in a gap the next archived segment is returned
+            with exact=False. None if nothing is archived at or after it.
+        """
+        with self.lock:
+            camera = self._camera(camera_id)
+            i = bisect_right(camera.starts, timestamp_ms) - 1
+            if i >= 0 and timestamp_ms < camera.starts[i] + camera.durations[i]:
+                exact = True
+            else:
+                i += 1
+                exact = False
+            if i >= len(camera.starts):
+                return None
+            start_ms, duration_ms = camera.starts[i], camera.durations[i]
+        return {
+            'start_ms': start_ms,
+            'duration_ms': duration_ms,
+            'offset_ms': max(0, timestamp_ms - start_ms),
+            'exact': exact,
+        }
+
+    def vod_playlist(self, camera_id: int, start_ms: int, end_ms: int,
+                     segment_url: Callable[[int], str]) -> Optional[str]:
+        """
+        VOD media playlist for the archived segments overlapping [start_ms, end_ms)
+
+        Args:
+            segment_url: Maps a segment's start_ms to the URI written in the playlist
+
+        Returns:
+            Playlist text, None if no archived segment overlaps the window
+        """
+        with self.lock:
+            camera = self._camera(camera_id)
+            lo, hi = camera.window(start_ms, end_ms)
+            if lo == hi:
+                return None
+            starts = camera.starts[lo:hi]
+            durations = camera.durations[lo:hi]
+            flags = camera.flags[lo:hi]
+
+        target_duration = max(1, int(-(-max(durations) // 1000)))
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:6',
+            '#EXT-X-PLAYLIST-TYPE:VOD',
+            f'#EXT-X-TARGETDURATION:{target_duration}',
+            '#EXT-X-MEDIA-SEQUENCE:0',
+            '#EXT-X-INDEPENDENT-SEGMENTS',
+        ]
+        if start_ms > starts[0]:
+            # Start playback at the requested time rather than the segment boundary
+            lines.append(f'#EXT-X-START:TIME-OFFSET={(start_ms - starts[0]) / 1000:.3f},PRECISE=YES')
+
+        previous_end = None
+        for segment_start, duration_ms, segment_flags in zip(starts, durations, flags):
+            if previous_end is not None and (segment_flags & FLAG_DISCONTINUITY or
+                                             abs(segment_start - previous_end) > GAP_TOLERANCE_MS):
+                lines.append('#EXT-X-DISCONTINUITY')
+                previous_end = None
+            if previous_end is None:
+                lines.append(f'#EXT-X-PROGRAM-DATE-TIME:{format_program_date_time(segment_start)}')
+            lines.append(f'#EXTINF:{duration_ms / 1000:.3f},')
+            lines.append(segment_url(segment_start))
+            previous_end = segment_start + duration_ms
+        lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def stats(self, camera_id: int = None) -> Dict:
+        """Archived range, segment count and bytes for one camera, or all cameras plus totals"""
+        if camera_id is None:
+            cameras = {cid: self.stats(cid) for cid in self.camera_ids()}
+            return {
+                'max_bytes_per_camera': self.max_bytes_per_camera,
+                'read_only': self.read_only,
+                'archived': self.archived,
+                'evicted': self.evicted,
+                'missed': self.missed,
+                'cameras': cameras,
+            }
+
+        with self.lock:
+            camera = self._camera(camera_id)
+            if not camera.starts:
+                return {'camera_id': camera_id, 'segments': 0, 'bytes': 0}
+            earliest, latest = camera.starts[0], camera.end_ms()
+            return {
+                'camera_id': camera_id,
+                'segments': len(camera.starts),
+                'bytes': camera.total_bytes,
+                'budget_used': round(camera.total_bytes / self.max_bytes_per_camera, 4),
+                'earliest': format_program_date_time(earliest),
+                'latest': format_program_date_time(latest),
+                'archived_seconds': round(sum(camera.durations) / 1000, 1),
+                'span_seconds': round((latest - earliest) / 1000, 1),
+                'discontinuities': sum(1 for f in camera.flags if f & FLAG_DISCONTINUITY),
+            }
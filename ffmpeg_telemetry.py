@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+ffmpeg_telemetry.py
+Live ingest telemetry from ffmpeg's -progress channel, plus a size-capped
+ffmpeg log
+
+ffmpeg is started with `-progress pipe:<fd> -nostats`: every stats period
+it writes a block of key=value lines (frame, fps, bitrate, speed,
+drop_frames, dup_frames, out_time_us, ... progress=continue) to a pipe,
+which is parsed into per-camera snapshots with a short history. -nostats
+also keeps the carriage-return status line out of stderr, which is copied
+into stream_<id>/ffmpeg.log with rotation.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, IO, Optional
+
+STATS_PERIOD = 5  # Seconds between progress blocks (ffmpeg -stats_period)
+
+
+def parse_number(value: Optional[str], suffix: str = '') -> Optional[float]:
+    """Numeric value of a progress field ('1.02x', '1834.2kbits/s'), None for N/A or missing"""
+    if value is None:
+        return None
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_progress_block(fields: Dict[str, str]) -> Dict:
+    """Snapshot dict from one -progress block"""
+    out_time_us = parse_number(fields.get('out_time_us'))
+    frame = parse_number(fields.get('frame'))
+    total_size = parse_number(fields.get('total_size'))
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'frame': int(frame) if frame is not None else None,
+        'fps': parse_number(fields.get('fps')),
+        'bitrate_kbps': parse_number(fields.get('bitrate'), 'kbits/s'),
+        'speed': parse_number(fields.get('speed'), 'x'),
+        'drop_frames': int(parse_number(fields.get('drop_frames')) or 0),
+        'dup_frames': int(parse_number(fields.get('dup_frames')) or 0),
+        'out_time_seconds': round(out_time_us / 1_000_000, 3) if out_time_us is not None else None,
+        'total_size': int(total_size) if total_size is not None else None,
+        'progress': fields.get('progress'),
+    }
+
+
+class RotatingLog:
+    """Append-only text log that rotates to .1, .2, ... once it reaches max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int = 1_000_000, backup_count: int = 2):
+        """
+        Initialize rotating log
+
+        Args:
+            path: Log file path
+            max_bytes: Size at which the log is rotated
+            backup_count: Rotated files kept (path.1 is the most recent)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = open(path, 'a')
+        self.size = self.file.tell()
+
+    def _rotate(self):
+        self.file.close()
+        for idx in range(self.backup_count - 1, 0, -1):
+            src = f'{self.path}.{idx}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{idx + 1}')
+        if self.backup_count > 0:
+            os.replace(self.path, f'{self.path}.1')
+        self.file = open(self.path, 'w')
+        self.size = 0
+
+    def write(self, text: str):
+        if self.size + len(text) > self.max_bytes:
+            self._rotate()
+        self.file.write(text)
+        self.file.flush()
+        self.size += len(text)
+
+    def close(self):
+        self.file.close()
+
+
+class IngestTelemetry:
+    """Per-camera ffmpeg progress snapshots and log capture"""
+
+    def __init__(self, history_size: int = 120, log_max_bytes: int = 1_000_000, log_backups: int = 2):
+        """
+        Initialize ingest telemetry
+
+        Args:
+            history_size: Snapshots kept per camera (120 x 5s = 10 minutes)
+            log_max_bytes: Size at which stream_<id>/ffmpeg.log rotates
+            log_backups: Rotated ffmpeg logs kept per camera
+        """
+        self.history_size = history_size
+        self.log_max_bytes = log_max_bytes
+        self.log_backups = log_backups
+        self.cameras: Dict[int, Dict] = {}
+        self.lock = threading.Lock()
+
+    def attach(self, camera_id: int, progress_stream: IO, log_stream: IO, log_path: str):
+        """
+        Start reading a freshly started ffmpeg's progress and stderr
+
+        Args:
+            camera_id: Camera the process belongs to
+            progress_stream: Read end of the -progress pipe (text mode)
+            log_stream: ffmpeg stderr (binary)
+            log_path: Where stderr is written, with rotation
+        """
+        with self.lock:
+            state = self.cameras.setdefault(camera_id, {
+                'history': deque(maxlen=self.history_size),
+                'starts': 0,
+            })
+            state['started_at'] = time.time()
+            state['starts'] += 1
+            state['latest'] = None
+
+        threading.Thread(target=self._read_progress, args=(camera_id, progress_stream), daemon=True).start()
+        threading.Thread(target=self._copy_log, args=(log_stream, log_path), daemon=True).start()
+
+    def _read_progress(self, camera_id: int, stream: IO):
+        fields = {}
+        try:
+            for line in stream:
+                key, sep, value = line.strip().partition('=')
+                if not sep:
+                    continue
+                fields[key] = value
+                # 'progress' is the last key of every block
+                if key == 'progress':
+                    snapshot = parse_progress_block(fields)
+                    with self.lock:
+                        state = self.cameras.get(camera_id)
+                        if state is None:
+                            break  # Camera removed from the configuration
+                        state['latest'] = snapshot
+                        state['history'].append(snapshot)
+        except Exception as e:
+            print(f"⚠️  Progress reader for camera {camera_id} stopped: {e}")
+        finally:
+            stream.close()
+
+    def _copy_log(self, stream: IO, log_path: str):
+        log = RotatingLog(log_path, self.log_max_bytes, self.log_backups)
+        try:
+            for line in stream:
+                log.write(line.decode('utf-8', errors='replace'))
+        except Exception as e:
+            print(f"⚠️  ffmpeg log copy to {log_path} stopped: {e}")
+        finally:
+            log.close()
+            stream.close()
+
+    def forget(self, camera_id: int):
+        """Drop the snapshots of a camera removed from the configuration"""
+        with self.lock:
+            self.cameras.pop(camera_id, None)
+
+    def latest(self, camera_id: int, history: bool = False) -> Optional[Dict]:
+        """Latest snapshot for a camera, optionally with its history (oldest first)"""
+        with self.lock:
+            state = self.cameras.get(camera_id)
+            if state is None:
+                return None
+            result = {
+                'camera_id': camera_id,
+                'latest': state['latest'],
+                'starts': state['starts'],
+                'seconds_since_start': round(time.time() - state['started_at'], 1),
+            }
+            if history:
+                result['history'] = list(state['history'])
+            return result
+
+    def summary(self) -> Dict:
+        """Latest snapshot for every camera"""
+        with self.lock:
+            camera_ids = list(self.cameras.keys())
+        return {camera_id: self.latest(camera_id) for camera_id in camera_ids}
@@ -0,0 +1,50 @@
+"""
+gunicorn.conf.py
+Production server settings for camera_server (gunicorn -c gunicorn.conf.py wsgi:app)
+
+gthread workers: every viewer keeps connections open for playlists,
+segments and blocking LL-HLS reloads, and chat answers are streamed over
+SSE, so concurrency comes from threads. With the default role (all),
+streams, summarizers and their in-memory state live in a single process,
+so CAMERA_SERVER_WORKERS is forced to 1. To scale the HTTP tier, run
+ingest_daemon.py separately and start gunicorn with CAMERA_SERVER_ROLE=api:
+every worker then reads the daemon's shared state and any number of
+workers can be used.
+
+Environment:
+    CAMERA_SERVER_ROLE      (default all; api when ingest_daemon.py runs)
+    CAMERA_SERVER_BIND      (default 0.0.0.0:8080)
+    CAMERA_SERVER_WORKERS   (default 1; only used with CAMERA_SERVER_ROLE=api)
+    CAMERA_SERVER_THREADS   (default 32)
+    CAMERA_SERVER_TIMEOUT   (default 120)
+"""
+
+import os
+
+bind = os.environ.get('CAMERA_SERVER_BIND', '0.0.0.0:8080')
+worker_class = 'gthread'
+workers = int(os.environ.get('CAMERA_SERVER_WORKERS', '1'))
+threads = int(os.environ.get('CAMERA_SERVER_THREADS', '32'))
+
+# Workers without the startup lock would have no streams or summarizers and
+# answer those endpoints with 503s or empty results
+if os.environ.get('CAMERA_SERVER_ROLE', 'all') == 'all' and workers > 1:
+    print(f"⚠️  CAMERA_SERVER_WORKERS={workers} needs CAMERA_SERVER_ROLE=api and ingest_daemon.py; "
+          f"starting 1 worker")
+    workers = 1
+
+# gthread workers heartbeat from their main thread, so this only catches a
+# hung worker, not a long SSE answer or blocking playlist reload
+timeout = int(os.environ.get('CAMERA_SERVER_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5  # hls.js reuses connections for playlist polling
+
+# Import the app in each worker, not the master: the services start threads
+# and child processes that must not be forked
+preload_app = False
+
+
+def worker_exit(server, worker):
+    """Stop ffmpeg and capture services with the worker that owns them"""
+    import camera_server
+    camera_server.cleanup_streams()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+hls_ladder.py
+Two-rung adaptive bitrate ladder for camera HLS output
+
+The full rendition stays at stream_<id>/playlist.m3u8 (so frame capture and
+existing players are unaffected) and a low-resolution rendition for grid
+tiles is written to stream_<id>/low/playlist.m3u8 by the same ffmpeg
+process. master.m3u8 lists both so players can switch between them.
+
+When a camera exposes its own substream, the low rung copies it instead of
+scaling and encoding the main stream.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from stream_probe import choose_encoding
+
+LOW_VARIANT_DIR = 'low'
+LOW_VARIANT_HEIGHT = 360
+LOW_VARIANT_BITRATE = 300_000
+
+# Advertised bandwidth of the full rung when it is stream-copied and the
+# camera does not report a bitrate
+COPY_BANDWIDTH_ESTIMATE = 4_000_000
+TRANSCODE_BANDWIDTH = 1_500_000  # Matches -maxrate of the transcode settings
+AUDIO_BANDWIDTH = 128_000
+
+
+def scaled_resolution(video: Optional[Dict], height: int) -> Tuple[int, int]:
+    """Width x height after scaling to `height` with the source aspect ratio (even width)"""
+    if video and video.get('width') and video.get('height'):
+        width = int(round(video['width'] * height / video['height'] / 2)) * 2
+        return width, height
+    return height * 16 // 9, height
+
+
+def low_variant_args(main_info: Optional[Dict], sub_url: Optional[str], sub_info: Optional[Dict],
+                     audio_args: List[str]) -> Tuple[List[str], List[str], Dict]:
+    """
+    ffmpeg arguments for the low rung
+
+    Args:
+        main_info: probe_stream() result for the main stream (input 0)
+        sub_url: Camera substream URL, if the camera has one (becomes input 1)
+        sub_info: probe_stream() result for the substream
+        audio_args: Audio codec arguments used for the full rung
+
+    Returns:
+        (extra input arguments, output arguments before the HLS options, variant description)
+    """
+    sub_encoding = choose_encoding(sub_info) if sub_url else None
+
+    if sub_encoding and sub_encoding['video'] == 'copy':
+        video = (sub_info or {}).get('video') or {}
+        inputs = ['-rtsp_transport', 'tcp', '-i', sub_url]
+        # Audio comes from the main stream so both rungs carry the same tracks
+        # (players can't add an audio buffer mid-stream when switching up)
+        output = ['-map', '1:v:0', '-map', '0:a:0?', '-c:v', 'copy', *audio_args]
+        resolution = (video.get('width'), video.get('height'))
+        bandwidth = COPY_BANDWIDTH_ESTIMATE // 4
+        source = 'substream copy'
+    else:
+        inputs = []
+        output = [
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-vf', f'scale=-2:{LOW_VARIANT_HEIGHT}',
+            '-c:v', 'libx264',
+            '-preset', 'ultrafast',
+            '-b:v', str(LOW_VARIANT_BITRATE),
+            '-maxrate', str(LOW_VARIANT_BITRATE * 4 // 3),
+            '-bufsize', str(LOW_VARIANT_BITRATE * 2),
+            '-g', '20',
+            *audio_args,
+        ]
+        resolution = scaled_resolution((main_info or {}).get('video'), LOW_VARIANT_HEIGHT)
+        bandwidth = LOW_VARIANT_BITRATE * 4 // 3
+        source = 'scaled transcode'
+
+    if '-an' not in output:
+        bandwidth += AUDIO_BANDWIDTH
+    return inputs, output, {'resolution': resolution, 'bandwidth': bandwidth, 'source': source}
+
+
+def full_variant(info: Optional[Dict], encoding: Dict) -> Dict:
+    """Description of the full rung for the master playlist"""
+    video = (info or {}).get('video') or {}
+    bandwidth = COPY_BANDWIDTH_ESTIMATE if encoding['video'] == 'copy' else TRANSCODE_BANDWIDTH
+    if encoding['audio'] != 'none':
+        bandwidth += AUDIO_BANDWIDTH
+    return {'resolution': (video.get('width'), video.get('height')), 'bandwidth': bandwidth}
+
+
+def write_master_playlist(stream_dir: str, full: Dict, low: Dict) -> str:
+    """Write master.m3u8 listing the low and full renditions, returns its path"""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for variant, uri in ((low, f'{LOW_VARIANT_DIR}/playlist.m3u8'), (full, 'playlist.m3u8')):
+        attributes = f"BANDWIDTH={variant['bandwidth']}"
+        width, height = variant['resolution']
+        if width and height:
+            attributes += f",RESOLUTION={width}x{height}"
+        lines += [f'#EXT-X-STREAM-INF:{attributes}', uri]
+
+    master_path = os.path.join(stream_dir, 'master.m3u8')
+    tmp_path = master_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, master_path)
+    return master_path
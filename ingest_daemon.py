@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+ingest_daemon.py
+Runs camera ingest and analysis without the HTTP tier
+
+    python ingest_daemon.py
+    CAMERA_SERVER_ROLE=api CAMERA_SERVER_WORKERS=4 gunicorn -c gunicorn.conf.py wsgi:app
+
+Starts the ffmpeg streams, stream supervisor, summarizers, frame capture,
+analytics and semantic indexing, and publishes stream health/telemetry and
+summary/index/clip events to camera_server.SHARED_STATE. API workers run
+with CAMERA_SERVER_ROLE=api and read that state instead of starting their
+own services, so they can be scaled independently.
+"""
+
+import os
+import signal
+import threading
+
+os.environ.setdefault('CAMERA_SERVER_ROLE', 'ingest')
+
+import camera_server
+
+
+def main():
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+
+    if not camera_server.start_services():
+        print("✗ Ingest services are already running in another process")
+        return 1
+
+    print(f"✓ Ingest daemon running (pid {os.getpid()}), publishing to {camera_server.SHARED_STATE_DB}")
+    stopping.wait()
+
+    print("Stopping ingest services...")
+    camera_server.cleanup_streams()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
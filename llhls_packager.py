@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+llhls_packager.py
+Low-latency HLS (LL-HLS) packager fed by ffmpeg fragmented-MP4 output
+
+ffmpeg writes fragmented MP4 (one moof+mdat every ~PART_TARGET seconds, not
+tied to keyframes) to a pipe. Each fragment becomes an LL-HLS partial
+segment; fragments are grouped into full segments that start on a video
+keyframe. The playlist carries EXT-X-PART, EXT-X-PRELOAD-HINT and
+EXT-X-SERVER-CONTROL so players can request the next part before it exists
+and use blocking playlist reload (_HLS_msn/_HLS_part), which serve_hls
+answers through wait_for().
+
+Layout (stream_<id>/ll/):
+    init.mp4                 ftyp+moov initialization section
+    part_<msn>_<n>.m4s       partial segments (recent segments only)
+    seg_<msn>.m4s            complete segments (concatenated parts)
+    playlist.m3u8
+"""
+
+import os
+import math
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+LL_DIR = 'll'
+
+# trun / tfhd flag bits (ISO/IEC 14496-12)
+TRUN_DATA_OFFSET = 0x1
+TRUN_FIRST_SAMPLE_FLAGS = 0x4
+TRUN_SAMPLE_DURATION = 0x100
+TRUN_SAMPLE_SIZE = 0x200
+TRUN_SAMPLE_FLAGS = 0x400
+TRUN_SAMPLE_CTO = 0x800
+TFHD_BASE_DATA_OFFSET = 0x1
+TFHD_SAMPLE_DESCRIPTION = 0x2
+TFHD_DEFAULT_DURATION = 0x8
+TFHD_DEFAULT_SIZE = 0x10
+TFHD_DEFAULT_FLAGS = 0x20
+SAMPLE_IS_NON_SYNC = 0x10000
+
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'mvex', b'moof', b'traf'}
+
+
+def iter_boxes(data: bytes, offset: int = 0, end: int = None) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, box_end) for boxes in data[offset:end]"""
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def find_box(data: bytes, path: List[bytes], offset: int = 0, end: int = None) -> List[Tuple[int, int]]:
+    """All (payload_start, box_end) spans matching a box path like [b'trak', b'tkhd']"""
+    matches = []
+    for box_type, start, box_end in iter_boxes(data, offset, end):
+        if box_type != path[0]:
+            continue
+        if len(path) == 1:
+            matches.append((start, box_end))
+        elif box_type in CONTAINER_BOXES:
+            matches.extend(find_box(data, path[1:], start, box_end))
+    return matches
+
+
+def read_box(stream: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    """Read one top-level box from a stream, returns (type, full box bytes) or None at EOF"""
+    header = stream.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack('>I4s', header)
+    if size == 1:
+        large = stream.read(8)
+        size = struct.unpack('>Q', large)[0]
+        header += large
+    if size == 0:
+        return box_type, header + stream.read()
+    body = stream.read(size - len(header))
+    if len(body) < size - len(header):
+        return None
+    return box_type, header + body
+
+
+def parse_init(init: bytes) -> Dict:
+    """Video track id, its timescale and trex defaults from ftyp+moov"""
+    info = {'track_id': None, 'timescale': 90000, 'default_duration': 0, 'default_flags': 0}
+    for trak_start, trak_end in find_box(init, [b'moov', b'trak']):
+        handler = find_box(init, [b'mdia', b'hdlr'], trak_start, trak_end)
+        if not handler or init[handler[0][0] + 8:handler[0][0] + 12] != b'vide':
+            continue
+        tkhd_start, _ = find_box(init, [b'tkhd'], trak_start, trak_end)[0]
+        version = init[tkhd_start]
+        info['track_id'] = struct.unpack_from('>I', init, tkhd_start + (20 if version == 1 else 12))[0]
+        mdhd_start, _ = find_box(init, [b'mdia', b'mdhd'], trak_start, trak_end)[0]
+        version = init[mdhd_start]
+        info['timescale'] = struct.unpack_from('>I', init, mdhd_start + (20 if version == 1 else 12))[0]
+        break
+
+    for trex_start, _ in find_box(init, [b'moov', b'mvex', b'trex']):
+        track_id, _, duration, _, flags = struct.unpack_from('>IIIII', init, trex_start + 4)
+        if track_id == info['track_id']:
+            info['default_duration'] = duration
+            info['default_flags'] = flags
+    return info
+
+
+def parse_fragment(moof: bytes, init_info: Dict) -> Tuple[float, bool]:
+    """(duration in seconds, starts with a video keyframe) of a moof's video run"""
+    for traf_start, traf_end in find_box(moof, [b'moof', b'traf']):
+        tfhd_start, _ = find_box(moof, [b'tfhd'], traf_start, traf_end)[0]
+        tfhd_flags = struct.unpack_from('>I', moof, tfhd_start)[0] & 0xFFFFFF
+        track_id = struct.unpack_from('>I', moof, tfhd_start + 4)[0]
+        if track_id != init_info['track_id']:
+            continue
+
+        pos = tfhd_start + 8
+        if tfhd_flags & TFHD_BASE_DATA_OFFSET:
+            pos += 8
+        if tfhd_flags & TFHD_SAMPLE_DESCRIPTION:
+            pos += 4
+        default_duration = init_info['default_duration']
+        default_flags = init_info['default_flags']
+        if tfhd_flags & TFHD_DEFAULT_DURATION:
+            default_duration = struct.unpack_from('>I', moof, pos)[0]
+            pos += 4
+        if tfhd_flags & TFHD_DEFAULT_SIZE:
+            pos += 4
+        if tfhd_flags & TFHD_DEFAULT_FLAGS:
+            default_flags = struct.unpack_from('>I', moof, pos)[0]
+
+        total_duration = 0
+        first_flags = None
+        for trun_start, _ in find_box(moof, [b'trun'], traf_start, traf_end):
+            trun_flags = struct.unpack_from('>I', moof, trun_start)[0] & 0xFFFFFF
+            sample_count = struct.unpack_from('>I', moof, trun_start + 4)[0]
+            pos = trun_start + 8
+            if trun_flags & TRUN_DATA_OFFSET:
+                pos += 4
+            if trun_flags & TRUN_FIRST_SAMPLE_FLAGS:
+                if first_flags is None:
+                    first_flags = struct.unpack_from('>I', moof, pos)[0]
+                pos += 4
+            for sample in range(sample_count):
+                duration = default_duration
+                if trun_flags & TRUN_SAMPLE_DURATION:
+                    duration = struct.unpack_from('>I', moof, pos)[0]
+                    pos += 4
+                if trun_flags & TRUN_SAMPLE_SIZE:
+                    pos += 4
+                if trun_flags & TRUN_SAMPLE_FLAGS:
+                    if first_flags is None and sample == 0:
+                        first_flags = struct.unpack_from('>I', moof, pos)[0]
+                    pos += 4
+                if trun_flags & TRUN_SAMPLE_CTO:
+                    pos += 4
+                total_duration += duration
+
+        if first_flags is None:
+            first_flags = default_flags
+        return total_duration / init_info['timescale'], not (first_flags & SAMPLE_IS_NON_SYNC)
+
+    return 0.0, False
+
+
+def playlist_live_edge(playlist_path: str) -> Optional[Dict]:
+    """
+    Wall-clock age of the newest media in a media playlist
+
+    The live edge is the last EXT-X-PROGRAM-DATE-TIME plus the EXTINF
+    durations that follow it, plus the EXT-X-PART durations of a segment
+    still being filled (LL-HLS). Returns None if the playlist is missing or
+    has no program date time.
+    """
+    try:
+        with open(playlist_path, 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    edge = None
+    pending_parts = 0.0
+    target_duration = 0
+    part_hold_back = None
+    for line in lines:
+        if line.startswith('#EXT-X-TARGETDURATION:'):
+            target_duration = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-SERVER-CONTROL:') and 'PART-HOLD-BACK=' in line:
+            part_hold_back = float(line.split('PART-HOLD-BACK=', 1)[1].split(',')[0])
+        elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            try:
+                edge = datetime.strptime(line.split(':', 1)[1].strip(), '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+            except ValueError:
+                edge = None
+            pending_parts = 0.0
+        elif line.startswith('#EXT-X-PART:') and edge is not None:
+            pending_parts += float(line.split('DURATION=', 1)[1].split(',')[0])
+        elif line.startswith('#EXTINF:') and edge is not None:
+            # A complete segment's EXTINF covers its parts
+            edge += float(line.split(':', 1)[1].split(',')[0])
+            pending_parts = 0.0
+
+    if edge is None:
+        return None
+    edge += pending_parts
+    return {
+        'edge_age': round(time.time() - edge, 3),
+        'target_duration': target_duration,
+        'part_hold_back': part_hold_back,
+        'playlist_age': round(time.time() - os.path.getmtime(playlist_path), 3)
+    }
+
+
+def position_reached(position: Optional[Tuple[int, int]], msn: int, part: Optional[int]) -> bool:
+    """
+    Whether a playlist whose open segment is position = (msn, parts so far)
+    satisfies an _HLS_msn/_HLS_part request
+
+    Without a part, segment `msn` must be complete, as the LL-HLS spec defines
+    _HLS_msn without _HLS_part.
+    """
+    if position is None:
+        return False
+    open_msn, parts = position
+    if msn < open_msn:
+        return True
+    return msn == open_msn and part is not None and part < parts
+
+
+def playlist_position(playlist_path: str) -> Optional[Tuple[int, int]]:
+    """(msn of the open segment, parts published in it) read from an LL-HLS playlist file"""
+    try:
+        with open(playlist_path, 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    media_sequence = 0
+    completed = 0
+    parts = 0
+    for line in lines:
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-PART:'):
+            parts += 1
+        elif line and not line.startswith('#'):
+            completed += 1
+            parts = 0
+    return media_sequence + completed, parts
+
+
+def part_position(name: str) -> Optional[Tuple[int, int]]:
+    """(msn, part index) from a part_<msn>_<n>.m4s file name"""
+    try:
+        _, msn, index = os.path.splitext(name)[0].split('_')
+        return int(msn), int(index)
+    except ValueError:
+        return None
+
+
+def wait_for_playlist(playlist_path: str, msn: int, part: Optional[int], timeout: float,
+                      poll_interval: float = 0.05) -> bool:
+    """
+    Blocking playlist reload for processes without the packager (API workers):
+    polls the playlist file until it reaches (msn, part) or timeout passes
+    """
+    deadline = time.time() + timeout
+    while True:
+        if position_reached(playlist_position(playlist_path), msn, part):
+            return True
+        if time.time() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+class LLHLSPackager:
+    """Turns an fMP4 byte stream into LL-HLS parts, segments and a playlist"""
+
+    def __init__(self, stream_dir: str, part_target: float = 0.5, segment_target: float = 2.0,
+                 window_segments: int = 6):
+        """
+        Initialize LL-HLS packager
+
+        Args:
+            stream_dir: Camera stream directory (output goes to its ll/ subdirectory)
+            part_target: Part duration ffmpeg is asked to fragment at (seconds)
+            segment_target: Minimum full segment duration; segments close on the next keyframe after it
+            window_segments: Complete segments kept in the playlist
+        """
+        self.out_dir = os.path.join(stream_dir, LL_DIR)
+        self.part_target = part_target
+        self.segment_target = segment_target
+        self.window_segments = window_segments
+
+        self.init_info: Optional[Dict] = None
+        self.segments: List[Dict] = []  # Completed segments, oldest first
+        self.current: Optional[Dict] = None  # Segment being filled with parts
+        self.next_msn = 0
+        self.target_duration = math.ceil(segment_target)
+        self.max_part_duration = part_target
+
+        self.last_part_time: Optional[float] = None
+        self.parts_published = 0
+        self.running = False
+        self.thread = None
+        self.cond = threading.Condition()
+
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def start(self, stream: BinaryIO):
+        """Consume ffmpeg's fMP4 output on a background thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(stream,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify_all()
+
+    def _run(self, stream: BinaryIO):
+        init = b''
+        moof = None
+        try:
+            while self.running:
+                box = read_box(stream)
+                if box is None:
+                    break
+                box_type, data = box
+
+                if box_type in (b'ftyp', b'moov'):
+                    init += data
+                    if box_type == b'moov':
+                        self._write_file('init.mp4', init)
+                        self.init_info = parse_init(init)
+                elif box_type == b'moof':
+                    moof = data
+                elif box_type == b'mdat' and moof is not None and self.init_info:
+                    self.add_part(moof + data, *parse_fragment(moof, self.init_info))
+                    moof = None
+        except Exception as e:
+            print(f"✗ LL-HLS packager stopped for {self.out_dir}: {e}")
+        finally:
+            self.running = False
+            with self.cond:
+                self.cond.notify_all()
+
+    def _write_file(self, name: str, data: bytes):
+        path = os.path.join(self.out_dir, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remove_file(self, name: str):
+        try:
+            os.remove(os.path.join(self.out_dir, name))
+        except OSError:
+            pass
+
+    def _new_segment(self) -> Dict:
+        segment = {
+            'msn': self.next_msn,
+            'parts': [],
+            'data': [],
+            'duration': 0.0,
+            'program_date_time': datetime.now().astimezone()
+        }
+        self.next_msn += 1
+        return segment
+
+    def add_part(self, data: bytes, duration: float, independent: bool):
+        """Publish one fragment as a part, closing the current segment on a keyframe boundary"""
+        with self.cond:
+            if self.current is None:
+                # The first segment must start on a keyframe
+                if not independent:
+                    return
+                self.current = self._new_segment()
+            elif independent and self.current['duration'] >= self.segment_target:
+                self._close_segment()
+                self.current = self._new_segment()
+
+            segment = self.current
+            if not segment['parts']:
+                # The part is published when complete; date the segment from its first sample
+                segment['program_date_time'] -= timedelta(seconds=duration)
+            name = f"part_{segment['msn']}_{len(segment['parts'])}.m4s"
+            self._write_file(name, data)
+            segment['parts'].append({'uri': name, 'duration': duration, 'independent': independent})
+            segment['data'].append(data)
+            segment['duration'] += duration
+            self.max_part_duration = max(self.max_part_duration, duration)
+
+            self.last_part_time = time.time()
+            self.parts_published += 1
+            self._write_playlist()
+            self.cond.notify_all()
+
+    def _close_segment(self):
+        segment = self.current
+        self._write_file(f"seg_{segment['msn']}.m4s", b''.join(segment['data']))
+        segment['data'] = []
+        self.segments.append(segment)
+        self.target_duration = max(self.target_duration, math.ceil(segment['duration']))
+
+        while len(self.segments) > self.window_segments:
+            old = self.segments.pop(0)
+            self._remove_file(f"seg_{old['msn']}.m4s")
+
+        # Parts are only listed (and kept) for the last few segments
+        for old in self.segments[:-3]:
+            for part in old['parts']:
+                self._remove_file(part['uri'])
+            old['parts'] = []
+
+    # ------------------------------------------------------------------
+    # Playlist
+    # ------------------------------------------------------------------
+
+    def _part_lines(self, segment: Dict) -> List[str]:
+        lines = []
+        for part in segment['parts']:
+            line = f"#EXT-X-PART:DURATION={part['duration']:.5f},URI=\"{part['uri']}\""
+            if part['independent']:
+                line += ",INDEPENDENT=YES"
+            lines.append(line)
+        return lines
+
+    def _write_playlist(self):
+        part_target = max(self.part_target, self.max_part_duration)
+        segments = self.segments + ([self.current] if self.current else [])
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:9',
+            f'#EXT-X-TARGETDURATION:{self.target_duration}',
+            f'#EXT-X-SERVER-CONTROL:CAN-BLOCK-RELOAD=YES,PART-HOLD-BACK={3 * part_target:.3f}',
+            f'#EXT-X-PART-INF:PART-TARGET={part_target:.5f}',
+            f"#EXT-X-MEDIA-SEQUENCE:{segments[0]['msn']}",
+            '#EXT-X-INDEPENDENT-SEGMENTS',
+            '#EXT-X-MAP:URI="init.mp4"',
+        ]
+        for segment in self.segments:
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{segment['program_date_time'].isoformat(timespec='milliseconds')}")
+            lines.extend(self._part_lines(segment))
+            lines.append(f"#EXTINF:{segment['duration']:.5f},")
+            lines.append(f"seg_{segment['msn']}.m4s")
+
+        if self.current:
+            lines.append(f"#EXT-X-PROGRAM-DATE-TIME:{self.current['program_date_time'].isoformat(timespec='milliseconds')}")
+            lines.extend(self._part_lines(self.current))
+            next_part = f"part_{self.current['msn']}_{len(self.current['parts'])}.m4s"
+            lines.append(f'#EXT-X-PRELOAD-HINT:TYPE=PART,URI="{next_part}"')
+
+        self._write_file('playlist.m3u8', ('\n'.join(lines) + '\n').encode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # Blocking reload support
+    # ------------------------------------------------------------------
+
+    def _has(self, msn: int, part: Optional[int]) -> bool:
+        if self.current is None:
+            return False
+        return position_reached((self.current['msn'], len(self.current['parts'])), msn, part)
+
+    def wait_for(self, msn: int, part: Optional[int] = None, timeout: float = None) -> bool:
+        """Block until media sequence `msn` (and part `part` of it) is in the playlist"""
+        timeout = timeout if timeout is not None else 3 * self.target_duration
+        deadline = time.time() + timeout
+        with self.cond:
+            while not self._has(msn, part):
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.running:
+                    return self._has(msn, part)
+                self.cond.wait(remaining)
+            return True
+
+    def wait_for_part_file(self, name: str, timeout: float = None) -> bool:
+        """Block until a hinted part_<msn>_<n>.m4s has been written"""
+        position = part_position(name)
+        return self.wait_for(*position, timeout) if position else False
+
+    def next_position(self) -> Tuple[int, int]:
+        """(msn, part) that the next published part will have"""
+        with self.cond:
+            if self.current is None:
+                return self.next_msn, 0
+            return self.current['msn'], len(self.current['parts'])
+
+    def stats(self) -> Dict:
+        with self.cond:
+            part_target = max(self.part_target, self.max_part_duration)
+            return {
+                'running': self.running,
+                'parts_published': self.parts_published,
+                'media_sequence': self.current['msn'] if self.current else None,
+                'part_target': round(part_target, 3),
+                'target_duration': self.target_duration,
+                'part_hold_back': round(3 * part_target, 3),
+                'last_part_age': round(time.time() - self.last_part_time, 3) if self.last_part_time else None
+            }
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+load_test.py
+Requests/sec and latency percentiles of a running camera server under
+concurrent viewers and chat users
+
+Each worker thread repeatedly fetches the camera's live playlist, the
+newest segment it lists, and every --chat-every iterations posts a chat
+search. Run it once against the development server and once against
+gunicorn to compare:
+
+Usage:
+    python camera_server.py &                      # development server
+    python load_test.py --server http://localhost:8080 --camera 0
+    gunicorn -c gunicorn.conf.py wsgi:app &        # production server
+    python load_test.py --server http://localhost:8080 --camera 0 --concurrency 50
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from benchmark_chat_answers import QUESTIONS, percentile
+
+
+def newest_segment(playlist_text):
+    segments = [line.strip() for line in playlist_text.splitlines() if line.strip() and not line.startswith('#')]
+    return segments[-1] if segments else None
+
+
+def run_worker(server_url, camera_id, deadline, chat_every, results, lock):
+    session = requests.Session()
+    playlist_url = f"{server_url}/hls/stream_{camera_id}/playlist.m3u8"
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    iteration = 0
+
+    def timed(label, method, url, **kwargs):
+        started = time.time()
+        try:
+            response = session.request(method, url, timeout=30, **kwargs)
+            _ = response.content
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        if ok:
+            samples[label].append((time.time() - started) * 1000)
+        else:
+            errors[label] += 1
+        return response if ok else None
+
+    while time.time() < deadline:
+        playlist = timed('/hls playlist', 'GET', playlist_url)
+        segment = newest_segment(playlist.text) if playlist is not None else None
+        if segment:
+            timed('/hls segment', 'GET', f"{server_url}/hls/stream_{camera_id}/{segment}")
+
+        if chat_every and iteration % chat_every == 0:
+            timed('/api/chat', 'POST', f"{server_url}/api/chat",
+                  json={'query': QUESTIONS[iteration % len(QUESTIONS)], 'search_type': 'all'})
+        iteration += 1
+
+    with lock:
+        for label, values in samples.items():
+            results['samples'][label].extend(values)
+        for label, count in errors.items():
+            results['errors'][label] += count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the camera server HLS and chat endpoints')
+    parser.add_argument('--server', default='http://localhost:8080')
+    parser.add_argument('--camera', type=int, default=0, help='Camera whose stream is fetched')
+    parser.add_argument('--concurrency', type=int, default=20, help='Simultaneous clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run')
+    parser.add_argument('--chat-every', type=int, default=5, help='Chat search every N iterations per client (0 = never)')
+    args = parser.parse_args()
+
+    results = {'samples': defaultdict(list), 'errors': defaultdict(int)}
+    lock = threading.Lock()
+    deadline = time.time() + args.duration
+
+    print(f"Load testing {args.server} with {args.concurrency} clients for {args.duration:.0f}s...")
+    started = time.time()
+    threads = [
+        threading.Thread(target=run_worker,
+                         args=(args.server, args.camera, deadline, args.chat_every, results, lock))
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - started
+
+    print(f"\n{'endpoint':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    labels = sorted(set(results['samples']) | set(results['errors']))
+    total = 0
+    for label in labels:
+        values = results['samples'].get(label, [])
+        total += len(values)
+        p50 = f"{statistics.median(values):10.1f}" if values else f"{'-':>10}"
+        p99 = f"{percentile(values, 99):10.1f}" if values else f"{'-':>10}"
+        print(f"{label:<16}{len(values):>10}{results['errors'].get(label, 0):>8}{len(values) / elapsed:>10.1f}{p50}{p99}")
+    print(f"{'total':<16}{total:>10}{sum(results['errors'].values()):>8}{total / elapsed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
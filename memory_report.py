@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+memory_report.py
+Byte accounting helpers for /api/debug/memory
+
+Components report what they hold (frames, JPEGs, summary records, cache
+entries) through their own memory_usage() methods; this module provides the
+shared pieces: counting frames that are referenced from several buffers
+once, the process RSS to compare the accounted bytes against, and optional
+tracemalloc top-N statistics.
+
+Process RSS comes from psutil when installed, else /proc (Linux), else only
+the peak from getrusage. tracemalloc only reports when the process was
+started with PYTHONTRACEMALLOC=1 (or tracemalloc.start() was called):
+tracing every allocation is too expensive to switch on from a request.
+"""
+
+import os
+import resource
+import sys
+import threading
+import tracemalloc
+from typing import Dict, Iterable, Optional
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+_tracemalloc_lock = threading.Lock()
+_previous_snapshot = None
+
+
+def frames_usage(frames: Iterable) -> Dict:
+    """Distinct arrays among frames (a frame held by several buffers counts once) and their bytes"""
+    seen = {}
+    for frame in frames:
+        if frame is not None:
+            seen[id(frame)] = frame
+    return {'frames': len(seen), 'bytes': sum(frame.nbytes for frame in seen.values())}
+
+
+def frame_buffers_usage(frame_buffers: Dict) -> Dict:
+    """
+    Usage of a summarizer's frame_buffers ({camera_id: {interval: [{'frame', ...}]}})
+
+    Every captured frame is appended to each interval's buffer, so the
+    per-interval counts are references and the camera totals count each
+    frame once. Reads without the summarizer's lock (held for whole LLM
+    calls); list() copies of dicts and lists are atomic.
+    """
+    cameras = {}
+    total_frames = total_bytes = 0
+    for camera_id, intervals in list(frame_buffers.items()):
+        intervals = {interval: list(items) for interval, items in list(intervals.items())}
+        usage = frames_usage(item['frame'] for items in intervals.values() for item in items)
+        usage['references'] = {interval: len(items) for interval, items in intervals.items()}
+        cameras[camera_id] = usage
+        total_frames += usage['frames']
+        total_bytes += usage['bytes']
+    return {'frames': total_frames, 'bytes': total_bytes, 'cameras': cameras}
+
+
+def process_memory() -> Dict:
+    """Current and peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    peak_bytes = peak if sys.platform == 'darwin' else peak * 1024
+
+    rss_bytes = None
+    source = None
+    if PSUTIL_AVAILABLE:
+        rss_bytes = psutil.Process().memory_info().rss
+        source = 'psutil'
+    else:
+        try:
+            with open('/proc/self/statm') as f:
+                rss_bytes = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            source = 'proc'
+        except (OSError, ValueError, IndexError):
+            pass
+    return {'rss_bytes': rss_bytes, 'peak_rss_bytes': peak_bytes, 'source': source}
+
+
+def tracemalloc_top(limit: int = 10, key_type: str = 'lineno') -> Dict:
+    """
+    Largest traced allocation sites, and the biggest growth since the previous call
+
+    Args:
+        limit: Number of sites in each list
+        key_type: 'lineno', 'filename' or 'traceback' grouping
+    """
+    global _previous_snapshot
+    if not tracemalloc.is_tracing():
+        return {'tracing': False, 'hint': 'start the process with PYTHONTRACEMALLOC=1'}
+
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        previous, _previous_snapshot = _previous_snapshot, snapshot
+
+    current, peak = tracemalloc.get_traced_memory()
+    result = {
+        'tracing': True,
+        'traced_bytes': current,
+        'traced_peak_bytes': peak,
+        'top': [{
+            'site': str(stat.traceback),
+            'bytes': stat.size,
+            'count': stat.count,
+        } for stat in snapshot.statistics(key_type)[:limit]],
+    }
+    if previous is not None:
+        result['growth'] = [{
+            'site': str(stat.traceback),
+            'bytes': stat.size,
+            'bytes_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+        } for stat in snapshot.compare_to(previous, key_type)[:limit] if stat.size_diff]
+    return result
+
+
+def unaccounted_bytes(rss_bytes: Optional[int], accounted_bytes: int) -> Optional[int]:
+    """RSS not attributed to any component (interpreter, OpenCV/FFmpeg native buffers, libraries)"""
+    if rss_bytes is None:
+        return None
+    return max(0, rss_bytes - accounted_bytes)
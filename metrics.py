@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+metrics.py
+Process-wide counters, gauges and histograms in Prometheus text format
+
+Every metric is a family with fixed label names; `labels(...)` returns the
+child for one label combination, created on first use and cached. Hot loops
+(the motion detector's frame loop) resolve their child once and then only
+pay for an uncontended lock and an addition per update.
+
+The pipeline's metric families are defined at the bottom of this module so
+the motion detector, capture services, both summarizers and camera_server
+share one set of names. Metrics are per process: with ingest_daemon.py the
+ingest side publishes REGISTRY.render() to shared state and camera_server
+merges it into its own /metrics output with merge_exposition().
+
+Families are rendered with their HELP/TYPE header even before their first
+sample, so a scrape always lists every metric name (absent() and rate()
+alerts see the series exist from the first scrape).
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers a fast local caption up to a slow multi-frame cloud request
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence, extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class CounterChild:
+    """One label combination of a counter"""
+
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+
+class GaugeChild:
+    """One label combination of a gauge"""
+
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+
+class HistogramChild:
+    """One label combination of a histogram (per-bucket counts, cumulated at render time)"""
+
+    __slots__ = ('upper_bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class MetricFamily:
+    """A named metric with fixed label names and one child per label combination"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: 'Registry' = None):
+        """
+        Initialize metric family
+
+        Args:
+            name: Metric name (snake_case, counters end in _total)
+            documentation: HELP text
+            labelnames: Label names, in the order labels() takes values
+            registry: Registry to add the family to (default: REGISTRY)
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self.lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child for a label combination (values are converted to str)"""
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f'{self.name} takes labels {self.labelnames}, got {values}')
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        with self.lock:
+            self.children.pop(tuple(str(value) for value in values), None)
+
+    def clear(self):
+        with self.lock:
+            self.children.clear()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """HELP/TYPE header and sample lines (only the header while the family has no children)"""
+        header = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        return '\n'.join(header + self.samples()) + '\n'
+
+
+class Counter(MetricFamily):
+    type_name = 'counter'
+
+    def _new_child(self):
+        return CounterChild()
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            children = list(self.children.items())
+        return [f'{self.name}{format_labels(self.labelnames, key)} {format_value(child.value)}'
+                for key, child in children]
+
+
+class Gauge(MetricFamily):
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return GaugeChild()
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            children = list(self.children.items())
+        return [f'{self.name}{format_labels(self.labelnames, key)} {format_value(child.value)}'
+                for key, child in children]
+
+
+class Histogram(MetricFamily):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LLM_LATENCY_BUCKETS, registry: 'Registry' = None):
+        """
+        Initialize histogram
+
+        Args:
+            name: Metric name (base name; _bucket/_sum/_count are added)
+            documentation: HELP text
+            labelnames: Label names, in the order labels() takes values
+            buckets: Upper bounds, ascending (+Inf is implicit)
+            registry: Registry to add the family to (default: REGISTRY)
+        """
+        self.upper_bounds = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return HistogramChild(self.upper_bounds)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            children = list(self.children.items())
+        lines = []
+        for key, child in children:
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += count
+                labels = format_labels(self.labelnames, key, ('le', format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Metric families of a process and the hooks that refresh gauges before a scrape"""
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+        self.collect_hooks: List[Callable[[], None]] = []
+        self.lock = threading.Lock()
+
+    def register(self, family: MetricFamily):
+        with self.lock:
+            if family.name in self.families:
+                raise ValueError(f'Metric {family.name} is already registered')
+            self.families[family.name] = family
+
+    def on_collect(self, hook: Callable[[], None]):
+        """Call hook() before every render(collect=True), e.g. to set gauges read from disk"""
+        self.collect_hooks.append(hook)
+
+    def render(self, collect: bool = True) -> str:
+        """Text exposition of every family"""
+        if collect:
+            for hook in self.collect_hooks:
+                try:
+                    hook()
+                except Exception as e:
+                    print(f"⚠️  Metrics collect hook failed: {e}")
+        with self.lock:
+            families = list(self.families.values())
+        return ''.join(family.render() for family in families)
+
+
+REGISTRY = Registry()
+
+
+def merge_exposition(*bodies: str) -> str:
+    """
+    Combine the text expositions of several processes
+
+    Every process renders every family, so a family may appear in several
+    bodies; it is written once, with the first HELP/TYPE header seen and
+    the samples of all bodies.
+    """
+    headers: Dict[str, Dict[str, str]] = {}
+    samples: Dict[str, List[str]] = {}
+    family = None
+    for body in bodies:
+        for line in body.splitlines():
+            if line.startswith('# HELP ') or line.startswith('# TYPE '):
+                _, kind, family = line.split(' ', 3)[:3]
+                headers.setdefault(family, {}).setdefault(kind, line)
+                samples.setdefault(family, [])
+            elif line and family is not None:
+                samples[family].append(line)
+    return ''.join(
+        '\n'.join([header[kind] for kind in ('HELP', 'TYPE') if kind in header] + samples[family]) + '\n'
+        for family, header in headers.items()
+    )
+
+
+# ----------------------------------------------------------------------
+# Pipeline metrics
+# ----------------------------------------------------------------------
+
+FRAMES_DECODED = Counter(
+    'camera_frames_decoded_total', 'Frames decoded from the RTSP stream by the motion detector', ['camera'])
+MOTION_EVENTS = Counter(
+    'camera_motion_events_total', 'Motion events started (idle to active transitions)', ['camera'])
+CLIPS_WRITTEN = Counter(
+    'camera_clips_written_total', 'Motion clips written to disk', ['camera'])
+CLIP_ERRORS = Counter(
+    'camera_clip_errors_total', 'Motion clips that failed to write', ['camera'])
+
+FRAMES_CAPTURED = Counter(
+    'summarizer_frames_captured_total', 'Frames handed to a summarizer by its capture service',
+    ['backend', 'camera'])
+CAPTURE_MISSES = Counter(
+    'summarizer_capture_misses_total', 'Capture attempts that returned no frame', ['backend', 'camera'])
+FRAME_BUFFER_DEPTH = Gauge(
+    'summarizer_frame_buffer_depth', 'Frames buffered for the next summary', ['backend', 'camera', 'interval'])
+SUMMARIES_GENERATED = Counter(
+    'summarizer_summaries_total', 'Summaries generated', ['backend', 'camera', 'interval'])
+
+LLM_REQUESTS = Counter(
+    'llm_requests_total', 'LLM requests by outcome (ok or error)',
+    ['backend', 'camera', 'interval', 'kind', 'outcome'])
+LLM_LATENCY = Histogram(
+    'llm_request_duration_seconds', 'LLM request latency', ['backend', 'camera', 'interval', 'kind'])
+
+
+def record_llm_request(backend: str, camera_id, interval: str, kind: str, started: float, ok: bool):
+    """
+    Count one LLM request and its latency
+
+    Args:
+        backend: 'ollama' or 'openai'
+        camera_id: Camera the request was for
+        interval: Summary interval the request was for
+        kind: 'caption' (one frame) or 'summary'
+        started: time.time() when the request was sent
+        ok: Whether a usable response came back
+    """
+    LLM_REQUESTS.labels(backend, camera_id, interval, kind, 'ok' if ok else 'error').inc()
+    LLM_LATENCY.labels(backend, camera_id, interval, kind).observe(time.time() - started)
+
+
+HLS_REQUESTS = Counter(
+    'hls_requests_total', 'HLS playlist, segment and part requests by response status',
+    ['camera', 'type', 'status'])
+HLS_SEGMENT_AGE = Gauge(
+    'hls_segment_age_seconds', 'How far the newest published segment lags wall-clock time', ['camera'])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+migrate_summaries.py
+Maintenance tool for the append-only summary log in summary_store.py
+
+Converts one-file-per-summary directories (flat camera_N/*.json, or the
+camera_N/YYYYmmdd/HH/*.json partitions with manifest.json) into per-camera
+segment logs, compacts closed days, and exports the log back to the legacy
+per-file layout.
+
+Usage:
+    python migrate_summaries.py /Users/vibhorkashyap/Documents/code/ollama_video_summaries
+    python migrate_summaries.py <summaries_dir> --dry-run
+    python migrate_summaries.py <summaries_dir> --compact
+    python migrate_summaries.py <summaries_dir> --export <output_dir> [--start ISO] [--end ISO]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+from summary_store import SummaryLogStore
+
+
+def find_legacy_files(camera_dir: str):
+    """Per-summary JSON files in the flat or hour-partitioned layouts"""
+    for root, dirs, files in os.walk(camera_dir):
+        # Frame snapshots live alongside summaries and are not migrated
+        dirs[:] = [d for d in dirs if d != 'frames']
+        for filename in files:
+            if filename.endswith('.json') and filename != 'manifest.json':
+                yield os.path.join(root, filename)
+
+
+def migrate_camera(store: SummaryLogStore, camera_id: int, dry_run: bool = False, keep: bool = False) -> int:
+    """Append one camera's per-file summaries to its log, returns number migrated"""
+    camera_dir = store.camera_dir(camera_id)
+    summaries = []
+
+    for path in find_legacy_files(camera_dir):
+        try:
+            with open(path, 'r') as f:
+                summary = json.load(f)
+        except Exception as e:
+            print(f"  ✗ Skipping unreadable {os.path.relpath(path, camera_dir)}: {e}")
+            continue
+        summaries.append((store.summary_datetime(summary), path, summary))
+
+    # Append in time order so segments stay seekable by timestamp
+    summaries.sort(key=lambda item: item[0])
+
+    for dt, path, summary in summaries:
+        interval = summary.get('interval') or os.path.basename(path).rsplit('_', 2)[0]
+        if dry_run:
+            print(f"  {os.path.relpath(path, camera_dir)} -> {dt.strftime('%Y%m%d')}/{dt.strftime('%H')}.jsonl")
+            continue
+
+        try:
+            store.append(camera_id, interval, summary)
+        except ValueError as e:
+            print(f"  ✗ Skipping {os.path.relpath(path, camera_dir)}: {e}")
+            continue
+        if not keep:
+            os.remove(path)
+
+    if not dry_run and not keep:
+        # Drop manifests and now-empty hour directories from the partitioned layout
+        for root, dirs, files in os.walk(camera_dir, topdown=False):
+            if 'manifest.json' in files:
+                os.remove(os.path.join(root, 'manifest.json'))
+            if root != camera_dir and os.path.basename(root) != 'frames' and not os.listdir(root):
+                os.rmdir(root)
+
+    return len(summaries)
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate, compact or export the per-camera summary log')
+    parser.add_argument('summaries_dir', help='Root summaries directory containing camera_N folders')
+    parser.add_argument('--dry-run', action='store_true', help='Show what would be migrated without writing')
+    parser.add_argument('--keep', action='store_true', help='Keep the original per-file summaries after migrating')
+    parser.add_argument('--compact', action='store_true', help='Merge closed days into single day segments')
+    parser.add_argument('--export', metavar='OUTPUT_DIR', help='Export the log as one JSON file per summary')
+    parser.add_argument('--start', help='Export window start (ISO timestamp)')
+    parser.add_argument('--end', help='Export window end (ISO timestamp)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.summaries_dir):
+        print(f"✗ Not a directory: {args.summaries_dir}")
+        sys.exit(1)
+
+    store = SummaryLogStore(args.summaries_dir, auto_compact=False)
+
+    if args.export:
+        for camera_id in store.cameras():
+            count = store.export_files(camera_id, args.export, parse_time(args.start), parse_time(args.end))
+            print(f"✓ Camera {camera_id}: exported {count} summaries")
+        return
+
+    if args.compact:
+        print(f"✓ Compacted {store.compact()} camera-days")
+        return
+
+    total = 0
+    for camera_id in store.cameras():
+        count = migrate_camera(store, camera_id, args.dry_run, args.keep)
+        print(f"✓ Camera {camera_id}: {count} summaries {'to migrate' if args.dry_run else 'migrated'}")
+        total += count
+
+    print(f"\n✅ {total} summaries {'would be' if args.dry_run else 'were'} appended to the summary log")
+
+
+if __name__ == '__main__':
+    main()
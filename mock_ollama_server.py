@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+mock_ollama_server.py
+Minimal stand-in for the Ollama HTTP API, for tests and local development
+without a GPU. Embeddings are deterministic hashed bag-of-words vectors with
+a small synonym table so related phrasings land close together.
+
+/api/generate answers deterministically (quoting the first numbered source
+of a grounded prompt) and streams word by word with configurable model
+latency, for answer-streaming tests and benchmarks.
+
+Usage:
+    python mock_ollama_server.py --port 11435
+    python mock_ollama_server.py --port 11435 --first-token-delay 0.3 --token-delay 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 256
+
+# Words mapped onto a shared concept token before hashing
+SYNONYMS = {
+    'package': 'package', 'packages': 'package', 'parcel': 'package', 'box': 'package',
+    'boxes': 'package', 'delivery': 'package',
+    'person': 'person', 'people': 'person', 'man': 'person', 'woman': 'person',
+    'someone': 'person', 'pedestrian': 'person', 'individual': 'person',
+    'carrying': 'carry', 'carried': 'carry', 'holding': 'carry', 'held': 'carry',
+    'car': 'vehicle', 'cars': 'vehicle', 'truck': 'vehicle', 'van': 'vehicle', 'vehicle': 'vehicle',
+    'bike': 'bicycle', 'bicycle': 'bicycle', 'cyclist': 'bicycle', 'cyclists': 'bicycle',
+    'walking': 'walk', 'walked': 'walk', 'walks': 'walk',
+    'dog': 'animal', 'cat': 'animal', 'animal': 'animal',
+}
+
+STOPWORDS = {'a', 'an', 'the', 'of', 'in', 'on', 'and', 'to', 'was', 'is', 'at', 'by', 'for'}
+
+
+SOURCE_LINE = re.compile(r"^\[(\d+)\] Camera .*? ending \S+: (.+)$", re.MULTILINE)
+
+
+def generate_structured(prompt: str) -> str:
+    """JSON completion for format='json' summary prompts, counted from the captions"""
+    tokens = [SYNONYMS.get(w, w) for w in re.findall(r"[a-z]+", prompt.split('Respond with')[0].lower())]
+    people = tokens.count('person')
+    vehicles = tokens.count('vehicle')
+    objects = {name: tokens.count(name) for name in ('person', 'vehicle', 'package', 'animal', 'bicycle')}
+    activity = 'none' if not people + vehicles else 'low' if people + vehicles < 3 else 'high'
+    return json.dumps({
+        'summary': generate_text(prompt),
+        'people_count': people,
+        'vehicle_count': vehicles,
+        'object_counts': {name: count for name, count in objects.items() if count},
+        'activity_level': activity
+    })
+
+
+def generate_text(prompt: str) -> str:
+    """Deterministic completion for a prompt"""
+    sources = SOURCE_LINE.findall(prompt)
+    if sources:
+        number, text = sources[0]
+        first_sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+        return f"According to [{number}], {first_sentence[0].lower()}{first_sentence[1:]}"
+    if 'Question:' in prompt:
+        return "The summaries do not contain the answer."
+    return "A person walks across the frame carrying a package."
+
+
+def embed_text(text: str, dim: int = EMBEDDING_DIM) -> list:
+    """Deterministic unit-length embedding of a piece of text"""
+    vector = [0.0] * dim
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        token = SYNONYMS.get(word, word)
+        digest = hashlib.md5(token.encode('utf-8')).digest()
+        bucket = int.from_bytes(digest[:4], 'little') % dim
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        return vector
+    return [v / norm for v in vector]
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """Implements the subset of the Ollama API this project uses"""
+
+    # Chunked streaming responses need HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+
+    # Simulated model latency (seconds), set via start_mock_server() or the CLI
+    first_token_delay = 0.0
+    token_delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json({'models': [{'name': 'gemma3:4b'}, {'name': 'nomic-embed-text'}]})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def do_POST(self):
+        data = self._read_json()
+
+        if self.path == '/api/embeddings':
+            self._send_json({'embedding': embed_text(data.get('prompt', ''))})
+        elif self.path == '/api/embed':
+            inputs = data.get('input', '')
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            self._send_json({'model': data.get('model'), 'embeddings': [embed_text(t) for t in inputs]})
+        elif self.path == '/api/generate':
+            self._generate(data)
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def _generate(self, data: dict):
+        if data.get('format') == 'json':
+            text = generate_structured(data.get('prompt', ''))
+        else:
+            text = generate_text(data.get('prompt', ''))
+        model = data.get('model')
+        time.sleep(self.first_token_delay)
+
+        if not data.get('stream', True):
+            time.sleep(self.token_delay * len(text.split()))
+            self._send_json({'model': model, 'response': text, 'done': True})
+            return
+
+        # Newline-delimited JSON in chunked transfer encoding, as Ollama streams it
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = text.split(' ')
+        for idx, word in enumerate(words):
+            token = word if idx == 0 else ' ' + word
+            self._write_chunk({'model': model, 'response': token, 'done': False})
+            time.sleep(self.token_delay)
+        self._write_chunk({'model': model, 'response': '', 'done': True, 'eval_count': len(words)})
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def _write_chunk(self, payload: dict):
+        body = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f'{len(body):x}\r\n'.encode('ascii') + body + b'\r\n')
+        self.wfile.flush()
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, first_token_delay: float = 0.0,
+                      token_delay: float = 0.0):
+    """
+    Start the mock server on a background thread
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        first_token_delay: Seconds before the first generated token
+        token_delay: Seconds between generated tokens
+
+    Returns:
+        (server, base_url) - call server.shutdown() to stop it
+    """
+    handler = type('ConfiguredMockOllamaHandler', (MockOllamaHandler,), {
+        'first_token_delay': first_token_delay,
+        'token_delay': token_delay
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mock Ollama API server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--first-token-delay', type=float, default=0.0, help='Seconds before the first generated token')
+    parser.add_argument('--token-delay', type=float, default=0.0, help='Seconds between generated tokens')
+    args = parser.parse_args()
+
+    MockOllamaHandler.first_token_delay = args.first_token_delay
+    MockOllamaHandler.token_delay = args.token_delay
+    server = ThreadingHTTPServer((args.host, args.port), MockOllamaHandler)
+    print(f"✓ Mock Ollama server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.shutdown()
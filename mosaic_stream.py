@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+mosaic_stream.py
+Server-side mosaic of every camera as one HLS stream
+
+One ffmpeg process reads each camera's local live playlist (the low
+rendition when ABR is on), scales every input into its grid cell and
+composites them with xstack into a single encoded stream at hls_dir/mosaic/.
+A wall display then plays one stream at a fixed bitrate instead of one
+player and decoder per camera. Cameras are read from the HLS files, not
+RTSP, so the cameras see no extra connections.
+
+A monitor thread restarts the mosaic when ffmpeg exits, when its playlist
+stops advancing (an input camera restarted), or when the set of cameras
+with a live playlist changes (the layout is rebuilt).
+"""
+
+import math
+import os
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ffmpeg_telemetry import RotatingLog
+from stream_supervisor import playlist_progress
+
+MOSAIC_DIR = 'mosaic'
+
+
+def mosaic_layout(camera_ids: List[int], width: int, height: int) -> Dict:
+    """
+    Grid cells for the cameras, row by row
+
+    Returns:
+        {'columns', 'rows', 'width', 'height', 'tiles': [{'camera_id', 'x', 'y', 'width', 'height'}]}
+    """
+    count = max(1, len(camera_ids))
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    tile_width = (width // columns) // 2 * 2
+    tile_height = (height // rows) // 2 * 2
+    tiles = [{
+        'camera_id': camera_id,
+        'x': (index % columns) * tile_width,
+        'y': (index // columns) * tile_height,
+        'width': tile_width,
+        'height': tile_height,
+    } for index, camera_id in enumerate(camera_ids)]
+    return {
+        'columns': columns,
+        'rows': rows,
+        'width': columns * tile_width,
+        'height': rows * tile_height,
+        'tiles': tiles,
+    }
+
+
+def mosaic_command(inputs: List[Tuple[int, str]], layout: Dict, fps: int, bitrate: int,
+                   output_args: List[str]) -> List[str]:
+    """
+    ffmpeg command compositing the input playlists into the layout
+
+    Args:
+        inputs: (camera_id, live playlist path) in layout order
+        layout: mosaic_layout() result for the same cameras
+        fps: Output frame rate
+        bitrate: Output video bitrate (bits/s)
+        output_args: HLS output arguments (ending with the playlist path)
+    """
+    cmd = ['ffmpeg', '-nostats', '-loglevel', 'warning']
+    for _, playlist_path in inputs:
+        # Join each live playlist at its newest segment
+        cmd += ['-live_start_index', '-1', '-i', playlist_path]
+
+    filters = []
+    for index, tile in enumerate(layout['tiles']):
+        w, h = tile['width'], tile['height']
+        # Every camera has its own clock; start each input at zero so xstack can line them up
+        filters.append(
+            f'[{index}:v:0]setpts=PTS-STARTPTS,fps={fps},'
+            f'scale={w}:{h}:force_original_aspect_ratio=decrease,'
+            f'pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1[v{index}]'
+        )
+    if len(inputs) == 1:
+        filters.append('[v0]null[mosaic]')
+    else:
+        positions = '|'.join(f"{tile['x']}_{tile['y']}" for tile in layout['tiles'])
+        labels = ''.join(f'[v{index}]' for index in range(len(inputs)))
+        # fill paints the empty cells of a partially filled last row
+        filters.append(f'{labels}xstack=inputs={len(inputs)}:layout={positions}:fill=black[mosaic]')
+
+    cmd += [
+        '-filter_complex', ';'.join(filters),
+        '-map', '[mosaic]',
+        '-an',
+        '-c:v', 'libx264',
+        '-preset', 'veryfast',
+        '-tune', 'zerolatency',
+        '-pix_fmt', 'yuv420p',
+        '-b:v', str(bitrate),
+        '-maxrate', str(bitrate * 5 // 4),
+        '-bufsize', str(bitrate * 2),
+        # Keyframe every 3s so segments cut on the HLS segment duration
+        '-g', str(fps * 3),
+        '-keyint_min', str(fps * 3),
+        '-sc_threshold', '0',
+    ]
+    return cmd + output_args
+
+
+class MosaicStream:
+    """Runs and supervises the mosaic ffmpeg process"""
+
+    def __init__(self, hls_dir: str, input_playlist: Callable[[int], str],
+                 output_args: Callable[[str], List[str]], width: int = 1920, height: int = 1080,
+                 fps: int = 10, bitrate: int = 2_500_000, check_interval: float = 5,
+                 stall_timeout: float = 20, startup_grace: float = 30, backoff_max: float = 60):
+        """
+        Initialize mosaic stream
+
+        Args:
+            hls_dir: Root HLS directory (output goes to hls_dir/mosaic/)
+            input_playlist: Live playlist path to read for a camera
+            output_args: HLS output arguments for a playlist path
+            width: Mosaic width
+            height: Mosaic height
+            fps: Mosaic frame rate (tiles don't need the cameras' full rate)
+            bitrate: Mosaic video bitrate, independent of the number of cameras
+            check_interval: Seconds between health checks
+            stall_timeout: Seconds without playlist progress before a restart
+            startup_grace: Seconds a new process gets to write its first segment
+            backoff_max: Upper bound on the delay between failed starts
+        """
+        self.out_dir = os.path.join(hls_dir, MOSAIC_DIR)
+        self.playlist_path = os.path.join(self.out_dir, 'playlist.m3u8')
+        self.input_playlist = input_playlist
+        self.output_args = output_args
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.bitrate = bitrate
+        self.check_interval = check_interval
+        self.stall_timeout = stall_timeout
+        self.startup_grace = startup_grace
+        self.backoff_max = backoff_max
+
+        self.process: Optional[subprocess.Popen] = None
+        self.layout: Optional[Dict] = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        self.started_at = None
+        self.progress = None
+        self.last_progress_time = None
+        self.restarts = 0
+        self.failures = 0
+        self.next_start_at = 0.0
+        self.last_failure = None
+
+    def start(self, camera_ids: Callable[[], Iterable[int]]):
+        """
+        Start the monitor; the mosaic launches once camera playlists exist
+
+        Args:
+            camera_ids: Cameras whose streams are running
+        """
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._monitor_loop, args=(camera_ids,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            self._kill()
+
+    def _available_inputs(self, camera_ids: Iterable[int]) -> List[Tuple[int, str]]:
+        inputs = []
+        for camera_id in sorted(camera_ids):
+            playlist_path = self.input_playlist(camera_id)
+            if os.path.exists(playlist_path):
+                inputs.append((camera_id, playlist_path))
+        return inputs
+
+    def _launch(self, inputs: List[Tuple[int, str]]):
+        """Start ffmpeg for the given inputs (lock held)"""
+        os.makedirs(self.out_dir, exist_ok=True)
+        for name in os.listdir(self.out_dir):
+            if not name.startswith('ffmpeg.log'):
+                os.remove(os.path.join(self.out_dir, name))
+
+        layout = mosaic_layout([camera_id for camera_id, _ in inputs], self.width, self.height)
+        cmd = mosaic_command(inputs, layout, self.fps, self.bitrate, self.output_args(self.playlist_path))
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                        preexec_fn=os.setsid)
+        threading.Thread(target=self._copy_log, args=(self.process.stderr,), daemon=True).start()
+
+        self.layout = layout
+        self.started_at = self.last_progress_time = time.time()
+        self.progress = None
+        print(f"✓ Mosaic stream started: {layout['columns']}x{layout['rows']} grid of {len(inputs)} cameras")
+
+    def _copy_log(self, stream):
+        log = RotatingLog(os.path.join(self.out_dir, 'ffmpeg.log'))
+        try:
+            for line in stream:
+                log.write(line.decode('utf-8', errors='replace'))
+        finally:
+            log.close()
+            stream.close()
+
+    def _kill(self):
+        """Stop ffmpeg (lock held)"""
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            os.killpg(os.getpgid(process.pid), 15)
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            os.killpg(os.getpgid(process.pid), 9)
+            process.wait()
+        except ProcessLookupError:
+            pass
+
+    def _fail(self, reason: str, now: float):
+        """Stop ffmpeg and back off before the next start (lock held)"""
+        self._kill()
+        delay = min(self.backoff_max, 2 ** self.failures)
+        self.failures += 1
+        self.last_failure = reason
+        self.next_start_at = now + delay
+        print(f"⚠️  Mosaic stream {reason}, restarting in {delay:g}s")
+
+    def _check(self, inputs: List[Tuple[int, str]], now: float):
+        """One monitor pass (lock held)"""
+        camera_ids = [camera_id for camera_id, _ in inputs]
+        if self.process is None:
+            if inputs and now >= self.next_start_at:
+                if self.started_at is not None:
+                    self.restarts += 1
+                try:
+                    self._launch(inputs)
+                except OSError as e:
+                    self._fail(f'failed to start ({e})', now)
+            return
+
+        exit_code = self.process.poll()
+        if exit_code is not None:
+            self._fail(f'ffmpeg exited with code {exit_code}', now)
+            return
+        if camera_ids != [tile['camera_id'] for tile in self.layout['tiles']]:
+            # Not a failure: rebuild the grid for the new camera set right away
+            print(f"Mosaic cameras changed to {camera_ids}, rebuilding layout")
+            self._kill()
+            self.next_start_at = now
+            return
+
+        progress = playlist_progress(self.playlist_path)
+        if progress is not None and progress != self.progress:
+            self.progress = progress
+            self.last_progress_time = now
+            if now - self.started_at >= 60:
+                self.failures = 0
+        limit = self.stall_timeout if self.progress is not None else self.startup_grace
+        if now - self.last_progress_time > limit:
+            self._fail(f'stalled for {int(now - self.last_progress_time)}s', now)
+
+    def _monitor_loop(self, camera_ids: Callable[[], Iterable[int]]):
+        while self.running:
+            try:
+                inputs = self._available_inputs(camera_ids())
+                with self.lock:
+                    if self.running:
+                        self._check(inputs, time.time())
+            except Exception as e:
+                print(f"⚠️  Mosaic monitor error: {e}")
+            time.sleep(self.check_interval)
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with self.lock:
+            running = self.process is not None and self.process.poll() is None
+            return {
+                'status': 'running' if running and self.progress else 'starting' if running else 'stopped',
+                'layout': self.layout,
+                'fps': self.fps,
+                'bitrate': self.bitrate,
+                'uptime_seconds': round(now - self.started_at, 1) if running else 0,
+                'restarts': self.restarts,
+                'last_failure': self.last_failure,
+                'last_progress_age': round(now - self.last_progress_time, 1) if self.last_progress_time else None,
+            }
@@ -14,6 +14,9 @@ from collections import defaultdict
 from pathlib import Path
 import numpy as np
 
+from memory_report import frames_usage
+from metrics import FRAMES_DECODED, MOTION_EVENTS, CLIPS_WRITTEN, CLIP_ERRORS
+
 class MotionDetector:
     def __init__(self, camera_id, rtsp_url, clip_dir="/Users/vibhorkashyap/Documents/code/clips"):
         """
@@ -55,6 +58,9 @@ class MotionDetector:
         self.motion_start_time = None
         self.last_motion_time = None
         
+        # Callables invoked as listener(camera_id, clip_data) after a clip is saved
+        self.clip_listeners = []
+        
     def _load_metadata(self):
         """Load existing metadata"""
         if os.path.exists(self.metadata_file):
@@ -118,7 +124,8 @@ class MotionDetector:
         
         prev_frame = None
         frame_count = 0
-        buffer_frames = []
+        buffer_frames = self.frame_buffer = []
+        frames_decoded = FRAMES_DECODED.labels(self.camera_id)  # Resolved once, outside the frame loop
         
         while self.recording:
             ret, frame = cap.read()
@@ -126,6 +133,7 @@ class MotionDetector:
             if not ret:
                 print(f"✗ Failed to read frame from camera {self.camera_id}")
                 break
+            frames_decoded.inc()
             
             # Resize for faster processing
             frame_resized = cv2.resize(frame, (frame_width // 2, frame_height // 2))
@@ -147,6 +155,7 @@ class MotionDetector:
                     if not self.motion_active:
                         self.motion_active = True
                         self.motion_start_time = self.last_motion_time
+                        MOTION_EVENTS.labels(self.camera_id).inc()
                         print(f"🔴 Motion detected on camera {self.camera_id}")
             
             prev_frame = frame.copy()
@@ -195,11 +204,20 @@ class MotionDetector:
             self.clips_metadata.append(clip_data)
             self._save_metadata()
             
+            CLIPS_WRITTEN.labels(self.camera_id).inc()
+            for listener in self.clip_listeners:
+                listener(self.camera_id, clip_data)
+            
             print(f"✓ Saved motion clip for camera {self.camera_id}: {clip_filename}")
             
         except Exception as e:
+            CLIP_ERRORS.labels(self.camera_id).inc()
             print(f"✗ Error saving clip: {e}")
     
+    def memory_usage(self):
+        """Full-resolution frames held in the pre-motion buffer"""
+        return frames_usage(list(self.frame_buffer))
+    
     def start(self):
         """Start motion detection thread"""
         if not self.recording:
@@ -220,13 +238,55 @@ class MotionDetectionManager:
     def __init__(self, cameras_config):
         self.detectors = {}
         self.cameras_config = cameras_config
+        
+        # Shared with every detector; see MotionDetector.clip_listeners
+        self.clip_listeners = []
     
     def start_all(self):
         """Start motion detection for all cameras"""
         for idx, camera in enumerate(self.cameras_config):
-            detector = MotionDetector(idx, camera['rtsp_url'])
-            detector.start()
-            self.detectors[idx] = detector
+            self.start_camera(camera.get('id', idx), camera)
+    
+    def start_camera(self, camera_id, camera):
+        """Start (or restart with a new config) motion detection for one camera"""
+        self.stop_camera(camera_id)
+        detector = MotionDetector(camera_id, camera['rtsp_url'])
+        detector.clip_listeners = self.clip_listeners
+        detector.start()
+        self.detectors[camera_id] = detector
+    
+    def stop_camera(self, camera_id):
+        """Stop motion detection for one camera (clips and their metadata stay on disk)"""
+        detector = self.detectors.pop(camera_id, None)
+        if detector:
+            detector.stop()
+    
+    def apply_camera_changes(self, diff):
+        """
+        Follow a camera config reload (CameraRegistry diff)
+        
+        Only detectors that are running are touched: removed cameras stop,
+        cameras whose RTSP URL changed restart, and added cameras start if
+        motion detection is running for the others.
+        """
+        running = bool(self.detectors)
+        for camera_id in diff['removed']:
+            self.stop_camera(camera_id)
+        for camera_id, change in diff['changed'].items():
+            if camera_id in self.detectors and 'rtsp_url' in change['keys']:
+                self.start_camera(camera_id, change['new'])
+        if running:
+            for camera_id, camera in diff['added'].items():
+                self.start_camera(camera_id, camera)
+    
+    def memory_usage(self):
+        """Pre-motion buffer usage of every running detector"""
+        cameras = {camera_id: detector.memory_usage() for camera_id, detector in list(self.detectors.items())}
+        return {
+            'bytes': sum(usage['bytes'] for usage in cameras.values()),
+            'frames': sum(usage['frames'] for usage in cameras.values()),
+            'cameras': cameras,
+        }
     
     def stop_all(self):
         """Stop all motion detectors"""
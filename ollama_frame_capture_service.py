@@ -9,13 +9,17 @@ import cv2
 import threading
 import time
 from datetime import datetime
-import json
+
+from camera_registry import CameraRegistry
+from metrics import FRAMES_CAPTURED, CAPTURE_MISSES
+from tracing import TRACER, annotate, span
 
 
 class OllamaFrameCaptureService:
     """Continuously captures frames from HLS streams for Ollama analysis"""
     
-    def __init__(self, hls_dir: str, ollama_summarizer, capture_interval: int = 15):
+    def __init__(self, hls_dir: str, ollama_summarizer, capture_interval: int = 15,
+                 snapshot_cache=None, camera_registry: CameraRegistry = None):
         """
         Initialize Ollama frame capture service
         
@@ -23,10 +27,14 @@ class OllamaFrameCaptureService:
             hls_dir: Directory containing HLS streams
             ollama_summarizer: OllamaSummarizer instance
             capture_interval: Seconds between frame captures (default: 15 seconds)
+            snapshot_cache: SnapshotCache to take frames from instead of decoding segments
+            camera_registry: Cameras to capture, re-read on every cycle (default: cameras.json)
         """
         self.hls_dir = hls_dir
         self.summarizer = ollama_summarizer
         self.capture_interval = capture_interval
+        self.snapshot_cache = snapshot_cache
+        self.camera_registry = camera_registry or CameraRegistry()
         self.running = False
         self.thread = None
     
@@ -37,6 +45,7 @@ class OllamaFrameCaptureService:
             return
         
         self.running = True
+        self.camera_registry.start()
         self.thread = threading.Thread(target=self._capture_loop, daemon=True)
         self.thread.start()
         print(f"✓ Ollama frame capture service started (interval: {self.capture_interval}s)")
@@ -76,56 +85,71 @@ class OllamaFrameCaptureService:
             if not os.path.exists(segment_path):
                 return None
             
-            cap = cv2.VideoCapture(segment_path)
-            ret, frame = cap.read()
-            cap.release()
+            with span('decode'):
+                cap = cv2.VideoCapture(segment_path)
+                ret, frame = cap.read()
+                cap.release()
             
             if ret:
                 # Resize for faster processing
-                return cv2.resize(frame, (640, 360))
+                with span('resize'):
+                    return cv2.resize(frame, (640, 360))
             return None
         except Exception as e:
             print(f"Error capturing frame from {segment_path}: {e}")
             return None
     
+    def _capture_frame(self, camera_id: int):
+        """Latest frame of a camera, from the shared snapshot cache when available"""
+        if self.snapshot_cache is not None:
+            with span('snapshot_cache'):
+                frame = self.snapshot_cache.frame(camera_id, max_age=self.capture_interval)
+            if frame is None:
+                return None
+            with span('resize'):
+                return cv2.resize(frame, (640, 360))
+        
+        with span('segment_discovery'):
+            segment_path = self._get_latest_segment(camera_id)
+        if not segment_path:
+            return None
+        return self._capture_frame_from_segment(segment_path)
+    
     def _capture_loop(self):
         """Main capture loop - runs continuously in background"""
         print("Ollama frame capture loop started")
         
         while self.running:
             try:
-                # Get list of cameras from cameras.json
-                cameras_file = '/Users/vibhorkashyap/Documents/code/cameras.json'
-                cameras = []
-                
-                if os.path.exists(cameras_file):
-                    with open(cameras_file, 'r') as f:
-                        cameras = json.load(f)
-                
-                # Capture frame from each camera
-                for idx, camera in enumerate(cameras):
-                    camera_id = camera.get('id', idx)
-                    
-                    # Get latest segment
-                    segment_path = self._get_latest_segment(camera_id)
-                    if not segment_path:
-                        continue
-                    
-                    # Capture frame
-                    frame = self._capture_frame_from_segment(segment_path)
-                    if frame is not None:
-                        # Add to Ollama summarizer
-                        self.summarizer.add_frame(camera_id, frame, datetime.now())
+                # Capture frame from each configured camera (follows cameras.json reloads)
+                for camera_id, camera in self.camera_registry.items():
+                    # One trace per camera and cycle: capture, buffering and any summaries generated
+                    with TRACER.trace('capture', camera_id=camera_id, backend='ollama'):
+                        generated = []
+                        
+                        # Capture frame
+                        frame = self._capture_frame(camera_id)
+                        if frame is None:
+                            CAPTURE_MISSES.labels('ollama', camera_id).inc()
+                        else:
+                            FRAMES_CAPTURED.labels('ollama', camera_id).inc()
+                            # Add to Ollama summarizer
+                            with span('add_frame'):
+                                self.summarizer.add_frame(camera_id, frame, datetime.now())
+                        
+                            # Try to generate summaries if intervals are met
+                            for interval in self.summarizer.INTERVALS.keys():
+                                summary = self.summarizer.generate_summary(
+                                    camera_id, 
+                                    interval,
+                                    camera.get('name', f'Camera {camera_id}')
+                                )
+                                if summary:
+                                    generated.append(interval)
+                                    print(f"  ✓ Generated {interval} summary for {camera.get('name', f'Camera {camera_id}')} (Gemma 3:4b)")
                         
-                        # Try to generate summaries if intervals are met
-                        for interval in self.summarizer.INTERVALS.keys():
-                            summary = self.summarizer.generate_summary(
-                                camera_id, 
-                                interval,
-                                camera.get('name', f'Camera {camera_id}')
-                            )
-                            if summary:
-                                print(f"  ✓ Generated {interval} summary for {camera.get('name', f'Camera {camera_id}')} (Gemma 3:4b)")
+                        if generated:
+                            annotate(summaries=generated)
                 
                 # Wait before next capture
                 time.sleep(self.capture_interval)
@@ -12,9 +12,15 @@ import threading
 import time
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 import requests
 
+from memory_report import frame_buffers_usage
+from metrics import FRAME_BUFFER_DEPTH, SUMMARIES_GENERATED, record_llm_request
+from tracing import span, traced_lock
+from summary_store import SummaryLogStore, SummaryWindow
+from summary_analytics import STRUCTURED_PROMPT, parse_structured_summary
+
 
 class OllamaSummarizer:
     """Handles video frame analysis and caption generation using Ollama Gemma 3:4b"""
@@ -28,7 +34,8 @@ class OllamaSummarizer:
         'hour': 3600
     }
     
-    def __init__(self, hls_dir: str, output_dir: str = None, ollama_base_url: str = "http://localhost:11434"):
+    def __init__(self, hls_dir: str, output_dir: str = None, ollama_base_url: str = "http://localhost:11434",
+                 summary_window_size: int = 100):
         """
         Initialize Ollama summarizer
         
@@ -36,6 +43,7 @@ class OllamaSummarizer:
             hls_dir: Directory containing HLS streams
             output_dir: Directory to save summaries (default: hls_dir/summaries)
             ollama_base_url: URL to Ollama API endpoint
+            summary_window_size: Recent summaries kept in memory per camera and interval
         """
         self.hls_dir = hls_dir
         self.output_dir = output_dir or os.path.join(hls_dir, 'ollama_summaries')
@@ -44,6 +52,9 @@ class OllamaSummarizer:
         
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # Append-only per-camera summary log
+        self.store = SummaryLogStore(self.output_dir)
+        
         # Verify Ollama is available
         self.ollama_available = self._check_ollama_health()
         
@@ -62,14 +73,8 @@ class OllamaSummarizer:
             'hour': []
         })
         
-        # Storage for generated summaries
-        self.summaries: Dict[int, Dict[str, List]] = defaultdict(lambda: {
-            'minute': [],
-            '5_minutes': [],
-            '10_minutes': [],
-            '30_minutes': [],
-            'hour': []
-        })
+        # Bounded window of recent summaries, warm-started from the summary log
+        self.summaries = SummaryWindow(self.INTERVALS.keys(), self.store, max_items=summary_window_size)
         
         # Last summary generation times
         self.last_summary_times: Dict[int, Dict[str, float]] = defaultdict(lambda: {
@@ -81,6 +86,10 @@ class OllamaSummarizer:
         })
         
         self.lock = threading.Lock()
+        
+        # Callables invoked as listener(camera_id, summary) after a summary is saved
+        # (semantic indexing, chat cache invalidation)
+        self.summary_listeners: List[Callable[[int, Dict], None]] = []
     
     def _check_ollama_health(self) -> bool:
         """Check if Ollama is running and healthy"""
@@ -115,13 +124,16 @@ class OllamaSummarizer:
             print(f"Error capturing frame from {segment_path}: {e}")
             return False, None
     
-    def generate_caption_from_image(self, frame, frame_number: int = 0) -> str:
+    def generate_caption_from_image(self, frame, frame_number: int = 0, camera_id: int = None,
+                                    interval: str = None) -> str:
         """
         Generate caption for a single frame using Ollama Gemma 3:4b
         
         Args:
             frame: OpenCV frame
             frame_number: Frame number for context
+            camera_id: Camera the frame is from (metrics label)
+            interval: Summary interval the caption is for (metrics label)
         
         Returns:
             Caption text
@@ -131,7 +143,8 @@ class OllamaSummarizer:
         
         try:
             # Encode frame to base64
-            frame_b64 = self.frame_to_base64(frame)
+            with span('caption_encode', frame=frame_number):
+                frame_b64 = self.frame_to_base64(frame)
             
             # Create prompt for frame analysis
             prompt = f"""Analyze this video frame (frame #{frame_number}) and provide a concise caption describing:
@@ -143,18 +156,25 @@ class OllamaSummarizer:
 Keep the caption to 1-2 sentences, factual and descriptive."""
             
             # Call Ollama API with vision capability
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "images": [frame_b64],
-                    "stream": False,
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                },
-                timeout=30
-            )
+            started = time.time()
+            ok = False
+            try:
+                with span('caption_inference'):
+                    response = requests.post(
+                        f"{self.ollama_url}/api/generate",
+                        json={
+                            "model": self.model,
+                            "prompt": prompt,
+                            "images": [frame_b64],
+                            "stream": False,
+                            "temperature": 0.3,
+                            "top_p": 0.9,
+                        },
+                        timeout=30
+                    )
+                ok = response.status_code == 200
+            finally:
+                record_llm_request('ollama', camera_id, interval, 'caption', started, ok)
             
             if response.status_code == 200:
                 result = response.json()
@@ -165,7 +185,8 @@ Keep the caption to 1-2 sentences, factual and descriptive."""
         except Exception as e:
             return f"Caption generation error: {str(e)}"
     
-    def generate_temporal_summary(self, frames: List, camera_id: int, interval: str) -> str:
+    def generate_temporal_summary(self, frames: List, camera_id: int, interval: str, captions_out: List = None,
+                                  structured_out: Dict = None) -> str:
         """
         Generate summary from multiple frames using Ollama
         
@@ -173,6 +194,8 @@ Keep the caption to 1-2 sentences, factual and descriptive."""
             frames: List of frames to analyze
             camera_id: Camera ID
             interval: Time interval
+            captions_out: Optional list that receives the per-frame captions
+            structured_out: Optional dict that receives counts, object classes and activity level
         
         Returns:
             Summary text
@@ -187,9 +210,11 @@ Keep the caption to 1-2 sentences, factual and descriptive."""
             
             for idx, frame in enumerate(frames):
                 if idx % frame_sample_rate == 0:
-                    caption = self.generate_caption_from_image(frame, idx)
+                    caption = self.generate_caption_from_image(frame, idx, camera_id, interval)
                     if caption:
                         captions.append(f"Frame {idx}: {caption}")
+                        if captions_out is not None:
+                            captions_out.append(caption)
             
             # Generate overall summary from captions
             if not captions:
@@ -207,23 +232,38 @@ Generate a concise summary describing:
 3. Notable observations
 4. Any patterns or changes
 
-Keep it brief (2-3 sentences) and factual."""
+Keep it brief (2-3 sentences) and factual.
+
+{STRUCTURED_PROMPT}"""
             
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": summary_prompt,
-                    "stream": False,
-                    "temperature": 0.3,
-                    "top_p": 0.9,
-                },
-                timeout=30
-            )
+            started = time.time()
+            ok = False
+            try:
+                with span('summary_inference'):
+                    response = requests.post(
+                        f"{self.ollama_url}/api/generate",
+                        json={
+                            "model": self.model,
+                            "prompt": summary_prompt,
+                            "stream": False,
+                            "format": "json",  # Constrain output to valid JSON
+                            "temperature": 0.3,
+                            "top_p": 0.9,
+                        },
+                        timeout=30
+                    )
+                ok = response.status_code == 200
+            finally:
+                record_llm_request('ollama', camera_id, interval, 'summary', started, ok)
             
             if response.status_code == 200:
                 result = response.json()
-                return result.get("response", "Failed to generate summary").strip()
+                summary_text, structured = parse_structured_summary(
+                    result.get("response", "Failed to generate summary").strip()
+                )
+                if structured and structured_out is not None:
+                    structured_out.update(structured)
+                return summary_text
             else:
                 return f"API Error: {response.status_code}"
         
@@ -241,6 +281,25 @@ Keep it brief (2-3 sentences) and factual."""
                     'frame': frame,
                     'timestamp': timestamp
                 })
+                FRAME_BUFFER_DEPTH.labels('ollama', camera_id, interval).set(
+                    len(self.frame_buffers[camera_id][interval]))
+    
+    def drop_frames(self, camera_id: int):
+        """Discard the buffered frames of a camera removed from the configuration"""
+        with self.lock:
+            self.frame_buffers.pop(camera_id, None)
+        for interval in self.INTERVALS:
+            FRAME_BUFFER_DEPTH.remove('ollama', camera_id, interval)
+    
+    def memory_usage(self) -> Dict:
+        """Frames held in the interval buffers and the summary window (polled by /api/debug/memory)"""
+        buffers = frame_buffers_usage(self.frame_buffers)
+        summaries = self.summaries.memory_usage()
+        return {
+            'bytes': buffers['bytes'] + summaries['approx_bytes'],
+            'frame_buffers': buffers,
+            'summaries': summaries,
+        }
     
     def should_generate_summary(self, camera_id: int, interval: str) -> bool:
         """Check if it's time to generate summary for this interval"""
@@ -252,7 +311,7 @@ Keep it brief (2-3 sentences) and factual."""
     
     def generate_summary(self, camera_id: int, interval: str, camera_name: str = None) -> Dict:
         """Generate summary for a specific camera and interval"""
-        with self.lock:
+        with traced_lock(self.lock):
             if not self.should_generate_summary(camera_id, interval):
                 return None
             
@@ -268,7 +327,10 @@ Keep it brief (2-3 sentences) and factual."""
                 sample_frames.append(frames_data[i]['frame'])
             
             # Generate summary using Ollama
-            summary_text = self.generate_temporal_summary(sample_frames, camera_id, interval)
+            captions = []
+            structured = {}
+            with span('summarize', interval=interval, frames=len(frames_data)):
+                summary_text = self.generate_temporal_summary(sample_frames, camera_id, interval, captions, structured)
             
             # Create summary record
             summary_record = {
@@ -279,6 +341,8 @@ Keep it brief (2-3 sentences) and factual."""
                 'frames_analyzed': len(frames_data),
                 'frames_sampled': len(sample_frames),
                 'summary': summary_text,
+                'captions': captions,
+                'structured': structured or None,
                 'start_time': frames_data[0]['timestamp'].isoformat() if frames_data else None,
                 'end_time': frames_data[-1]['timestamp'].isoformat() if frames_data else None,
                 'model': self.model,
@@ -286,50 +350,68 @@ Keep it brief (2-3 sentences) and factual."""
             }
             
             # Store summary
-            self.summaries[camera_id][interval].append(summary_record)
+            self.summaries.append(camera_id, interval, summary_record)
             
             # Update last generation time
             self.last_summary_times[camera_id][interval] = time.time()
             
             # Clear frame buffer
             self.frame_buffers[camera_id][interval] = []
+            FRAME_BUFFER_DEPTH.labels('ollama', camera_id, interval).set(0)
+            SUMMARIES_GENERATED.labels('ollama', camera_id, interval).inc()
             
-            # Save to file
-            self.save_summary(camera_id, interval, summary_record)
+            # Save to file (and run the summary listeners: indexing, analytics)
+            with span('save', interval=interval):
+                self.save_summary(camera_id, interval, summary_record)
             
             return summary_record
     
     def save_summary(self, camera_id: int, interval: str, summary: Dict):
-        """Save summary to JSON file"""
+        """Append summary to the per-camera summary log"""
         try:
-            summary_dir = os.path.join(self.output_dir, f'camera_{camera_id}')
-            os.makedirs(summary_dir, exist_ok=True)
-            
-            filename = os.path.join(
-                summary_dir,
-                f"{interval}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            )
-            
-            with open(filename, 'w') as f:
-                json.dump(summary, f, indent=2)
+            self.store.append(camera_id, interval, summary)
             
             print(f"✓ Saved {interval} summary for camera {camera_id}")
         
         except Exception as e:
             print(f"Error saving summary: {e}")
+        
+        for listener in self.summary_listeners:
+            try:
+                listener(camera_id, summary)
+            except Exception as e:
+                print(f"Error in summary listener: {e}")
     
     def get_all_summaries(self, camera_id: int = None) -> Dict:
-        """Get all generated summaries"""
-        with self.lock:
-            if camera_id is not None:
-                return self.summaries.get(camera_id, {})
-            return dict(self.summaries)
+        """
+        Get recent summaries held in the in-memory window
+        
+        Returns an immutable snapshot (tuples per interval) that is safe to
+        serialize without holding any lock while new summaries are appended
+        """
+        if camera_id is not None:
+            summaries = self.summaries.snapshot(camera_id)
+            return summaries if any(summaries.values()) else {}
+        return self.summaries.snapshot()
+    
+    def get_summaries_page(self, camera_id: int = None, interval: str = None, after_key: tuple = None,
+                           limit: int = 100) -> List[Dict]:
+        """
+        Get summaries oldest first, strictly after a cursor key (see summary_store.encode_cursor),
+        or the newest `limit` summaries when no cursor is given
+        """
+        camera_ids = [camera_id] if camera_id is not None else None
+        intervals = [interval] if interval else None
+        return self.summaries.page(after_key, camera_ids, intervals, limit)
+    
+    def get_summary_history(self, camera_id: int, start_time: datetime = None, end_time: datetime = None,
+                            interval: str = None) -> List[Dict]:
+        """Get summaries in a time range from the persisted summary log"""
+        return [summary for _, summary in self.store.query(camera_id, start_time, end_time, interval)]
     
     def get_latest_summary(self, camera_id: int, interval: str) -> Dict:
         """Get most recent summary for a camera and interval"""
-        with self.lock:
-            summaries = self.summaries[camera_id][interval]
-            return summaries[-1] if summaries else None
+        return self.summaries.latest(camera_id, interval)
     
     def export_summaries_report(self, camera_id: int = None) -> str:
         """Generate text report of all summaries"""
@@ -341,8 +423,8 @@ Keep it brief (2-3 sentences) and factual."""
             ""
         ]
         
-        with self.lock:
-            summaries_data = self.summaries.get(camera_id) if camera_id else self.summaries
+        with self.summaries.lock:
+            summaries_data = self.summaries.snapshot(camera_id) if camera_id else self.summaries.snapshot()
             
             if isinstance(summaries_data, dict) and 'minute' in summaries_data:
                 # Single camera
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+query_cache.py
+LRU cache for /api/chat search results with per-camera generation counters
+
+Every cached entry remembers the generation of the cameras it was computed
+from. Writing a summary or clip for a camera bumps that camera's generation,
+which invalidates exactly the entries that depended on it.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class QueryCache:
+    """Thread-safe LRU cache keyed by normalized chat query parameters"""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize query cache
+
+        Args:
+            max_entries: Maximum cached queries before least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict()
+
+        # camera_id -> generation, plus a global counter for all-camera queries
+        self.generations: Dict[int, int] = {}
+        self.global_generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Case-fold, drop punctuation and collapse whitespace"""
+        return ' '.join(re.sub(r"[^\w\s]", ' ', (query or '').lower()).split())
+
+    def make_key(self, query: str, camera_id: Optional[int], start_time: Optional[str],
+                 end_time: Optional[str], search_type: str, *extra) -> Tuple:
+        return (self.normalize_query(query), camera_id, start_time or '', end_time or '', search_type) + extra
+
+    def _dependency_version(self, camera_id: Optional[int]):
+        if camera_id is None:
+            return self.global_generation
+        return self.generations.get(camera_id, 0)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return the cached value, or None on a miss or stale entry"""
+        camera_id = key[1]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            version, value = entry
+            if version != self._dependency_version(camera_id):
+                del self.entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        camera_id = key[1]
+        with self.lock:
+            self.entries[key] = (self._dependency_version(camera_id), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def bump(self, camera_id: int, *_):
+        """Mark a camera's data as changed (usable directly as a summary/clip listener)"""
+        with self.lock:
+            self.generations[camera_id] = self.generations.get(camera_id, 0) + 1
+            self.global_generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'generations': dict(self.generations)
+            }
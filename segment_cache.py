@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+segment_cache.py
+In-memory cache of the live HLS window (playlists, segments, LL-HLS parts)
+
+Every viewer of a camera asks for the same few files, so they are read from
+disk once and served from memory. Entries are validated with a stat()
+against (inode, mtime, size) because ffmpeg rewrites playlists in place and
+reuses segment names after a restart. Concurrent misses for the same file
+wait for a single read (single flight). When a playlist is loaded, cached
+media in its directory that it no longer lists is evicted, so the cache
+follows ffmpeg's delete_segments window.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+PLAYLIST_EXTENSIONS = ('.m3u8',)
+MEDIA_EXTENSIONS = ('.ts', '.m4s', '.mp4')
+
+
+def playlist_uris(text: str) -> Set[str]:
+    """Segment, part, map and preload-hint URIs referenced by a media playlist"""
+    uris = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('#'):
+            uris.add(line)
+        elif 'URI="' in line:
+            uris.add(line.split('URI="', 1)[1].split('"', 1)[0])
+    return uris
+
+
+class CachedFile:
+    """File contents plus the stat signature they were read with"""
+
+    __slots__ = ('data', 'signature', 'etag', 'mtime')
+
+    def __init__(self, data: bytes, st: os.stat_result):
+        self.data = data
+        self.signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self.etag = f'{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}'
+        self.mtime = st.st_mtime
+
+
+class SegmentCache:
+    """Byte-bounded LRU of live HLS files with single-flight loading"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_file_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialize segment cache
+
+        Args:
+            max_bytes: Total cached bytes before least recently used files are dropped
+            max_file_bytes: Larger files are read for the request but not kept
+        """
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+
+        self.entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self.size = 0
+        self.loading: Dict[str, threading.Event] = {}
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _drop(self, path: str):
+        """Remove an entry (lock held)"""
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= len(entry.data)
+            self.evictions += 1
+
+    def _store(self, path: str, entry: CachedFile):
+        """Insert an entry and trim to max_bytes (lock held)"""
+        old = self.entries.pop(path, None)
+        if old is not None:
+            self.size -= len(old.data)
+        self.entries[path] = entry
+        self.size += len(entry.data)
+        while self.size > self.max_bytes and self.entries:
+            self._drop(next(iter(self.entries)))
+
+    def _evict_unlisted(self, playlist_path: str, data: bytes):
+        """Drop cached media next to a playlist that the playlist no longer references (lock held)"""
+        text = data.decode('utf-8', errors='replace')
+        if '#EXT-X-TARGETDURATION' not in text:
+            return  # Master playlists list renditions, not media
+        directory = os.path.dirname(playlist_path)
+        listed = {os.path.normpath(os.path.join(directory, uri)) for uri in playlist_uris(text)}
+        for path in [p for p in self.entries if os.path.dirname(p) == directory]:
+            if path.endswith(MEDIA_EXTENSIONS) and path not in listed:
+                self._drop(path)
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        """
+        Current contents of a file, from memory when unchanged on disk
+
+        Returns:
+            CachedFile, or None if the file does not exist
+        """
+        waited = False
+        while True:
+            try:
+                st = os.stat(path)
+            except OSError:
+                with self.lock:
+                    self._drop(path)
+                return None
+            signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+            with self.lock:
+                entry = self.entries.get(path)
+                if entry is not None and entry.signature == signature:
+                    self.entries.move_to_end(path)
+                    if not waited:
+                        self.hits += 1
+                    return entry
+
+                event = self.loading.get(path)
+                if event is None:
+                    # This request reads the file; others for it wait below
+                    event = self.loading[path] = threading.Event()
+                    if not waited:
+                        self.misses += 1
+                    break
+                if not waited:
+                    self.coalesced += 1
+
+            event.wait()
+            waited = True
+            # Loop: re-stat and pick up what the loader stored
+
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except OSError:
+            data = None
+
+        with self.lock:
+            del self.loading[path]
+            event.set()
+            if data is None:
+                self._drop(path)
+                return None
+            entry = CachedFile(data, st)
+            if len(data) <= self.max_file_bytes:
+                self._store(path, entry)
+                if path.endswith(PLAYLIST_EXTENSIONS):
+                    self._evict_unlisted(path, data)
+            return entry
+
+    def stats(self) -> Dict:
+        with self.lock:
+            requests = self.hits + self.misses + self.coalesced
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'disk_reads_per_request': round(self.misses / requests, 4) if requests else 0.0
+            }
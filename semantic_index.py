@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+semantic_index.py
+Local vector search over summary and caption embeddings
+Embeddings come from a local Ollama embedding endpoint and are stored in a
+memory-mapped float32 matrix per camera
+"""
+
+import os
+import json
+import queue
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import requests
+
+
+class EmbeddingClient:
+    """Thin client for the local Ollama embeddings endpoint"""
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "nomic-embed-text", timeout: int = 10):
+        """
+        Initialize embedding client
+
+        Args:
+            base_url: URL to Ollama API endpoint (or mock_ollama_server.py)
+            model: Embedding model name
+            timeout: Request timeout in seconds
+        """
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed a piece of text, returns a float32 vector or None on failure"""
+        if not text:
+            return None
+
+        try:
+            response = requests.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.model, "prompt": text},
+                timeout=self.timeout
+            )
+            if response.status_code != 200:
+                print(f"Embedding API Error: {response.status_code}")
+                return None
+
+            embedding = response.json().get("embedding")
+            if not embedding:
+                return None
+            return np.asarray(embedding, dtype=np.float32)
+        except Exception as e:
+            print(f"Embedding error: {e}")
+            return None
+
+
+class CameraVectorStore:
+    """
+    Memory-mapped float32 matrix of unit-normalized vectors for one camera
+
+    Files in the camera directory:
+        vectors.f32   raw row-major float32 matrix (capacity x dim)
+        rows.jsonl    one metadata line per row, in row order
+        meta.json     dim, row count and capacity
+
+    add() only writes to the mapped matrix and appends to rows.jsonl;
+    flush() syncs the matrix and then replaces meta.json, so the count in
+    meta.json only ever covers rows whose vectors reached the file. Rows
+    appended after the last flush are dropped on load (and trimmed from
+    rows.jsonl before the next add) and re-indexed by the backfill.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    # IVF partitioning kicks in once the matrix holds this many rows
+    IVF_MIN_ROWS = 4096
+    IVF_NPROBE = 8
+    IVF_KMEANS_ITERATIONS = 10
+
+    def __init__(self, directory: str, use_ivf: bool = True):
+        self.directory = directory
+        self.use_ivf = use_ivf
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.rows_path = os.path.join(directory, 'rows.jsonl')
+        self.meta_path = os.path.join(directory, 'meta.json')
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.dim = 0
+        self.count = 0
+        self.capacity = 0
+        self.matrix = None
+        self.rows: List[Dict] = []
+        self.times: List[float] = []
+        self._times_array = None
+        self.row_ids = set()  # (key, kind, text) of every row, for deduplication
+        self.pending = 0  # Rows added since the last flush()
+        self.rows_file_checked = False
+
+        # IVF state: centroids (nlist x dim) and per-list row ids
+        self.centroids = None
+        self.inverted_lists: List[np.ndarray] = []
+        self.ivf_built_at = 0
+
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Open existing matrix and row metadata"""
+        if not os.path.exists(self.meta_path):
+            return
+
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            self.dim = meta['dim']
+            self.capacity = meta['capacity']
+
+            if os.path.exists(self.rows_path):
+                with open(self.rows_path, 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self.rows.append(json.loads(line))
+
+            # rows.jsonl is appended after the vector, so it bounds the valid row count
+            self.count = min(meta['count'], len(self.rows))
+            self.rows = self.rows[:self.count]
+            self.times = [self._epoch(row.get('timestamp')) for row in self.rows]
+            self.row_ids = {self._row_id(row) for row in self.rows}
+            self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+        except Exception as e:
+            print(f"Error loading vector store {self.directory}: {e}")
+            self.dim = self.count = self.capacity = 0
+            self.matrix = None
+            self.rows = []
+            self.times = []
+            self.row_ids = set()
+
+    @staticmethod
+    def _row_id(row: Dict) -> tuple:
+        # A summary has one summary row and one row per caption, told apart by their text
+        return row.get('key'), row.get('kind'), row.get('text')
+
+    def contains(self, row: Dict) -> bool:
+        """True if a row with the same key, kind and text is stored"""
+        with self.lock:
+            return self._row_id(row) in self.row_ids
+
+    def _trim_rows_file(self):
+        """Drop rows.jsonl lines past self.count (rows appended after the last flush before a restart)"""
+        self.rows_file_checked = True
+        if not os.path.exists(self.rows_path):
+            return
+        with open(self.rows_path, 'r') as f:
+            lines = [line for line in f if line.strip()]
+        if len(lines) <= self.count:
+            return
+        tmp_path = self.rows_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(lines[:self.count])
+        os.replace(tmp_path, self.rows_path)
+        print(f"⚠️  Dropped {len(lines) - self.count} unflushed rows from {self.rows_path}")
+
+    @staticmethod
+    def _epoch(timestamp: str) -> float:
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
+    def _save_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'dim': self.dim, 'count': self.count, 'capacity': self.capacity}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _flush(self):
+        self.matrix.flush()
+        self._save_meta()
+        self.pending = 0
+
+    def flush(self):
+        """Persist rows added since the last flush (vectors first, then the count in meta.json)"""
+        with self.lock:
+            if self.pending:
+                self._flush()
+
+    def _grow(self, min_capacity: int):
+        """Grow the backing file by doubling and remap it"""
+        new_capacity = max(self.INITIAL_CAPACITY, self.capacity)
+        while new_capacity < min_capacity:
+            new_capacity *= 2
+
+        if self.matrix is not None:
+            self.matrix.flush()
+            del self.matrix
+
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+
+        self.capacity = new_capacity
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+        self._save_meta()
+
+    def add(self, vector: np.ndarray, row: Dict) -> bool:
+        """Append a vector and its metadata row (False if invalid or already stored; call flush() after)"""
+        norm = float(np.linalg.norm(vector))
+        if norm == 0:
+            return False
+        vector = (vector / norm).astype(np.float32)
+
+        with self.lock:
+            row_id = self._row_id(row)
+            if row_id in self.row_ids:
+                return False
+            if not self.rows_file_checked:
+                self._trim_rows_file()
+
+            if self.dim == 0:
+                self.dim = vector.shape[0]
+            elif vector.shape[0] != self.dim:
+                print(f"Embedding dimension mismatch ({vector.shape[0]} != {self.dim}), skipping")
+                return False
+
+            if self.count >= self.capacity:
+                self._grow(self.count + 1)
+
+            self.matrix[self.count] = vector
+
+            with open(self.rows_path, 'a') as f:
+                f.write(json.dumps(row) + "\n")
+
+            self.rows.append(row)
+            self.times.append(self._epoch(row.get('timestamp')))
+            self._times_array = None
+            self.row_ids.add(row_id)
+            self.count += 1
+            self.pending += 1
+
+            if self.centroids is not None:
+                nearest = int(np.argmax(self.centroids @ vector))
+                self.inverted_lists[nearest] = np.append(self.inverted_lists[nearest], self.count - 1)
+
+            return True
+
+    def _build_ivf(self):
+        """Spherical k-means over the current rows to build the inverted lists"""
+        data = self.matrix[:self.count]
+        nlist = max(2, int(np.sqrt(self.count)))
+
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(self.count, nlist, replace=False)].copy()
+
+        for _ in range(self.IVF_KMEANS_ITERATIONS):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assignment == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    if norm > 0:
+                        centroids[c] = centroid / norm
+
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.inverted_lists = [np.flatnonzero(assignment == c) for c in range(nlist)]
+        self.ivf_built_at = self.count
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Row ids to score, or None to score the whole matrix"""
+        if not self.use_ivf or self.count < self.IVF_MIN_ROWS:
+            return None
+
+        # Rebuild once the matrix has doubled since the last build
+        if self.centroids is None or self.count >= 2 * self.ivf_built_at:
+            self._build_ivf()
+
+        probe = np.argsort(-(self.centroids @ query))[:self.IVF_NPROBE]
+        return np.concatenate([self.inverted_lists[c] for c in probe])
+
+    def _rows_in_window(self, start_dt: Optional[datetime], end_dt: Optional[datetime]) -> np.ndarray:
+        """Row ids with start_dt <= timestamp <= end_dt"""
+        if self._times_array is None:
+            self._times_array = np.asarray(self.times, dtype=np.float64)
+        keep = np.ones(self.count, dtype=bool)
+        if start_dt:
+            keep &= self._times_array >= start_dt.timestamp()
+        if end_dt:
+            keep &= self._times_array <= end_dt.timestamp()
+        return np.flatnonzero(keep)
+
+    def search(self, query: np.ndarray, k: int = 10, start_dt: datetime = None, end_dt: datetime = None) -> List[Dict]:
+        """
+        Top-k cosine search
+
+        Args:
+            query: Query embedding (need not be normalized)
+            k: Number of hits to return
+            start_dt: Only rows with timestamp >= start_dt
+            end_dt: Only rows with timestamp <= end_dt
+
+        Returns:
+            List of row metadata dicts with a 'score' key, best first
+        """
+        with self.lock:
+            if self.count == 0 or query.shape[0] != self.dim:
+                return []
+
+            norm = float(np.linalg.norm(query))
+            if norm == 0:
+                return []
+            query = (query / norm).astype(np.float32)
+
+            if start_dt or end_dt:
+                # Exact scan of the rows in the window: the IVF probes cover a
+                # few lists of the whole history, so a narrow window would
+                # rarely have any of its rows among their candidates
+                row_ids = self._rows_in_window(start_dt, end_dt)
+                scores = self.matrix[row_ids] @ query
+            else:
+                candidates = self._candidate_rows(query)
+                if candidates is None:
+                    scores = self.matrix[:self.count] @ query
+                    row_ids = np.arange(self.count)
+                else:
+                    scores = self.matrix[candidates] @ query
+                    row_ids = candidates
+
+            if len(scores) == 0:
+                return []
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return [{**self.rows[row_ids[i]], 'score': float(scores[i])} for i in top]
+
+
+class SemanticIndex:
+    """Per-camera semantic index over Ollama summaries and frame captions"""
+
+    def __init__(self, index_dir: str, embedding_client: EmbeddingClient = None, use_ivf: bool = True):
+        """
+        Initialize semantic index
+
+        Args:
+            index_dir: Directory holding one vector store per camera
+            embedding_client: Client used for both indexing and queries
+            use_ivf: Enable IVF partitioning for large matrices
+        """
+        self.index_dir = index_dir
+        self.client = embedding_client or EmbeddingClient()
+        self.use_ivf = use_ivf
+        self.stores: Dict[int, CameraVectorStore] = {}
+        self.lock = threading.Lock()
+
+        # Summaries are embedded on a background thread so the capture loop never waits
+        self.queue = queue.Queue()
+        self.thread = None
+
+        # Callables invoked as listener(camera_id, summary) once a summary is searchable
+        self.listeners: List[Callable[[int, Dict], None]] = []
+
+        os.makedirs(index_dir, exist_ok=True)
+
+    @staticmethod
+    def summary_key(summary: Dict) -> str:
+        """Stable key joining index rows back to their summary"""
+        return f"{summary.get('interval', '')}|{summary.get('timestamp', '')}"
+
+    def get_store(self, camera_id: int) -> CameraVectorStore:
+        with self.lock:
+            if camera_id not in self.stores:
+                self.stores[camera_id] = CameraVectorStore(
+                    os.path.join(self.index_dir, f'camera_{camera_id}'),
+                    use_ivf=self.use_ivf
+                )
+            return self.stores[camera_id]
+
+    def reload(self, camera_id: int):
+        """Drop a camera's loaded store so the next search re-reads what another process added"""
+        with self.lock:
+            self.stores.pop(camera_id, None)
+
+    def camera_ids(self) -> List[int]:
+        """Cameras that have a vector store on disk"""
+        camera_ids = []
+        for name in os.listdir(self.index_dir):
+            if name.startswith('camera_'):
+                try:
+                    camera_ids.append(int(name.split('_', 1)[1]))
+                except ValueError:
+                    continue
+        return sorted(camera_ids)
+
+    def memory_usage(self) -> Dict:
+        """
+        Per loaded store: rows, the memory-mapped vector file (paged in on
+        search, shared with the page cache) and in-memory IVF/time arrays
+        """
+        with self.lock:
+            stores = dict(self.stores)
+        cameras = {}
+        for camera_id, store in stores.items():
+            arrays = [store.centroids, store._times_array] + list(store.inverted_lists)
+            cameras[camera_id] = {
+                'rows': store.count,
+                'mapped_bytes': store.capacity * store.dim * 4,
+                'bytes': sum(array.nbytes for array in arrays if array is not None),
+            }
+        return {
+            'bytes': sum(camera['bytes'] for camera in cameras.values()),
+            'mapped_bytes': sum(camera['mapped_bytes'] for camera in cameras.values()),
+            'queued': self.queue.qsize(),
+            'cameras': cameras,
+        }
+
+    def start(self):
+        """Start the background embedding worker"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        while True:
+            camera_id, summary = self.queue.get()
+            try:
+                self.index_summary(camera_id, summary)
+            except Exception as e:
+                print(f"Error indexing summary for camera {camera_id}: {e}")
+
+    def add_summary(self, camera_id: int, summary: Dict):
+        """Queue a saved summary for embedding"""
+        self.start()
+        self.queue.put((camera_id, summary))
+
+    def index_summary(self, camera_id: int, summary: Dict) -> int:
+        """Embed a summary and its captions synchronously, returns rows added"""
+        text = summary.get('summary', '')
+        if not text or 'error' in text.lower():
+            return 0
+
+        store = self.get_store(camera_id)
+        key = self.summary_key(summary)
+        record = {k: v for k, v in summary.items() if k != 'captions'}
+        added = 0
+
+        rows = [{
+            'key': key,
+            'kind': 'summary',
+            'timestamp': summary.get('timestamp'),
+            'text': text,
+            'record': record
+        }] + [{
+            'key': key,
+            'kind': 'caption',
+            'timestamp': summary.get('timestamp'),
+            'text': caption
+        } for caption in summary.get('captions', [])]
+
+        for row in rows:
+            # Rows already stored (indexed by the worker, or before a failed embed) are not re-embedded
+            if store.contains(row):
+                continue
+            vector = self.client.embed(row['text'])
+            if vector is not None and store.add(vector, row):
+                added += 1
+
+        if added:
+            store.flush()
+            for listener in self.listeners:
+                listener(camera_id, summary)
+
+        return added
+
+    def index_store(self, summary_store) -> int:
+        """
+        Backfill summary and caption rows from a SummaryLogStore that are not indexed yet
+
+        Safe to run alongside the worker: rows are deduplicated by the store,
+        and summaries whose embedding failed earlier are retried.
+        """
+        added = 0
+        for camera_id in summary_store.cameras():
+            for _, summary in summary_store.query(camera_id):
+                added += self.index_summary(camera_id, summary)
+
+        return added
+
+    def search(self, query: str, camera_ids: List[int], k: int = 10,
+               start_dt: datetime = None, end_dt: datetime = None) -> List[Dict]:
+        """
+        Semantic search across cameras
+
+        Returns one hit per summary (best of its summary and caption rows), best first.
+        Each hit is the stored summary record plus 'semantic_score' and 'matched_text'.
+        """
+        query_vector = self.client.embed(query)
+        if query_vector is None:
+            return []
+
+        best: Dict[tuple, Dict] = {}
+        records: Dict[tuple, Dict] = {}
+
+        for camera_id in camera_ids:
+            store = self.get_store(camera_id)
+
+            # Over-fetch so caption rows do not crowd out distinct summaries
+            for hit in store.search(query_vector, k * 4, start_dt, end_dt):
+                key = (camera_id, hit['key'])
+                if hit['kind'] == 'summary':
+                    records[key] = hit['record']
+                if key not in best or hit['score'] > best[key]['score']:
+                    best[key] = hit
+
+        results = []
+        for key, hit in best.items():
+            record = records.get(key)
+            if record is None:
+                record = self._find_record(key[0], key[1])
+            if record is None:
+                continue
+            results.append({
+                **record,
+                'semantic_score': round(hit['score'], 4),
+                'matched_text': hit['text']
+            })
+
+        results.sort(key=lambda x: -x['semantic_score'])
+        return results[:k]
+
+    def _find_record(self, camera_id: int, key: str) -> Optional[Dict]:
+        """Look up the summary record for a key whose summary row was not in the hits"""
+        store = self.get_store(camera_id)
+        for row in reversed(store.rows):
+            if row['key'] == key and row['kind'] == 'summary':
+                return row['record']
+        return None
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+shared_state.py
+SQLite-backed state shared between the ingest daemon and API workers
+
+The ingest process (ffmpeg supervisor, summarizers, capture loops) owns all
+live state. It publishes:
+
+- documents: small JSON values under a key (stream health, encodings,
+  telemetry, LL-HLS stats), overwritten every few seconds
+- events: an append-only feed of changes other processes must fold into
+  their in-memory views ('summary', 'indexed', 'clip'), pruned by age
+
+API workers read documents on request and follow the event feed with a
+background poller. The database runs in WAL mode so readers never block
+the writer.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class SharedState:
+    """Key/value documents and an event feed in one SQLite file"""
+
+    def __init__(self, db_path: str, event_retention_seconds: int = 3600):
+        """
+        Initialize shared state
+
+        Args:
+            db_path: SQLite database file (created if missing)
+            event_retention_seconds: Events older than this are pruned
+        """
+        self.db_path = db_path
+        self.event_retention_seconds = event_retention_seconds
+        self.local = threading.local()
+        self.last_prune = 0.0
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                camera_id INTEGER,
+                payload TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_created ON events (created_at);
+        """)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections can't be shared across threads)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Documents
+    # ------------------------------------------------------------------
+
+    def put(self, key: str, value: Any):
+        self.put_many({key: value})
+
+    def put_many(self, documents: Dict[str, Any]):
+        """Replace several documents in one transaction"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO documents (key, value, updated_at) VALUES (?, ?, ?)',
+                [(key, json.dumps(value, default=str), now) for key, value in documents.items()]
+            )
+
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """(value, updated_at) of a document, (None, None) if it was never published"""
+        row = self._conn().execute('SELECT value, updated_at FROM documents WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def publish(self, kind: str, camera_id: Optional[int] = None, payload: Any = None) -> int:
+        """Append an event, returns its sequence number"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO events (kind, camera_id, payload, created_at) VALUES (?, ?, ?, ?)',
+                (kind, camera_id, json.dumps(payload, default=str) if payload is not None else None, now)
+            )
+            if now - self.last_prune > 60:
+                conn.execute('DELETE FROM events WHERE created_at < ?', (now - self.event_retention_seconds,))
+                self.last_prune = now
+        return cursor.lastrowid
+
+    def last_seq(self) -> int:
+        row = self._conn().execute('SELECT MAX(seq) FROM events').fetchone()
+        return row[0] or 0
+
+    def events_since(self, seq: int, limit: int = 500) -> List[Dict]:
+        rows = self._conn().execute(
+            'SELECT seq, kind, camera_id, payload, created_at FROM events WHERE seq > ? ORDER BY seq LIMIT ?',
+            (seq, limit)
+        ).fetchall()
+        return [{
+            'seq': row[0],
+            'kind': row[1],
+            'camera_id': row[2],
+            'payload': json.loads(row[3]) if row[3] is not None else None,
+            'created_at': row[4],
+        } for row in rows]
+
+    def follow(self, handler: Callable[[Dict], None], start_seq: int = None, poll_interval: float = 1.0):
+        """
+        Call handler(event) for every new event on a background thread
+
+        Args:
+            handler: Invoked in sequence order; exceptions are logged and skipped
+            start_seq: Sequence to follow from (default: events published from now on)
+            poll_interval: Seconds between polls when the feed is idle
+        """
+        seq = self.last_seq() if start_seq is None else start_seq
+
+        def loop():
+            nonlocal seq
+            while True:
+                try:
+                    events = self.events_since(seq)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Shared state poll failed: {e}")
+                    events = []
+                for event in events:
+                    seq = event['seq']
+                    try:
+                        handler(event)
+                    except Exception as e:
+                        print(f"Error handling {event['kind']} event: {e}")
+                if not events:
+                    time.sleep(poll_interval)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict:
+        conn = self._conn()
+        documents = conn.execute('SELECT COUNT(*), MAX(updated_at) FROM documents').fetchone()
+        events = conn.execute('SELECT COUNT(*), MAX(seq) FROM events').fetchone()
+        return {
+            'db_path': self.db_path,
+            'documents': documents[0],
+            'last_publish_age': round(time.time() - documents[1], 1) if documents[1] else None,
+            'events': events[0],
+            'last_event_seq': events[1] or 0,
+        }
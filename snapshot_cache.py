@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+snapshot_cache.py
+Latest decoded frame per camera, with pre-encoded JPEGs at a few sizes
+
+One refresher thread per camera watches the live playlist and decodes the
+first frame (a keyframe, segments are independent) of each new segment
+once. The frame is kept for in-process consumers (frame capture for the
+summarizers) and JPEG-encoded at every size in SNAPSHOT_SIZES, so grid
+previews and thumbnails are served from memory without a decode.
+
+Refreshers start on first use and exit after `idle_timeout` without
+readers, so cameras nobody looks at cost nothing.
+
+A snapshot's age counts from when its segment was published (the segment's
+end), not from the frame itself: the newest complete segment always starts
+a segment duration or more in the past, so `max_age` below that could
+never be met if measured from the frame.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+
+from dvr_archive import playlist_segments
+
+# name -> output width (None = source resolution); heights keep the aspect ratio
+SNAPSHOT_SIZES = {'thumb': 320, 'medium': 640, 'full': None}
+
+
+class Snapshot:
+    """One decoded frame and its JPEG encodings"""
+
+    __slots__ = ('frame', 'jpegs', 'captured_at', 'published_at', 'segment', 'etag')
+
+    def __init__(self, frame, jpegs: Dict[str, bytes], captured_at: float, published_at: float, segment: str):
+        self.frame = frame
+        self.jpegs = jpegs
+        self.captured_at = captured_at  # Wall-clock time of the frame (segment start)
+        self.published_at = published_at  # When the segment was complete (segment end)
+        self.segment = segment
+        self.etag = f'{int(captured_at * 1000):x}'
+
+    def age(self) -> float:
+        """Seconds since the snapshot's segment was published"""
+        return time.time() - self.published_at
+
+
+class SnapshotCache:
+    """Per-camera latest-frame cache with a single background refresher per camera"""
+
+    def __init__(self, hls_dir: str, refresh_interval: float = 1.0, idle_timeout: float = 60,
+                 jpeg_quality: int = 80):
+        """
+        Initialize snapshot cache
+
+        Args:
+            hls_dir: Root HLS directory (playlists at stream_<id>/playlist.m3u8)
+            refresh_interval: Seconds between checks for a new segment
+            idle_timeout: A camera's refresher stops after this long without reads
+            jpeg_quality: JPEG quality for the pre-encoded sizes
+        """
+        self.hls_dir = hls_dir
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self.jpeg_quality = jpeg_quality
+
+        self.snapshots: Dict[int, Snapshot] = {}
+        self.last_read: Dict[int, float] = {}
+        self.refreshers: Dict[int, threading.Thread] = {}
+        self.condition = threading.Condition()
+
+        self.decodes = 0
+        self.hits = 0
+        self.waits = 0
+
+    # ------------------------------------------------------------------
+    # Refreshing
+    # ------------------------------------------------------------------
+
+    def _playlist_path(self, camera_id: int) -> str:
+        return os.path.join(self.hls_dir, f'stream_{camera_id}', 'playlist.m3u8')
+
+    def _newest_segment(self, camera_id: int) -> Optional[Tuple[str, float, float]]:
+        """(path, wall-clock start, wall-clock end) of the newest complete segment of a camera"""
+        playlist_path = self._playlist_path(camera_id)
+        segments = playlist_segments(playlist_path)
+        if not segments:
+            return None
+        _, uri, start_ms, duration_ms, _ = segments[-1]
+        path = os.path.join(os.path.dirname(playlist_path), uri)
+        if start_ms is None:
+            # No PROGRAM-DATE-TIME: the file was last written when the segment ended
+            try:
+                end = os.path.getmtime(path)
+            except OSError:
+                return None
+            return path, end - duration_ms / 1000, end
+        return path, start_ms / 1000, (start_ms + duration_ms) / 1000
+
+    def _decode(self, segment_path: str, captured_at: float, published_at: float) -> Optional[Snapshot]:
+        cap = cv2.VideoCapture(segment_path)
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            return None
+        self.decodes += 1
+
+        height, width = frame.shape[:2]
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        jpegs = {}
+        for name, target_width in SNAPSHOT_SIZES.items():
+            if target_width and target_width < width:
+                resized = cv2.resize(frame, (target_width, int(height * target_width / width)),
+                                     interpolation=cv2.INTER_AREA)
+            else:
+                resized = frame
+            ok, buffer = cv2.imencode('.jpg', resized, params)
+            if ok:
+                jpegs[name] = buffer.tobytes()
+        return Snapshot(frame, jpegs, captured_at, published_at, os.path.basename(segment_path))
+
+    def refresh(self, camera_id: int) -> bool:
+        """Decode the camera's newest segment if it changed, True if a new snapshot was stored"""
+        newest = self._newest_segment(camera_id)
+        if newest is None:
+            return False
+        segment_path, captured_at, published_at = newest
+        current = self.snapshots.get(camera_id)
+        if current is not None and current.captured_at >= captured_at:
+            return False
+
+        try:
+            snapshot = self._decode(segment_path, captured_at, published_at)
+        except Exception as e:
+            print(f"⚠️  Snapshot decode failed for camera {camera_id}: {e}")
+            return False
+        if snapshot is None:
+            return False
+
+        with self.condition:
+            self.snapshots[camera_id] = snapshot
+            self.condition.notify_all()
+        return True
+
+    def _refresh_loop(self, camera_id: int):
+        while True:
+            self.refresh(camera_id)
+            time.sleep(self.refresh_interval)
+            with self.condition:
+                if time.time() - self.last_read.get(camera_id, 0) > self.idle_timeout:
+                    del self.refreshers[camera_id]
+                    return
+
+    def _touch(self, camera_id: int):
+        """Record a read and make sure the camera has its refresher (condition held)"""
+        self.last_read[camera_id] = time.time()
+        if camera_id not in self.refreshers:
+            thread = threading.Thread(target=self._refresh_loop, args=(camera_id,), daemon=True)
+            self.refreshers[camera_id] = thread
+            thread.start()
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def get(self, camera_id: int, max_age: float = None, timeout: float = 5.0) -> Optional[Snapshot]:
+        """
+        Latest snapshot of a camera
+
+        Args:
+            camera_id: Camera to read
+            max_age: Oldest acceptable snapshot in seconds since its segment was
+                published; waits (up to timeout) for the refresher to produce a newer one
+            timeout: Longest wait for a first or fresh enough snapshot
+
+        Returns:
+            Snapshot, or None if no acceptable snapshot was available in time
+        """
+        if camera_id not in self.snapshots and not os.path.exists(self._playlist_path(camera_id)):
+            return None  # Stream not running, nothing to wait for
+
+        deadline = time.time() + timeout
+        with self.condition:
+            self._touch(camera_id)
+            waited = False
+            while True:
+                snapshot = self.snapshots.get(camera_id)
+                if snapshot is not None and (max_age is None or snapshot.age() <= max_age):
+                    if not waited:
+                        self.hits += 1
+                    return snapshot
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self.condition.wait(remaining)
+
+    def jpeg(self, camera_id: int, size: str = 'medium', max_age: float = None) -> Optional[Tuple[bytes, Snapshot]]:
+        """(JPEG bytes, snapshot) at one of SNAPSHOT_SIZES, None if unavailable"""
+        snapshot = self.get(camera_id, max_age)
+        if snapshot is None or size not in snapshot.jpegs:
+            return None
+        return snapshot.jpegs[size], snapshot
+
+    def frame(self, camera_id: int, max_age: float = None):
+        """Latest decoded BGR frame (shared, do not modify in place), None if unavailable"""
+        snapshot = self.get(camera_id, max_age)
+        return snapshot.frame if snapshot is not None else None
+
+    def memory_usage(self) -> Dict:
+        """Decoded frames and pre-encoded JPEGs held (one snapshot per camera)"""
+        with self.condition:
+            snapshots = list(self.snapshots.values())
+        frame_bytes = sum(snapshot.frame.nbytes for snapshot in snapshots)
+        jpeg_bytes = sum(len(data) for snapshot in snapshots for data in snapshot.jpegs.values())
+        return {
+            'bytes': frame_bytes + jpeg_bytes,
+            'frames': len(snapshots),
+            'frame_bytes': frame_bytes,
+            'jpeg_bytes': jpeg_bytes,
+        }
+
+    def stats(self) -> Dict:
+        with self.condition:
+            cameras = {
+                camera_id: {
+                    'age_seconds': round(snapshot.age(), 1),
+                    'segment': snapshot.segment,
+                    'sizes': {name: len(data) for name, data in snapshot.jpegs.items()},
+                    'refreshing': camera_id in self.refreshers,
+                }
+                for camera_id, snapshot in self.snapshots.items()
+            }
+            return {
+                'decodes': self.decodes,
+                'hits': self.hits,
+                'waits': self.waits,
+                'refreshers': len(self.refreshers),
+                'cameras': cameras,
+            }
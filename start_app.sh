@@ -185,6 +185,9 @@ for camera_id in range(1):  # Camera 0
 print("\n✓ Test data generated successfully!")
 PYTHON_SCRIPT
 
+# Append the flat test summaries to the per-camera summary log
+python "$BASE_DIR/migrate_summaries.py" "$BASE_DIR/ollama_video_summaries" > /dev/null
+
 echo -e "${GREEN}✓ Test data created${NC}"
 echo ""
 
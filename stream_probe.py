@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+stream_probe.py
+Codec probing for camera streams and the ffmpeg encoding decision it drives
+
+Most cameras already send browser-playable H.264, so HLS output can use
+`-c:v copy` and skip the transcode. Probe results are cached on disk per
+stream URL so restarts don't pay the ffprobe round-trip again.
+"""
+
+import os
+import json
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# H.264 profiles every HLS player (hls.js/MSE and Safari) decodes
+BROWSER_H264_PROFILES = {'baseline', 'constrained baseline', 'main', 'high'}
+BROWSER_PIX_FMTS = {'yuv420p', 'yuvj420p'}
+
+# Audio that can go into HLS unchanged
+BROWSER_AUDIO_CODECS = {'aac', 'mp3'}
+
+TRANSCODE_VIDEO_ARGS = [
+    '-c:v', 'libx264',
+    '-preset', 'ultrafast',
+    '-b:v', '1200k',
+    '-maxrate', '1500k',
+    '-bufsize', '2000k',
+    '-g', '20',  # GOP size = 20 frames for better segment boundaries
+]
+
+TRANSCODE_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '128k']
+
+
+def probe_stream(url: str, timeout: int = 15) -> Optional[Dict]:
+    """
+    Read codec parameters of a stream with ffprobe
+
+    Returns:
+        {'video': {...} or None, 'audio': {...} or None}, or None if probing failed
+    """
+    cmd = ['ffprobe', '-v', 'error']
+    if url.startswith('rtsp://'):
+        cmd += ['-rtsp_transport', 'tcp']
+    cmd += ['-show_streams', '-of', 'json', url]
+
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"⚠️  ffprobe failed: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"⚠️  ffprobe failed: {result.stderr.strip()[:200]}")
+        return None
+
+    try:
+        streams = json.loads(result.stdout).get('streams', [])
+    except ValueError:
+        return None
+
+    info = {'video': None, 'audio': None}
+    for stream in streams:
+        kind = stream.get('codec_type')
+        if kind == 'video' and info['video'] is None:
+            info['video'] = {
+                'codec': stream.get('codec_name'),
+                'profile': stream.get('profile'),
+                'pix_fmt': stream.get('pix_fmt'),
+                'width': stream.get('width'),
+                'height': stream.get('height'),
+                'frame_rate': stream.get('avg_frame_rate') or stream.get('r_frame_rate'),
+            }
+        elif kind == 'audio' and info['audio'] is None:
+            info['audio'] = {
+                'codec': stream.get('codec_name'),
+                'sample_rate': stream.get('sample_rate'),
+                'channels': stream.get('channels'),
+            }
+    return info
+
+
+def video_is_browser_compatible(video: Optional[Dict]) -> Tuple[bool, str]:
+    if not video:
+        return False, 'no video stream detected'
+    if video.get('codec') != 'h264':
+        return False, f"codec {video.get('codec')}"
+    profile = (video.get('profile') or '').lower()
+    if profile and profile not in BROWSER_H264_PROFILES:
+        return False, f"H.264 profile {video.get('profile')}"
+    if video.get('pix_fmt') and video['pix_fmt'] not in BROWSER_PIX_FMTS:
+        return False, f"pixel format {video['pix_fmt']}"
+    return True, f"h264 {video.get('profile') or ''} {video.get('pix_fmt') or ''}".strip()
+
+
+def choose_encoding(info: Optional[Dict], mode: str = 'auto') -> Dict:
+    """
+    Decide ffmpeg video/audio arguments for a probed stream
+
+    Args:
+        info: Result of probe_stream() (None if probing failed)
+        mode: 'auto' (copy when compatible), 'copy' (always copy) or 'transcode' (always transcode)
+
+    Returns:
+        {'video_args': [...], 'audio_args': [...], 'video': 'copy'|'transcode',
+         'audio': 'copy'|'transcode'|'none', 'reason': str}
+    """
+    video = info.get('video') if info else None
+    audio = info.get('audio') if info else None
+
+    if mode == 'copy':
+        video_copy, reason = True, 'copy forced'
+    elif mode == 'transcode':
+        video_copy, reason = False, 'transcode forced'
+    elif info is None:
+        # Unknown source: transcoding always produces playable output
+        video_copy, reason = False, 'probe failed'
+    else:
+        video_copy, reason = video_is_browser_compatible(video)
+
+    if info is not None and audio is None:
+        audio_args, audio_decision = ['-an'], 'none'
+    elif audio and audio.get('codec') in BROWSER_AUDIO_CODECS and mode != 'transcode':
+        audio_args, audio_decision = ['-c:a', 'copy'], 'copy'
+    else:
+        audio_args, audio_decision = TRANSCODE_AUDIO_ARGS, 'transcode'
+
+    return {
+        'video_args': ['-c:v', 'copy'] if video_copy else TRANSCODE_VIDEO_ARGS,
+        'audio_args': audio_args,
+        'video': 'copy' if video_copy else 'transcode',
+        'audio': audio_decision,
+        'reason': reason,
+    }
+
+
+class CodecProbeCache:
+    """On-disk cache of probe_stream() results keyed by stream URL"""
+
+    def __init__(self, cache_file: str, ttl_seconds: int = 24 * 3600):
+        """
+        Initialize probe cache
+
+        Args:
+            cache_file: JSON file holding cached probe results
+            ttl_seconds: Re-probe a stream after this long (cameras rarely change codecs)
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable codec cache {cache_file}: {e}")
+
+    def _save(self):
+        tmp_path = self.cache_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.cache_file)
+
+    def get(self, url: str, refresh: bool = False) -> Optional[Dict]:
+        """Cached probe result for a URL, probing if missing, stale or refresh=True"""
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and not refresh and time.time() - entry.get('probed_at', 0) < self.ttl_seconds:
+            return entry['info']
+
+        info = probe_stream(url)
+        if info is None:
+            # Keep serving the last good result if the camera is briefly unreachable
+            return entry['info'] if entry else None
+
+        with self.lock:
+            self.entries[url] = {'info': info, 'probed_at': time.time()}
+            try:
+                self._save()
+            except Exception as e:
+                print(f"⚠️  Could not write codec cache: {e}")
+        return info
+
+    def invalidate(self, url: str = None):
+        with self.lock:
+            if url is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(url, None)
+            self._save()
+
+
+def describe_decision(camera_id, info: Optional[Dict], decision: Dict) -> str:
+    """One-line log message for an encoding decision"""
+    video = (info or {}).get('video') or {}
+    audio = (info or {}).get('audio') or {}
+    source = f"{video.get('codec', '?')} {video.get('width', '?')}x{video.get('height', '?')}"
+    if audio:
+        source += f" + {audio.get('codec')}"
+    return (f"Camera {camera_id}: {source} → video {decision['video']} ({decision['reason']}), "
+            f"audio {decision['audio']}")
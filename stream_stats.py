@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+stream_stats.py
+Incrementally maintained per-camera stream directory statistics
+
+ffmpeg only ever adds a segment by listing it in playlist.m3u8, and with
+delete_segments it removes segments some time after they drop out of the
+list. A background thread stats each tracked playlist; when it changed,
+the (short) playlist is parsed once and diffed against the previous one:
+
+- newly listed segments are "created": stat once, added to the counters
+- segments no longer listed are "pending delete": checked with a stat
+  until ffmpeg removes them, then subtracted
+
+The parsed playlist header (media sequence, target duration, last program
+date time) is cached by mtime. Reads return the maintained counters without
+touching the disk, however many segments the directory holds. A full
+directory scan runs only when a camera is first tracked, after an ffmpeg
+restart (the media sequence goes back) and every `rescan_interval` to
+reconcile anything the diff cannot see.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List
+
+PLAYLIST_NAME = 'playlist.m3u8'
+LATEST_SEGMENTS = 15
+DELETE_SLACK = 3  # Unlisted segments ffmpeg may still delete (hls_delete_threshold + margin)
+
+
+def parse_playlist(text: str) -> Dict:
+    """Header fields and segment URIs of a media playlist"""
+    header = {'uris': []}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            header['last_timestamp'] = line.split(':', 1)[1]
+        elif line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            header['media_sequence'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            header['target_duration'] = int(line.split(':', 1)[1])
+        elif line and not line.startswith('#'):
+            header['uris'].append(line)
+    return header
+
+
+class CameraStreamStats:
+    """Counters for one stream directory"""
+
+    def __init__(self, stream_dir: str):
+        self.stream_dir = stream_dir
+        self.segments: "OrderedDict[str, os.stat_result]" = OrderedDict()  # .ts on disk, oldest first
+        self.segment_bytes = 0
+        self.pending_delete = set()
+        self.others: Dict[str, int] = {}  # Other top-level files (logs, master playlist) -> size
+        self.playlist_signature = None
+        self.playlist_size = 0
+        self.header: Dict = {'uris': []}
+        self.online = False
+        self.error = None
+        self.last_scan = 0.0
+
+    def _add_segment(self, name: str, st: os.stat_result):
+        old = self.segments.pop(name, None)
+        if old is not None:
+            self.segment_bytes -= old.st_size
+        self.segments[name] = st
+        self.segment_bytes += st.st_size
+
+    def _remove_segment(self, name: str):
+        old = self.segments.pop(name, None)
+        if old is not None:
+            self.segment_bytes -= old.st_size
+
+    def scan(self):
+        """Rebuild every counter from a directory listing"""
+        self.segments.clear()
+        self.segment_bytes = 0
+        self.pending_delete.clear()
+        self.others.clear()
+        self.playlist_signature = None
+        self.playlist_size = 0
+        self.last_scan = time.time()
+
+        try:
+            entries = list(os.scandir(self.stream_dir))
+        except FileNotFoundError:
+            entries = []
+        segments = []
+        for entry in entries:
+            if not entry.is_file() or entry.name == PLAYLIST_NAME:
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            if entry.name.endswith('.ts'):
+                segments.append((st.st_mtime, entry.name, st))
+            else:
+                self.others[entry.name] = st.st_size
+        for _, name, st in sorted(segments):
+            self._add_segment(name, st)
+        self.update()
+
+        # ffmpeg deletes a segment a little after it leaves the playlist; the
+        # newest unlisted ones may still go, older ones are kept for good
+        listed = set(self.header['uris'])
+        recent = list(self.segments)[-(len(listed) + DELETE_SLACK):]
+        self.pending_delete.update(name for name in recent if name not in listed)
+
+    def update(self):
+        """Apply the segment creates/deletes implied by a changed playlist"""
+        playlist_path = os.path.join(self.stream_dir, PLAYLIST_NAME)
+        try:
+            st = os.stat(playlist_path)
+        except OSError:
+            self.online = False
+            self.playlist_size = 0
+            return
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if signature == self.playlist_signature:
+            return
+
+        try:
+            with open(playlist_path, 'r') as f:
+                header = parse_playlist(f.read())
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            return
+
+        previous_sequence = self.header.get('media_sequence')
+        if previous_sequence is not None and header.get('media_sequence', 0) < previous_sequence:
+            # ffmpeg restarted with a cleaned directory and reuses segment names
+            self.header = {'uris': []}
+            self.scan()
+            return
+
+        self.playlist_signature = signature
+        self.playlist_size = st.st_size
+        self.online = True
+        self.error = None
+
+        listed = set(header['uris'])
+        for name in header['uris']:
+            if name not in self.segments:
+                try:
+                    self._add_segment(name, os.stat(os.path.join(self.stream_dir, name)))
+                except OSError:
+                    pass
+        self.pending_delete.update(name for name in self.header['uris'] if name not in listed)
+        self.pending_delete -= listed
+        for name in list(self.pending_delete):
+            if not os.path.exists(os.path.join(self.stream_dir, name)):
+                self._remove_segment(name)
+                self.pending_delete.discard(name)
+
+        for name in list(self.others):
+            try:
+                self.others[name] = os.path.getsize(os.path.join(self.stream_dir, name))
+            except OSError:
+                del self.others[name]
+        self.header = header
+
+    def metadata(self, camera_id: int) -> Dict:
+        """Same shape as the former directory-scanning get_stream_metadata()"""
+        latest: List[Dict] = []
+        for name in reversed(self.segments):
+            st = self.segments[name]
+            latest.append({
+                'name': name,
+                'size_kb': round(st.st_size / 1024, 2),
+                'mtime': datetime.fromtimestamp(st.st_mtime).isoformat()
+            })
+            if len(latest) == LATEST_SEGMENTS:
+                break
+
+        total_size = self.segment_bytes + self.playlist_size + sum(self.others.values())
+        metadata = {
+            'camera_id': camera_id,
+            'stream_path': self.stream_dir,
+            'total_segments': len(self.segments),
+            'total_size_mb': round(total_size / (1024 * 1024), 2),
+            'playlist_size_kb': round(self.playlist_size / 1024, 2),
+            'segments_info': latest,
+            'status': 'online' if self.online else 'offline'
+        }
+        for key in ('last_timestamp', 'media_sequence', 'target_duration'):
+            if key in self.header:
+                metadata[key] = self.header[key]
+        if self.error:
+            metadata['error'] = self.error
+        return metadata
+
+
+class StreamStats:
+    """Tracks every camera that has been asked for, refreshed by one background thread"""
+
+    def __init__(self, hls_dir: str, poll_interval: float = 1.0, rescan_interval: float = 300):
+        """
+        Initialize stream stats
+
+        Args:
+            hls_dir: Root HLS directory (stream_<id>/ per camera)
+            poll_interval: Seconds between playlist checks
+            rescan_interval: Seconds between reconciling full directory scans
+        """
+        self.hls_dir = hls_dir
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.cameras: Dict[int, CameraStreamStats] = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+        self.scans = 0
+        self.playlist_updates = 0
+
+    def _camera(self, camera_id: int) -> CameraStreamStats:
+        """Stats of a camera, scanned the first time it is asked for (lock held)"""
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            camera = self.cameras[camera_id] = CameraStreamStats(
+                os.path.join(self.hls_dir, f'stream_{camera_id}'))
+            camera.scan()
+            self.scans += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._poll_loop, daemon=True)
+                self.thread.start()
+        return camera
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with self.lock:
+                cameras = list(self.cameras.items())
+            for camera_id, camera in cameras:
+                try:
+                    if time.time() - camera.last_scan >= self.rescan_interval:
+                        # Scan into a fresh object so reads aren't blocked by a large directory
+                        fresh = CameraStreamStats(camera.stream_dir)
+                        fresh.scan()
+                        with self.lock:
+                            self.cameras[camera_id] = fresh
+                            self.scans += 1
+                    else:
+                        with self.lock:
+                            signature = camera.playlist_signature
+                            camera.update()
+                            if camera.playlist_signature != signature:
+                                self.playlist_updates += 1
+                except Exception as e:
+                    camera.error = str(e)
+
+    def metadata(self, camera_id: int) -> Dict:
+        """Current stream statistics of a camera (no disk access once tracked)"""
+        with self.lock:
+            return self._camera(camera_id).metadata(camera_id)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'cameras': len(self.cameras),
+                'scans': self.scans,
+                'playlist_updates': self.playlist_updates,
+            }
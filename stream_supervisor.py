@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+stream_supervisor.py
+Keeps one ffmpeg HLS process per camera alive
+
+All cameras are started concurrently (each start may spend seconds on
+ffprobe and the RTSP handshake), then a monitor thread checks every
+process: an exited ffmpeg, or one whose playlist stops advancing (mtime and
+media sequence / newest segment unchanged for `stall_timeout`), is stopped
+and restarted with exponential backoff. Cameras can be added and removed
+while running (camera config hot reload); a camera's start and removal
+are serialized so a stream that is still starting is never leaked.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def playlist_progress(playlist_path: str) -> Optional[Tuple[int, str]]:
+    """(media sequence, newest segment URI) of an HLS playlist, None if unreadable"""
+    try:
+        with open(playlist_path, 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    media_sequence = 0
+    newest = ''
+    for line in lines:
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            try:
+                media_sequence = int(line.split(':', 1)[1])
+            except ValueError:
+                pass
+        elif line and not line.startswith('#'):
+            newest = line
+    return media_sequence, newest
+
+
+class StreamSupervisor:
+    """Parallel startup, stall detection and backoff restarts for camera ffmpeg processes"""
+
+    def __init__(self, start_stream: Callable, stop_stream: Callable, processes: Dict, hls_dir: str,
+                 check_interval: float = 5, stall_timeout: float = 20, startup_grace: float = 30,
+                 backoff_base: float = 2, backoff_max: float = 120, stable_after: float = 60):
+        """
+        Initialize stream supervisor
+
+        Args:
+            start_stream: start_stream(camera_id, rtsp_url, substream_url) -> bool
+            stop_stream: stop_stream(camera_id)
+            processes: camera_id -> subprocess.Popen, maintained by start/stop_stream
+            hls_dir: Root HLS directory (playlists at stream_<id>/playlist.m3u8)
+            check_interval: Seconds between health checks
+            stall_timeout: Seconds without playlist progress before a running stream is restarted
+            startup_grace: Seconds a freshly started stream gets to write its first segment
+            backoff_base: First restart delay; doubles on each consecutive failure
+            backoff_max: Upper bound on the restart delay
+            stable_after: Uptime with progress after which the backoff resets
+        """
+        self.start_stream = start_stream
+        self.stop_stream = stop_stream
+        self.processes = processes
+        self.hls_dir = hls_dir
+        self.check_interval = check_interval
+        self.stall_timeout = stall_timeout
+        self.startup_grace = startup_grace
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+
+        self.streams: Dict[int, Dict] = {}
+        self.lock = threading.Lock()
+        self.start_locks: Dict[int, threading.Lock] = defaultdict(threading.Lock)  # Held across a start/removal
+        self.running = False
+        self.thread = None
+
+    def playlist_path(self, camera_id: int) -> str:
+        return os.path.join(self.hls_dir, f'stream_{camera_id}', 'playlist.m3u8')
+
+    # ------------------------------------------------------------------
+    # Starting
+    # ------------------------------------------------------------------
+
+    def _register(self, camera_id: int, camera: Dict) -> bool:
+        """Create a camera's state, False (with a warning) if it has no rtsp_url to stream"""
+        if not camera.get('rtsp_url'):
+            print(f"⚠️  Camera {camera_id} has no rtsp_url, not starting its stream")
+            return False
+        with self.lock:
+            self.streams[camera_id] = {
+                'rtsp_url': camera['rtsp_url'],
+                'substream_url': camera.get('substream_url'),
+                'status': 'starting',
+                'started_at': None,
+                'restarts': 0,
+                'failures': 0,  # Consecutive failures, drives the backoff
+                'last_failure': None,
+                'last_failure_time': None,
+                'next_restart_at': None,
+                'progress': None,
+                'playlist_mtime': None,
+                'last_progress_time': None,
+            }
+        return True
+
+    def start_all(self, cameras: List[Dict]):
+        """
+        Start every camera concurrently and begin monitoring
+
+        Args:
+            cameras: Camera configs ('id' or index = camera_id) with 'rtsp_url' and optional 'substream_url'
+        """
+        threads = []
+        for idx, camera in enumerate(cameras):
+            camera_id = camera.get('id', idx)
+            if not self._register(camera_id, camera):
+                continue
+            thread = threading.Thread(target=self._start, args=(camera_id,), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+        print(f"✓ Started {len(threads)} camera streams in parallel")
+
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._monitor_loop, daemon=True)
+            self.thread.start()
+
+    def add_camera(self, camera_id: int, camera: Dict):
+        """Start and monitor a camera added to the configuration (returns once it started or failed)"""
+        if self._register(camera_id, camera):
+            self._start(camera_id)
+
+    def remove_camera(self, camera_id: int):
+        """Stop a camera removed from the configuration and forget its state"""
+        with self.lock:
+            start_lock = self.start_locks[camera_id]
+        with start_lock:
+            with self.lock:
+                self.streams.pop(camera_id, None)
+            self.stop_stream(camera_id)
+
+    def _start(self, camera_id: int):
+        with self.lock:
+            start_lock = self.start_locks[camera_id]
+        with start_lock:
+            self._start_locked(camera_id)
+
+    def _start_locked(self, camera_id: int):
+        with self.lock:
+            state = self.streams.get(camera_id)
+            if state is None:
+                return  # Removed while the start was queued
+            rtsp_url, substream_url = state['rtsp_url'], state['substream_url']
+
+        ok = self.start_stream(camera_id, rtsp_url, substream_url)
+
+        with self.lock:
+            now = time.time()
+            if ok:
+                state.update({
+                    'status': 'running',
+                    'started_at': now,
+                    'progress': None,
+                    'playlist_mtime': None,
+                    'last_progress_time': now,  # Start of the startup grace period
+                    'next_restart_at': None,
+                })
+            else:
+                self._schedule_restart(state, 'failed to start', now)
+
+    # ------------------------------------------------------------------
+    # Monitoring
+    # ------------------------------------------------------------------
+
+    def _schedule_restart(self, state: Dict, reason: str, now: float):
+        """Record a failure and the backoff delay before the next start (lock held)"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** state['failures']))
+        state.update({
+            'status': 'backoff',
+            'started_at': None,
+            'failures': state['failures'] + 1,
+            'last_failure': reason,
+            'last_failure_time': now,
+            'next_restart_at': now + delay,
+        })
+        return delay
+
+    def _check(self, camera_id: int, state: Dict, now: float) -> Optional[str]:
+        """Failure reason for a running stream, or None if it is healthy (lock held)"""
+        process = self.processes.get(camera_id)
+        if process is None:
+            return 'process missing'
+        exit_code = process.poll()
+        if exit_code is not None:
+            return f'ffmpeg exited with code {exit_code}'
+
+        playlist_path = self.playlist_path(camera_id)
+        try:
+            mtime = os.path.getmtime(playlist_path)
+        except OSError:
+            mtime = None
+
+        # Only re-read the playlist when ffmpeg has rewritten it
+        if mtime is not None and mtime != state['playlist_mtime']:
+            state['playlist_mtime'] = mtime
+            progress = playlist_progress(playlist_path)
+            if progress is not None and progress != state['progress']:
+                state['progress'] = progress
+                state['last_progress_time'] = now
+                if now - state['started_at'] >= self.stable_after:
+                    state['failures'] = 0  # Healthy long enough; the next failure restarts quickly
+
+        limit = self.stall_timeout if state['progress'] is not None else self.startup_grace
+        if now - state['last_progress_time'] > limit:
+            return f'no playlist progress for {int(now - state["last_progress_time"])}s'
+        return None
+
+    def _monitor_loop(self):
+        while self.running:
+            now = time.time()
+            to_stop, to_start = [], []
+
+            with self.lock:
+                for camera_id, state in self.streams.items():
+                    if state['status'] == 'running':
+                        reason = self._check(camera_id, state, now)
+                        if reason:
+                            delay = self._schedule_restart(state, reason, now)
+                            to_stop.append(camera_id)
+                            print(f"⚠️  Camera {camera_id} stream unhealthy ({reason}), restarting in {delay:g}s")
+                    elif state['status'] == 'backoff' and now >= state['next_restart_at']:
+                        state['status'] = 'starting'
+                        state['restarts'] += 1
+                        to_start.append(camera_id)
+
+            for camera_id in to_stop:
+                self.stop_stream(camera_id)
+            for camera_id in to_start:
+                threading.Thread(target=self._start, args=(camera_id,), daemon=True).start()
+
+            time.sleep(self.check_interval)
+
+    def stop(self):
+        """Stop monitoring (streams are left to the caller to stop)"""
+        self.running = False
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        now = time.time()
+        cameras = {}
+        with self.lock:
+            for camera_id, state in self.streams.items():
+                cameras[camera_id] = {
+                    'status': state['status'],
+                    'uptime_seconds': round(now - state['started_at'], 1) if state['started_at'] else 0,
+                    'restarts': state['restarts'],
+                    'consecutive_failures': state['failures'],
+                    'last_failure': state['last_failure'],
+                    'last_failure_age': round(now - state['last_failure_time'], 1) if state['last_failure_time'] else None,
+                    'next_restart_in': round(max(0, state['next_restart_at'] - now), 1) if state['next_restart_at'] else None,
+                    'media_sequence': state['progress'][0] if state['progress'] else None,
+                    'last_progress_age': round(now - state['last_progress_time'], 1) if state['last_progress_time'] else None,
+                }
+        return {
+            'monitoring': self.running,
+            'healthy': sum(1 for c in cameras.values() if c['status'] == 'running'),
+            'total': len(cameras),
+            'cameras': cameras
+        }
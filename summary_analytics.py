@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+summary_analytics.py
+Structured fields extracted from temporal summaries, stored for fast
+time-series aggregation
+
+Summarizers ask the model for JSON alongside the prose (see
+STRUCTURED_PROMPT) and keep the parsed fields under summary['structured']:
+    {'people_count': int, 'vehicle_count': int,
+     'object_counts': {class: int}, 'activity_level': 'none'|'low'|'medium'|'high'}
+
+SummaryAnalyticsStore keeps those fields in SQLite tables clustered by
+(interval, camera_id, ts) (WITHOUT ROWID), so an aggregation over any camera
+and time range is a single contiguous range scan and a GROUP BY on integer
+time buckets. Each row also stores its local wall-clock time (local_ts, the
+epoch shifted by the UTC offset in effect at that timestamp), and buckets
+group on it, so hour and day buckets follow local midnight on both sides of
+a DST change. An hourly rollup (count/sum/min/max per metric) is maintained
+on insert, so hour and day buckets over months read one row per camera-hour
+instead of one per summary.
+"""
+
+import os
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from summary_store import SummaryLogStore, to_local_naive
+
+ACTIVITY_LEVELS = {'none': 0, 'low': 1, 'medium': 2, 'high': 3}
+
+METRICS = {
+    'people': 'people',
+    'vehicles': 'vehicles',
+    'activity': 'activity',
+}
+
+AGGREGATES = {
+    'max': 'MAX',
+    'min': 'MIN',
+    'avg': 'AVG',
+    'sum': 'SUM',
+    'count': 'COUNT',
+}
+
+# Origin of local_ts; buckets are computed on local wall-clock seconds
+WALL_CLOCK_EPOCH = datetime(1970, 1, 1)
+
+BUCKETS = {
+    'minute': 60,
+    '5_minutes': 300,
+    'hour': 3600,
+    'day': 86400,
+}
+
+STRUCTURED_PROMPT = """Respond with a JSON object only, with these keys:
+  "summary": the prose summary,
+  "people_count": number of distinct people seen (integer),
+  "vehicle_count": number of distinct vehicles seen (integer),
+  "object_counts": object class to count, e.g. {"person": 2, "car": 1, "dog": 1},
+  "activity_level": one of "none", "low", "medium", "high"."""
+
+
+def _as_count(value) -> int:
+    try:
+        return max(0, int(round(float(value))))
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_structured_summary(text: str) -> Tuple[str, Optional[Dict]]:
+    """
+    Split a model response into (prose summary, structured fields)
+
+    Accepts a bare JSON object, a fenced ```json block, or prose followed by
+    a JSON object. Returns (text, None) when no usable JSON is present.
+    """
+    if not text:
+        return text, None
+
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return text.strip(), None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return text.strip(), None
+    if not isinstance(data, dict):
+        return text.strip(), None
+
+    object_counts = data.get('object_counts') or {}
+    if not isinstance(object_counts, dict):
+        object_counts = {}
+    object_counts = {
+        str(name).strip().lower(): _as_count(count)
+        for name, count in object_counts.items() if str(name).strip()
+    }
+
+    activity = str(data.get('activity_level', '')).strip().lower()
+    structured = {
+        'people_count': _as_count(data.get('people_count', object_counts.get('person', 0))),
+        'vehicle_count': _as_count(data.get('vehicle_count', 0)),
+        'object_counts': {name: count for name, count in object_counts.items() if count > 0},
+        'activity_level': activity if activity in ACTIVITY_LEVELS else None,
+    }
+
+    # Prose comes from the "summary" key, else whatever surrounds the JSON
+    prose = data.get('summary')
+    if not isinstance(prose, str) or not prose.strip():
+        prose = (text[:match.start()] + text[match.end():]).replace('```json', '').replace('```', '')
+    return prose.strip(), structured
+
+
+class SummaryAnalyticsStore:
+    """SQLite time-series store of structured summary fields"""
+
+    def __init__(self, db_path: str):
+        """
+        Initialize analytics store
+
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS summary_metrics (
+                interval TEXT NOT NULL,
+                camera_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                people INTEGER NOT NULL,
+                vehicles INTEGER NOT NULL,
+                activity INTEGER,
+                local_ts INTEGER,
+                PRIMARY KEY (interval, camera_id, ts)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS summary_objects (
+                interval TEXT NOT NULL,
+                camera_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                object_class TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (interval, camera_id, ts, object_class)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS summary_hourly (
+                interval TEXT NOT NULL,
+                camera_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                samples INTEGER NOT NULL,
+                people_sum INTEGER NOT NULL, people_min INTEGER, people_max INTEGER,
+                vehicles_sum INTEGER NOT NULL, vehicles_min INTEGER, vehicles_max INTEGER,
+                activity_samples INTEGER NOT NULL,
+                activity_sum INTEGER NOT NULL, activity_min INTEGER, activity_max INTEGER,
+                local_ts INTEGER,
+                PRIMARY KEY (interval, camera_id, ts)
+            ) WITHOUT ROWID;
+        """)
+        self._add_local_ts()
+        self.conn.commit()
+
+    def _add_local_ts(self):
+        """Add and fill local_ts in databases created before buckets used it"""
+        self.conn.create_function(
+            'wall_clock', 1, lambda ts: self._wall_clock(datetime.fromtimestamp(ts)), deterministic=True
+        )
+        for table in ('summary_metrics', 'summary_hourly'):
+            columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+            if 'local_ts' not in columns:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN local_ts INTEGER")
+                self.conn.execute(f"UPDATE {table} SET local_ts = wall_clock(ts)")
+
+    @staticmethod
+    def _epoch(dt: datetime) -> int:
+        # Summary timestamps are naive local time
+        return int(to_local_naive(dt).timestamp())
+
+    @staticmethod
+    def _wall_clock(dt: datetime) -> int:
+        # Local wall-clock time counted from 1970-01-01 00:00, i.e. the epoch plus the UTC offset at dt
+        return int((to_local_naive(dt) - WALL_CLOCK_EPOCH).total_seconds())
+
+    def _insert(self, camera_id: int, summary: Dict) -> bool:
+        structured = summary.get('structured')
+        if not structured:
+            return False
+
+        dt = SummaryLogStore.summary_datetime(summary)
+        ts = self._epoch(dt)
+        interval = summary.get('interval', 'minute')
+        people = structured.get('people_count', 0)
+        vehicles = structured.get('vehicle_count', 0)
+        activity = ACTIVITY_LEVELS.get(structured.get('activity_level'))
+
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO summary_metrics VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (interval, camera_id, ts, people, vehicles, activity, self._wall_clock(dt))
+        )
+        if not cursor.rowcount:
+            return False
+
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO summary_objects VALUES (?, ?, ?, ?, ?)",
+            [(interval, camera_id, ts, name, count)
+             for name, count in (structured.get('object_counts') or {}).items()]
+        )
+
+        hour_dt = dt.replace(minute=0, second=0, microsecond=0)
+        self.conn.execute("""
+            INSERT INTO summary_hourly VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (interval, camera_id, ts) DO UPDATE SET
+                samples = samples + 1,
+                people_sum = people_sum + excluded.people_sum,
+                people_min = MIN(people_min, excluded.people_min),
+                people_max = MAX(people_max, excluded.people_max),
+                vehicles_sum = vehicles_sum + excluded.vehicles_sum,
+                vehicles_min = MIN(vehicles_min, excluded.vehicles_min),
+                vehicles_max = MAX(vehicles_max, excluded.vehicles_max),
+                activity_samples = activity_samples + excluded.activity_samples,
+                activity_sum = activity_sum + excluded.activity_sum,
+                activity_min = MIN(COALESCE(activity_min, excluded.activity_min), COALESCE(excluded.activity_min, activity_min)),
+                activity_max = MAX(COALESCE(activity_max, excluded.activity_max), COALESCE(excluded.activity_max, activity_max))
+        """, (interval, camera_id, self._epoch(hour_dt), people, people, people, vehicles, vehicles, vehicles,
+              0 if activity is None else 1, activity or 0, activity, activity, self._wall_clock(hour_dt)))
+        return True
+
+    def add_summary(self, camera_id: int, summary: Dict):
+        """Store a summary's structured fields (usable directly as a summary listener)"""
+        with self.lock:
+            self._insert(camera_id, summary)
+            self.conn.commit()
+
+    def latest_timestamp(self, camera_id: int) -> Optional[datetime]:
+        row = self.conn.execute(
+            "SELECT MAX(ts) FROM summary_metrics WHERE camera_id = ?", (camera_id,)
+        ).fetchone()
+        return datetime.fromtimestamp(row[0]) if row and row[0] is not None else None
+
+    def backfill(self, summary_store: SummaryLogStore) -> int:
+        """Load structured fields for summaries newer than what is already stored"""
+        added = 0
+        for camera_id in summary_store.cameras():
+            with self.lock:
+                since = self.latest_timestamp(camera_id)
+            for _, summary in summary_store.query(camera_id, since):
+                with self.lock:
+                    added += self._insert(camera_id, summary)
+            with self.lock:
+                self.conn.commit()
+        if added:
+            print(f"✓ Analytics store backfilled {added} summaries")
+        return added
+
+    @staticmethod
+    def _where(interval: str, camera_ids: Optional[Iterable[int]], start_dt: Optional[datetime],
+               end_dt: Optional[datetime]) -> Tuple[str, List]:
+        clauses = ["interval = ?"]
+        params: List = [interval]
+        if camera_ids is not None:
+            camera_ids = list(camera_ids)
+            clauses.append(f"camera_id IN ({','.join('?' * len(camera_ids))})")
+            params.extend(camera_ids)
+        if start_dt is not None:
+            clauses.append("ts >= ?")
+            params.append(SummaryAnalyticsStore._epoch(start_dt))
+        if end_dt is not None:
+            clauses.append("ts <= ?")
+            params.append(SummaryAnalyticsStore._epoch(end_dt))
+        return ' AND '.join(clauses), params
+
+    @staticmethod
+    def _hour_aligned(start_dt: Optional[datetime], end_dt: Optional[datetime]) -> bool:
+        """True if the window covers whole hours, i.e. [HH:00:00, HH:59:59]"""
+        def on_hour(dt):
+            return dt.minute == 0 and dt.second == 0 and dt.microsecond == 0
+
+        start_dt = to_local_naive(start_dt)
+        end_dt = to_local_naive(end_dt)
+        return (start_dt is None or on_hour(start_dt)) and \
+            (end_dt is None or on_hour(end_dt.replace(microsecond=0) + timedelta(seconds=1)))
+
+    @staticmethod
+    def _rollup_expression(metric: str, agg: str) -> Tuple[str, str]:
+        """(value, samples) SQL over summary_hourly equivalent to agg(metric) over raw rows"""
+        samples = 'activity_samples' if metric == 'activity' else 'samples'
+        value = {
+            'max': f"MAX({metric}_max)",
+            'min': f"MIN({metric}_min)",
+            'sum': f"SUM({metric}_sum)",
+            'avg': f"SUM({metric}_sum) * 1.0 / NULLIF(SUM({samples}), 0)",
+            'count': f"SUM({samples})",
+        }[agg]
+        return value, f"SUM({samples})"
+
+    def timeseries(self, metric: str = 'people', agg: str = 'max', bucket: str = 'hour',
+                   interval: str = 'minute', camera_ids: Iterable[int] = None, start_dt: datetime = None,
+                   end_dt: datetime = None, per_camera: bool = False) -> List[Dict]:
+        """
+        Aggregate a metric into time buckets
+
+        Args:
+            metric: One of METRICS ('people', 'vehicles', 'activity')
+            agg: One of AGGREGATES
+            bucket: One of BUCKETS
+            interval: Summary interval to read; mixing intervals would count the same scene twice
+            camera_ids: Cameras to include (default: all)
+            start_dt: Window start (inclusive)
+            end_dt: Window end (inclusive)
+            per_camera: One series per camera instead of combined
+
+        Returns:
+            [{'bucket': ISO start of bucket, 'value': number, 'samples': int[, 'camera_id': int]}]
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        if agg not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {agg}")
+        if bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket}")
+
+        where, params = self._where(interval, camera_ids, start_dt, end_dt)
+        size = BUCKETS[bucket]
+        group = "bucket, camera_id" if per_camera else "bucket"
+
+        # Whole-hour windows at hour/day granularity are answered from the rollup
+        if size >= 3600 and self._hour_aligned(start_dt, end_dt):
+            value, samples = self._rollup_expression(METRICS[metric], agg)
+            table = 'summary_hourly'
+        else:
+            column = METRICS[metric]
+            value = f"{AGGREGATES[agg]}({column})"
+            samples = f"COUNT({column})"
+            table = 'summary_metrics'
+
+        sql = (
+            f"SELECT (local_ts / {size}) * {size} AS bucket, "
+            f"{'camera_id, ' if per_camera else ''}"
+            f"{value}, {samples} "
+            f"FROM {table} WHERE {where} GROUP BY {group} ORDER BY {group}"
+        )
+
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+
+        results = []
+        for row in rows:
+            item = {'bucket': (WALL_CLOCK_EPOCH + timedelta(seconds=row[0])).isoformat()}
+            if per_camera:
+                item['camera_id'] = row[1]
+            value = row[-2]
+            item['value'] = round(value, 3) if isinstance(value, float) else value
+            item['samples'] = row[-1]
+            results.append(item)
+        return results
+
+    def object_totals(self, interval: str = 'minute', camera_ids: Iterable[int] = None,
+                      start_dt: datetime = None, end_dt: datetime = None, limit: int = 20) -> List[Dict]:
+        """Object classes by total count, with the peak count seen in a single summary"""
+        where, params = self._where(interval, camera_ids, start_dt, end_dt)
+        sql = (
+            "SELECT object_class, SUM(count), MAX(count), COUNT(*) FROM summary_objects "
+            f"WHERE {where} GROUP BY object_class ORDER BY SUM(count) DESC LIMIT ?"
+        )
+        with self.lock:
+            rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [
+            {'object_class': name, 'total': total, 'peak': peak, 'summaries': summaries}
+            for name, total, peak, summaries in rows
+        ]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            rows, first, last = self.conn.execute(
+                "SELECT COUNT(*), MIN(ts), MAX(ts) FROM summary_metrics"
+            ).fetchone()
+        return {
+            'summaries': rows,
+            'first': datetime.fromtimestamp(first).isoformat() if first else None,
+            'last': datetime.fromtimestamp(last).isoformat() if last else None,
+            'db_path': self.db_path
+        }
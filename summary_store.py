@@ -0,0 +1,703 @@
+#!/usr/bin/env python3
+"""
+summary_store.py
+Append-only, time-partitioned on-disk log for temporal video summaries
+
+Layout:
+    <root>/camera_<id>/<YYYYmmdd>/<HH>.jsonl    hourly segment, one summary per line
+    <root>/camera_<id>/<YYYYmmdd>/<HH>.idx      sparse offset index for the segment
+    <root>/camera_<id>/<YYYYmmdd>/day.jsonl     closed days compacted into one segment
+    <root>/camera_<id>/<YYYYmmdd>/day.idx
+
+Segments are named after the summary timestamp (local time), so a
+time-bounded query skips whole days and hours by name, then mmaps each
+overlapping segment and seeks via the sparse index. Records within a
+segment are kept in timestamp order: a record older than the newest one in
+its segment (a migration, or a summarizer thread that stamped its record
+before taking the lock) rewrites the segment sorted. Writers of a camera,
+in this and other processes, serialize on an flock of camera_<id>/.lock.
+The legacy {interval}_{YYYYmmdd_HHMMSS}.json layout is still available via
+export_files().
+
+SummaryWindow keeps a bounded in-memory view of the newest summaries per
+camera and interval, hydrated lazily from the log on first access.
+"""
+
+import os
+import json
+import fcntl
+import mmap
+import base64
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Sort position of records without a valid timestamp (only legacy lines; append() rejects them)
+MISSING_TIMESTAMP = datetime(1970, 1, 1)
+
+
+def to_local_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """Summary timestamps are naive local time; normalize query bounds to match"""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone().replace(tzinfo=None)
+
+
+class SummaryLogStore:
+    """Per-camera append-only summary log with hourly segments and a sparse index"""
+
+    # One index entry every INDEX_STRIDE records
+    INDEX_STRIDE = 16
+
+    # Closed days older than this are merged into a single day segment
+    COMPACT_AFTER_DAYS = 1
+    COMPACT_INTERVAL = 3600  # Seconds between background compaction passes
+
+    DAY_SEGMENT = 'day'
+
+    def __init__(self, root_dir: str, auto_compact: bool = True):
+        """
+        Initialize summary log store
+
+        Args:
+            root_dir: Directory holding one camera_<id> directory per camera
+            auto_compact: Periodically compact closed days on append
+        """
+        self.root_dir = root_dir
+        self.auto_compact = auto_compact
+        self.lock = threading.Lock()
+
+        # Segment path -> (size, record count, newest timestamp, in order) as last seen by this process
+        self._segments: Dict[str, Tuple[int, int, Optional[datetime], bool]] = {}
+        self._last_compaction = time.time()
+
+        os.makedirs(root_dir, exist_ok=True)
+
+    def camera_dir(self, camera_id: int) -> str:
+        return os.path.join(self.root_dir, f'camera_{camera_id}')
+
+    @staticmethod
+    def parse_timestamp(summary: Dict) -> Optional[datetime]:
+        """A summary's timestamp as naive local time, None if missing or invalid"""
+        try:
+            return to_local_naive(datetime.fromisoformat(summary['timestamp']))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def summary_datetime(cls, summary: Dict) -> datetime:
+        """Timestamp a summary is partitioned and ordered by (MISSING_TIMESTAMP if it has none)"""
+        dt = cls.parse_timestamp(summary)
+        return dt if dt is not None else MISSING_TIMESTAMP
+
+    @classmethod
+    def legacy_filename(cls, summary: Dict) -> str:
+        """Name the summary had in the one-file-per-summary layout"""
+        dt = cls.summary_datetime(summary)
+        return f"{summary.get('interval', 'summary')}_{dt.strftime('%Y%m%d_%H%M%S')}.json"
+
+    def cameras(self) -> List[int]:
+        """Camera ids that have summaries on disk"""
+        camera_ids = []
+        if not os.path.exists(self.root_dir):
+            return camera_ids
+        for name in os.listdir(self.root_dir):
+            if name.startswith('camera_'):
+                try:
+                    camera_ids.append(int(name.split('_', 1)[1]))
+                except ValueError:
+                    continue
+        return sorted(camera_ids)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _camera_write_lock(self, camera_dir: str):
+        """Exclusive across threads and processes for writes under one camera directory"""
+        os.makedirs(camera_dir, exist_ok=True)
+        with self.lock, open(os.path.join(camera_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _segment_state(self, segment_path: str) -> Tuple[int, int, Optional[datetime], bool]:
+        """
+        (size, record count, newest timestamp, records in order) of a segment,
+        re-read whenever its size differs from what this process last saw
+        (another process appended or rewrote it). Repairs a torn last line.
+        """
+        try:
+            size = os.path.getsize(segment_path)
+        except OSError:
+            size = 0
+        cached = self._segments.get(segment_path)
+        if cached is not None and cached[0] == size:
+            return cached
+
+        count = 0
+        newest = None
+        in_order = True
+        if size:
+            with open(segment_path, 'rb') as f:
+                data = f.read()
+            if not data.endswith(b'\n'):
+                # A crash mid-append left a partial line; terminate it so readers skip it
+                with open(segment_path, 'ab') as f:
+                    f.write(b'\n')
+                data += b'\n'
+                size += 1
+            for line in data.split(b'\n')[:-1]:
+                count += 1
+                try:
+                    ts = self.summary_datetime(json.loads(line))
+                except ValueError:
+                    continue
+                if newest is not None and ts < newest:
+                    in_order = False
+                newest = ts if newest is None else max(newest, ts)
+
+        state = (size, count, newest, in_order)
+        self._segments[segment_path] = state
+        return state
+
+    def _write_segment(self, base: str, records: List[Dict]):
+        """Replace a segment and its sparse index with records sorted by timestamp"""
+        records = sorted(records, key=self.summary_datetime)
+        index_lines = []
+        with open(base + '.jsonl.tmp', 'wb') as f:
+            for count, record in enumerate(records):
+                if count % self.INDEX_STRIDE == 0:
+                    index_lines.append(json.dumps({
+                        'ts': self.summary_datetime(record).isoformat(),
+                        'offset': f.tell()
+                    }) + '\n')
+                f.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+
+        with open(base + '.idx.tmp', 'w') as f:
+            f.writelines(index_lines)
+
+        os.replace(base + '.idx.tmp', base + '.idx')
+        os.replace(base + '.jsonl.tmp', base + '.jsonl')
+        self._segments.pop(base + '.jsonl', None)
+
+    def append(self, camera_id: int, interval: str, summary: Dict) -> str:
+        """
+        Append a summary to its hourly segment
+
+        A summary older than the newest one already in the segment rewrites
+        the segment in timestamp order instead of appending.
+
+        Returns:
+            Path of the segment the summary was written to
+
+        Raises:
+            ValueError: If the summary has no valid ISO 'timestamp'
+        """
+        dt = self.parse_timestamp(summary)
+        if dt is None:
+            raise ValueError(f"Summary for camera {camera_id} has no valid timestamp: {summary.get('timestamp')!r}")
+        day_dir = os.path.join(self.camera_dir(camera_id), dt.strftime('%Y%m%d'))
+        base = os.path.join(day_dir, dt.strftime('%H'))
+        segment_path = base + '.jsonl'
+
+        record = summary if summary.get('interval') else {**summary, 'interval': interval}
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._camera_write_lock(self.camera_dir(camera_id)):
+            os.makedirs(day_dir, exist_ok=True)
+            size, count, newest, in_order = self._segment_state(segment_path)
+
+            if not in_order or (newest is not None and dt < newest):
+                self._write_segment(base, list(self._scan_segment(base)) + [record])
+            else:
+                with open(segment_path, 'ab') as f:
+                    offset = f.tell()
+                    f.write(line)
+
+                if count % self.INDEX_STRIDE == 0:
+                    with open(base + '.idx', 'a') as f:
+                        f.write(json.dumps({'ts': dt.isoformat(), 'offset': offset}) + '\n')
+
+                self._segments[segment_path] = (size + len(line), count + 1, max(newest or dt, dt), True)
+
+        if self.auto_compact and time.time() - self._last_compaction > self.COMPACT_INTERVAL:
+            self._last_compaction = time.time()
+            threading.Thread(target=self.compact, daemon=True).start()
+
+        return segment_path
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def iter_segments(self, camera_id: int, start_dt: datetime = None,
+                      end_dt: datetime = None) -> Iterator[Tuple[datetime, datetime, str]]:
+        """
+        Yield (segment_start, segment_end, base_path) for segments overlapping
+        [start_dt, end_dt], oldest first. Pruning uses file names only.
+        """
+        start_dt = to_local_naive(start_dt)
+        end_dt = to_local_naive(end_dt)
+        camera_dir = self.camera_dir(camera_id)
+        if not os.path.exists(camera_dir):
+            return
+
+        start_day = start_dt.strftime('%Y%m%d') if start_dt else None
+        end_day = end_dt.strftime('%Y%m%d') if end_dt else None
+
+        for day in sorted(os.listdir(camera_dir)):
+            if len(day) != 8 or not day.isdigit():
+                continue
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+
+            day_dir = os.path.join(camera_dir, day)
+            try:
+                day_start = datetime.strptime(day, '%Y%m%d')
+            except ValueError:
+                continue
+
+            segments = []
+            for filename in os.listdir(day_dir):
+                if not filename.endswith('.jsonl'):
+                    continue
+                name = filename[:-len('.jsonl')]
+                if name == self.DAY_SEGMENT:
+                    segments.append((day_start, day_start + timedelta(days=1), name))
+                elif len(name) == 2 and name.isdigit():
+                    hour_start = day_start + timedelta(hours=int(name))
+                    segments.append((hour_start, hour_start + timedelta(hours=1), name))
+
+            for seg_start, seg_end, name in sorted(segments):
+                if start_dt and seg_end <= start_dt:
+                    continue
+                if end_dt and seg_start > end_dt:
+                    continue
+                yield seg_start, seg_end, os.path.join(day_dir, name)
+
+    @staticmethod
+    def _read_index(base: str) -> List[Tuple[datetime, int]]:
+        index = []
+        try:
+            with open(base + '.idx', 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        index.append((datetime.fromisoformat(entry['ts']), entry['offset']))
+                    except (ValueError, KeyError):
+                        continue
+        except FileNotFoundError:
+            pass
+        return index
+
+    def _scan_segment(self, base: str, start_dt: datetime = None, end_dt: datetime = None,
+                      interval: str = None) -> Iterator[Dict]:
+        """mmap a segment, seek to the first indexed record at or before start_dt and scan forward"""
+        try:
+            f = open(base + '.jsonl', 'rb')
+        except FileNotFoundError:
+            # Compacted away between listing and reading
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+
+            offset = 0
+            if start_dt:
+                index = self._read_index(base)
+                position = bisect_right([ts for ts, _ in index], start_dt) - 1
+                if position >= 0:
+                    offset = index[position][1]
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                while offset < size:
+                    end = mm.find(b'\n', offset)
+                    if end == -1:
+                        break  # Partial line still being written
+                    line = mm[offset:end]
+                    offset = end + 1
+
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+
+                    ts = self.summary_datetime(record)
+                    if start_dt and ts < start_dt:
+                        continue
+                    if end_dt and ts > end_dt:
+                        break  # append() keeps segments in timestamp order
+                    if interval and record.get('interval') != interval:
+                        continue
+                    yield record
+
+    def query(self, camera_id: int, start_dt: datetime = None, end_dt: datetime = None,
+              interval: str = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Yield (legacy_file_name, summary) for summaries in [start_dt, end_dt], oldest first.
+        Only segments overlapping the window are opened.
+        """
+        start_dt = to_local_naive(start_dt)
+        end_dt = to_local_naive(end_dt)
+
+        for _, _, base in self.iter_segments(camera_id, start_dt, end_dt):
+            for record in self._scan_segment(base, start_dt, end_dt, interval):
+                yield self.legacy_filename(record), record
+
+    def iter_recent(self, camera_id: int, not_before: datetime = None) -> Iterator[Dict]:
+        """Yield summaries newest first, stopping at segments that end before not_before"""
+        segments = list(self.iter_segments(camera_id, not_before))
+        for _, _, base in reversed(segments):
+            records = list(self._scan_segment(base, not_before))
+            yield from reversed(records)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def compact(self, camera_id: int = None, before: datetime = None) -> int:
+        """
+        Merge the hourly segments of closed days into a single day segment,
+        dropping torn or unparseable lines and rebuilding the sparse index
+
+        Args:
+            camera_id: Camera to compact (default: all)
+            before: Only days strictly before this date (default: COMPACT_AFTER_DAYS ago)
+
+        Returns:
+            Number of days compacted
+        """
+        cutoff = (before or datetime.now() - timedelta(days=self.COMPACT_AFTER_DAYS)).strftime('%Y%m%d')
+        camera_ids = [camera_id] if camera_id is not None else self.cameras()
+        compacted = 0
+
+        for cam_id in camera_ids:
+            camera_dir = self.camera_dir(cam_id)
+            if not os.path.exists(camera_dir):
+                continue
+
+            for day in sorted(os.listdir(camera_dir)):
+                if len(day) != 8 or not day.isdigit() or day >= cutoff:
+                    continue
+                try:
+                    if self._compact_day(os.path.join(camera_dir, day)):
+                        compacted += 1
+                except Exception as e:
+                    print(f"Error compacting {camera_dir}/{day}: {e}")
+
+        return compacted
+
+    def _compact_day(self, day_dir: str) -> bool:
+        hours = sorted(
+            f[:-len('.jsonl')] for f in os.listdir(day_dir)
+            if f.endswith('.jsonl') and f[:2].isdigit()
+        )
+        if not hours:
+            return False
+
+        names = ([self.DAY_SEGMENT] if os.path.exists(os.path.join(day_dir, 'day.jsonl')) else []) + hours
+        day_base = os.path.join(day_dir, self.DAY_SEGMENT)
+
+        with self._camera_write_lock(os.path.dirname(day_dir)):
+            records = []
+            for name in names:
+                records.extend(self._scan_segment(os.path.join(day_dir, name)))
+            self._write_segment(day_base, records)
+
+            for hour in hours:
+                base = os.path.join(day_dir, hour)
+                for path in (base + '.jsonl', base + '.idx'):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self._segments.pop(base + '.jsonl', None)
+
+        return True
+
+    def export_files(self, camera_id: int, output_dir: str, start_dt: datetime = None,
+                     end_dt: datetime = None) -> int:
+        """
+        Export summaries in the legacy one-file-per-summary layout:
+            <output_dir>/camera_<id>/{interval}_{YYYYmmdd_HHMMSS}.json
+
+        Returns:
+            Number of files written
+        """
+        camera_out = os.path.join(output_dir, f'camera_{camera_id}')
+        os.makedirs(camera_out, exist_ok=True)
+        written = 0
+
+        for filename, summary in self.query(camera_id, start_dt, end_dt):
+            path = os.path.join(camera_out, filename)
+            suffix = 1
+            while os.path.exists(path):
+                path = os.path.join(camera_out, f"{filename[:-len('.json')]}_{suffix}.json")
+                suffix += 1
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+            written += 1
+
+        return written
+
+
+def record_sort_key(record: Dict) -> Tuple[datetime, int, str]:
+    """Total order over summaries across cameras and intervals"""
+    return (SummaryLogStore.summary_datetime(record), record.get('camera_id', -1), record.get('interval', ''))
+
+
+def encode_cursor(record: Dict) -> str:
+    """Opaque pagination cursor pointing just after a record"""
+    ts, camera_id, interval = record_sort_key(record)
+    payload = json.dumps([ts.isoformat(), camera_id, interval], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """Inverse of encode_cursor, raises ValueError on malformed cursors"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts, camera_id, interval = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(ts), int(camera_id), str(interval)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def sort_ties(records: Iterable[Dict]) -> Iterator[Dict]:
+    """Order a timestamp-ordered stream by record_sort_key (records sharing a timestamp are sorted)"""
+    run: List[Dict] = []
+    for record in records:
+        if run and SummaryLogStore.summary_datetime(record) != SummaryLogStore.summary_datetime(run[0]):
+            yield from sorted(run, key=record_sort_key)
+            run = []
+        run.append(record)
+    yield from sorted(run, key=record_sort_key)
+
+
+def since_key(since: datetime) -> Tuple[datetime, float, str]:
+    """Sort key that orders after every record stamped at or before since"""
+    return (to_local_naive(since), float('inf'), '')
+
+
+class SummaryWindow:
+    """
+    Bounded per-camera, per-interval window of the newest summaries
+
+    Each interval keeps at most max_items records (oldest evicted first) and,
+    if max_age_seconds is set, drops records older than that. A camera's
+    window is hydrated from the summary log the first time it is accessed, so
+    a restarted process serves recent history without loading everything.
+    Only cameras the log has a directory for, or that were appended to, are
+    kept; reads of any other id return an empty view.
+
+    Writers never mutate a published list: every append builds a new tuple and
+    swaps a new snapshot dict in under the lock. Readers take the current
+    snapshot reference and can serialize it without holding any lock.
+    """
+
+    def __init__(self, intervals: Iterable[str], store: SummaryLogStore = None,
+                 max_items: int = 100, max_age_seconds: int = None):
+        """
+        Initialize summary window
+
+        Args:
+            intervals: Interval names kept per camera
+            store: Summary log used for warm start (optional)
+            max_items: Records kept per camera and interval
+            max_age_seconds: Maximum record age (default: no age limit)
+        """
+        self.intervals = list(intervals)
+        self.store = store
+        self.max_items = max_items
+        self.max_age_seconds = max_age_seconds
+
+        # camera_id -> interval -> tuple of records, replaced wholesale on every change
+        self._snapshot: Dict[int, Dict[str, tuple]] = {}
+        self.lock = threading.RLock()
+
+    def _cutoff(self) -> Optional[datetime]:
+        if not self.max_age_seconds:
+            return None
+        return datetime.now() - timedelta(seconds=self.max_age_seconds)
+
+    def _hydrate(self, camera_id: int) -> Dict[str, tuple]:
+        window = {interval: deque(maxlen=self.max_items) for interval in self.intervals}
+        if self.store is not None:
+            try:
+                remaining = set(self.intervals)
+                for record in self.store.iter_recent(camera_id, self._cutoff()):
+                    interval = record.get('interval')
+                    if interval not in remaining:
+                        continue
+                    window[interval].appendleft(record)
+                    if len(window[interval]) >= self.max_items:
+                        remaining.discard(interval)
+                        if not remaining:
+                            break
+            except Exception as e:
+                print(f"Error loading recent summaries for camera {camera_id}: {e}")
+
+        return {interval: tuple(records) for interval, records in window.items()}
+
+    def _publish(self, camera_id: int, window: Dict[str, tuple]):
+        snapshot = dict(self._snapshot)
+        snapshot[camera_id] = window
+        self._snapshot = snapshot
+
+    def _known(self, camera_id: int) -> bool:
+        """True if the summary log has a directory for the camera"""
+        return self.store is not None and os.path.isdir(self.store.camera_dir(camera_id))
+
+    def _camera(self, camera_id: int) -> Dict[str, tuple]:
+        """A camera's window, hydrated on first access; unknown cameras get an empty, unpublished view"""
+        window = self._snapshot.get(camera_id)
+        if window is None:
+            with self.lock:
+                window = self._snapshot.get(camera_id)
+                if window is None:
+                    if not self._known(camera_id):
+                        # Any id can arrive from a URL; only append() publishes a new camera
+                        return {interval: () for interval in self.intervals}
+                    window = self._hydrate(camera_id)
+                    self._publish(camera_id, window)
+        return window
+
+    def _evicted(self, records: tuple, cutoff: Optional[datetime]) -> tuple:
+        if cutoff is None:
+            return records
+        start = 0
+        while start < len(records) and SummaryLogStore.summary_datetime(records[start]) < cutoff:
+            start += 1
+        return records[start:] if start else records
+
+    def append(self, camera_id: int, interval: str, record: Dict):
+        """Publish a new record; the record must not be mutated afterwards"""
+        with self.lock:
+            window = dict(self._camera(camera_id))
+            records = window.get(interval, ()) + (record,)
+            window[interval] = records[-self.max_items:]
+
+            cutoff = self._cutoff()
+            if cutoff is not None:
+                window = {name: self._evicted(recs, cutoff) for name, recs in window.items()}
+
+            self._publish(camera_id, window)
+
+    def append_new(self, camera_id: int, interval: str, record: Dict) -> bool:
+        """
+        Publish a record written to the store by another process
+
+        Skipped if the window already holds it (it was hydrated from the
+        store after the record was appended), returns True if added.
+        """
+        with self.lock:
+            records = self._camera(camera_id).get(interval, ())
+            if records and record_sort_key(records[-1]) >= record_sort_key(record):
+                return False
+            self.append(camera_id, interval, record)
+            return True
+
+    def snapshot(self, camera_id: int = None) -> Dict:
+        """
+        Immutable view of the window: {interval: tuple} for one camera, or
+        {camera_id: {interval: tuple}} for all cameras
+        """
+        cutoff = self._cutoff()
+        if camera_id is not None:
+            return {name: self._evicted(recs, cutoff) for name, recs in self._camera(camera_id).items()}
+        return {cam_id: self.snapshot(cam_id) for cam_id in self.camera_ids()}
+
+    def get(self, camera_id: int, interval: str) -> List[Dict]:
+        return list(self.snapshot(camera_id).get(interval, ()))
+
+    def get_camera(self, camera_id: int) -> Dict[str, List[Dict]]:
+        return {interval: list(records) for interval, records in self.snapshot(camera_id).items()}
+
+    def camera_ids(self) -> List[int]:
+        known = set(self._snapshot)
+        if self.store is not None:
+            known.update(self.store.cameras())
+        return sorted(known)
+
+    def get_all(self) -> Dict[int, Dict[str, List[Dict]]]:
+        return {camera_id: self.get_camera(camera_id) for camera_id in self.camera_ids()}
+
+    def memory_usage(self) -> Dict:
+        """Records held per camera and their serialized size (only cameras already hydrated)"""
+        cameras = {}
+        for camera_id, window in self._snapshot.items():
+            records = [record for recs in window.values() for record in recs]
+            cameras[camera_id] = {
+                'records': len(records),
+                'approx_bytes': sum(len(json.dumps(record, default=str)) for record in records),
+            }
+        return {
+            'records': sum(camera['records'] for camera in cameras.values()),
+            'approx_bytes': sum(camera['approx_bytes'] for camera in cameras.values()),
+            'cameras': cameras,
+        }
+
+    def latest(self, camera_id: int, interval: str) -> Optional[Dict]:
+        records = self._camera(camera_id).get(interval)
+        return records[-1] if records else None
+
+    def covers(self, after_key: Tuple, camera_ids: List[int], intervals: List[str]) -> bool:
+        """True if nothing newer than after_key has been evicted from the window"""
+        for camera_id in camera_ids:
+            window = self._camera(camera_id)
+            for interval in intervals:
+                records = window.get(interval, ())
+                evicted = len(records) >= self.max_items or self.max_age_seconds
+                if evicted and records and record_sort_key(records[0]) > after_key:
+                    return False
+        return True
+
+    def page(self, after_key: Tuple = None, camera_ids: List[int] = None, intervals: List[str] = None,
+             limit: int = 100) -> List[Dict]:
+        """
+        Records ordered oldest first across the selected cameras and intervals
+
+        With after_key, returns up to limit records strictly after it (reading
+        the summary log if the window has already evicted part of that range).
+        Without after_key, returns the newest limit records.
+        """
+        camera_ids = self.camera_ids() if camera_ids is None else camera_ids
+        intervals = intervals or self.intervals
+
+        if after_key is not None and self.store is not None and not self.covers(after_key, camera_ids, intervals):
+            streams = []
+            for camera_id in camera_ids:
+                # The log orders by timestamp only; intervals sharing a timestamp
+                # must follow record_sort_key for the cursor comparison to hold
+                records = (
+                    record for record in sort_ties(record for _, record in self.store.query(camera_id, after_key[0]))
+                    if record.get('interval') in intervals and record_sort_key(record) > after_key
+                )
+                streams.append(records)
+            return list(islice(heapq.merge(*streams, key=record_sort_key), limit))
+
+        streams = []
+        for camera_id in camera_ids:
+            window = self.snapshot(camera_id)
+            for interval in intervals:
+                records = window.get(interval, ())
+                start = 0
+                if after_key is not None:
+                    start = bisect_right(records, after_key, key=record_sort_key)
+                streams.append(records[start:])
+
+        merged = heapq.merge(*streams, key=record_sort_key)
+        if after_key is None:
+            return list(deque(merged, maxlen=limit))
+        return list(islice(merged, limit))
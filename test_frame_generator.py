@@ -11,6 +11,8 @@ import numpy as np
 from datetime import datetime, timedelta
 import random
 
+from summary_store import SummaryLogStore
+
 # Configuration
 OLLAMA_SUMMARIES_DIR = '/Users/vibhorkashyap/Documents/code/ollama_video_summaries'
 CLIPS_DIR = '/Users/vibhorkashyap/Documents/code/clips'
@@ -147,15 +149,10 @@ def generate_test_summaries():
             "llm_backend": "ollama"
         }
         
-        # Save summary JSON
-        summary_filename = os.path.join(
-            camera_dir,
-            f"{interval}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        )
-        with open(summary_filename, 'w') as f:
-            json.dump(summary_record, f, indent=2)
+        # Append summary to the camera's summary log
+        segment_path = SummaryLogStore(OLLAMA_SUMMARIES_DIR).append(camera_id, interval, summary_record)
         
-        print(f"  ✓ Saved summary JSON: {os.path.basename(summary_filename)}")
+        print(f"  ✓ Saved summary to log: {os.path.relpath(segment_path, OLLAMA_SUMMARIES_DIR)}")
         print()
     
     print("✅ Test data generation complete!")
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_ollama_server import start_mock_server  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def mock_ollama():
+    """Base URL of a mock Ollama server (embeddings and generation) for the test session"""
+    server, base_url = start_mock_server()
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """camera_server with service startup skipped; tests install the components they use"""
+    import camera_server
+    monkeypatch.setattr(camera_server.app, 'streams_initialized', True, raising=False)
+    return camera_server
@@ -0,0 +1,125 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from chat_answerer import AnswerGenerator
+from query_cache import QueryCache
+from summary_store import SummaryLogStore
+from timeline_index import TimelineIndex
+
+START = datetime(2024, 1, 1, 12, 0)
+QUESTION = {'query': 'Was a package delivered?', 'camera_id': 0, 'search_type': 'summaries'}
+
+
+def summary(minute, text):
+    return {'camera_id': 0, 'interval': 'minute', 'summary': text,
+            'timestamp': (START + timedelta(minutes=minute)).isoformat()}
+
+
+@pytest.fixture
+def chat(tmp_path, server, mock_ollama, monkeypatch):
+    """Flask client with a summary log, a fresh chat cache and an answer generator on the mock server"""
+    store = SummaryLogStore(str(tmp_path / 'summaries'), auto_compact=False)
+    store.append(0, 'minute', summary(0, 'A courier left a package at the door. Then drove off.'))
+    store.append(0, 'minute', summary(1, 'The street is quiet.'))
+
+    monkeypatch.setattr(server, 'TIMELINE_INDEX', TimelineIndex(store, str(tmp_path / 'clips')))
+    monkeypatch.setattr(server, 'SEMANTIC_INDEX', None)
+    monkeypatch.setattr(server, 'CHAT_CACHE', QueryCache())
+    monkeypatch.setattr(server, 'ANSWER_GENERATOR', AnswerGenerator(mock_ollama))
+    return server, store
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def ask(server, payload=QUESTION):
+    response = server.app.test_client().post('/api/chat/answer', json=payload)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    return parse_sse(response.get_data(as_text=True))
+
+
+def test_streams_sources_then_tokens_then_done(chat):
+    server, _ = chat
+
+    events = ask(server)
+
+    names = [name for name, _ in events]
+    assert names[0] == 'sources' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'token'} and len(names) > 3
+
+    sources = events[0][1]
+    assert sources[0]['ref'] == 1
+    assert sources[0]['summary'].startswith('A courier left a package')
+
+    answer = ''.join(data['text'] for name, data in events if name == 'token')
+    assert answer == 'According to [1], a courier left a package at the door.'
+    assert events[-1][1]['cached'] is False
+    assert 'first_token_ms' in events[-1][1]
+
+
+def test_identical_retrieval_set_is_answered_from_cache(chat):
+    server, _ = chat
+    first = ask(server)
+
+    # Same question after normalization over the same sources
+    second = ask(server, {**QUESTION, 'query': 'was a package   delivered'})
+
+    assert second[-1][1]['cached'] is True
+    assert [data for name, data in second if name == 'token'] == \
+        [{'text': 'According to [1], a courier left a package at the door.'}]
+    assert second[0][1] == first[0][1]
+    assert server.ANSWER_GENERATOR.stats()['cache_hits'] == 1
+
+
+def test_changed_retrieval_set_is_not_served_from_cache(chat):
+    server, store = chat
+    ask(server)
+
+    store.append(0, 'minute', summary(2, 'Another package was left on the step.'))
+    server.CHAT_CACHE.bump(0)
+    events = ask(server)
+
+    assert events[-1][1]['cached'] is False
+    assert len(events[0][1]) == 2
+
+
+def test_interrupted_answer_is_not_cached(chat):
+    server, _ = chat
+    response = server.app.test_client().post('/api/chat/answer', json=QUESTION, buffered=False)
+
+    # Client disconnects after the sources and the first token
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'event: sources')
+    assert next(chunks).startswith(b'event: token')
+    response.close()
+
+    assert server.ANSWER_GENERATOR.stats()['cached_answers'] == 0
+    assert ask(server)[-1][1]['cached'] is False
+    assert server.ANSWER_GENERATOR.stats()['cached_answers'] == 1
+
+
+def test_bad_camera_id_is_a_json_400(chat):
+    server, _ = chat
+
+    response = server.app.test_client().post('/api/chat/answer', json={**QUESTION, 'camera_id': 'front'})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'camera_id must be a number'}
+
+
+def test_missing_answer_generator_is_a_503(chat, monkeypatch):
+    server, _ = chat
+    monkeypatch.setattr(server, 'ANSWER_GENERATOR', None)
+
+    response = server.app.test_client().post('/api/chat/answer', json=QUESTION)
+
+    assert response.status_code == 503
+    assert 'error' in response.get_json()
@@ -0,0 +1,59 @@
+from query_cache import QueryCache
+
+
+def key(cache, query='person at door', camera_id=0):
+    return cache.make_key(query, camera_id, None, None, 'all')
+
+
+def test_normalized_queries_share_an_entry():
+    cache = QueryCache()
+    cache.put(key(cache, 'Person at the door?'), 'result')
+
+    assert cache.get(key(cache, '  person AT the   door ')) == 'result'
+    assert cache.stats()['hits'] == 1
+
+
+def test_bump_invalidates_only_that_cameras_entries():
+    cache = QueryCache()
+    cache.put(key(cache, camera_id=0), 'camera 0')
+    cache.put(key(cache, camera_id=1), 'camera 1')
+
+    cache.bump(0)
+
+    assert cache.get(key(cache, camera_id=0)) is None
+    assert cache.get(key(cache, camera_id=1)) == 'camera 1'
+    assert cache.stats()['invalidations'] == 1
+    assert cache.stats()['generations'] == {0: 1}
+
+
+def test_all_camera_entries_are_invalidated_by_any_camera():
+    cache = QueryCache()
+    cache.put(key(cache, camera_id=None), 'all cameras')
+
+    # Called as a summary listener: (camera_id, summary)
+    cache.bump(3, {'summary': 'new'})
+
+    assert cache.get(key(cache, camera_id=None)) is None
+
+
+def test_entries_written_after_a_bump_stay_valid():
+    cache = QueryCache()
+    cache.bump(0)
+    cache.put(key(cache), 'fresh')
+
+    assert cache.get(key(cache)) == 'fresh'
+    cache.bump(0)
+    assert cache.get(key(cache)) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put(key(cache, 'a'), 'a')
+    cache.put(key(cache, 'b'), 'b')
+    cache.get(key(cache, 'a'))
+    cache.put(key(cache, 'c'), 'c')
+
+    assert cache.get(key(cache, 'b')) is None
+    assert cache.get(key(cache, 'a')) == 'a'
+    assert cache.get(key(cache, 'c')) == 'c'
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,159 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from semantic_index import CameraVectorStore, EmbeddingClient, SemanticIndex
+from summary_store import SummaryLogStore
+
+
+def test_ivf_search_with_time_window(tmp_path):
+    rng = np.random.default_rng(1)
+    start = datetime(2024, 1, 1)
+    rows = CameraVectorStore.IVF_MIN_ROWS
+    vectors = rng.standard_normal((rows, 32)).astype(np.float32)
+
+    ivf = CameraVectorStore(str(tmp_path / 'ivf'), use_ivf=True)
+    exact = CameraVectorStore(str(tmp_path / 'exact'), use_ivf=False)
+    for i, vector in enumerate(vectors):
+        row = {'key': str(i), 'timestamp': (start + timedelta(minutes=i)).isoformat()}
+        ivf.add(vector, row)
+        exact.add(vector, row)
+
+    # Make sure the IVF path is active for unfiltered searches
+    query = rng.standard_normal(32).astype(np.float32)
+    ivf.search(query, k=10)
+    assert ivf.centroids is not None
+
+    # The last hour of a ~3 day history
+    end_dt = start + timedelta(minutes=rows - 1)
+    start_dt = end_dt - timedelta(hours=1)
+    hits = ivf.search(query, k=10, start_dt=start_dt, end_dt=end_dt)
+    expected = exact.search(query, k=10, start_dt=start_dt, end_dt=end_dt)
+
+    assert len(hits) == 10
+    assert [hit['key'] for hit in hits] == [hit['key'] for hit in expected]
+    assert all(start_dt <= datetime.fromisoformat(hit['timestamp']) <= end_dt for hit in hits)
+
+
+def make_summary(minute, text, captions=()):
+    return {
+        'camera_id': 0,
+        'interval': '5_minutes',
+        'timestamp': datetime(2024, 1, 1, 12, minute).isoformat(),
+        'summary': text,
+        'captions': list(captions),
+    }
+
+
+class FlakyClient(EmbeddingClient):
+    """Embedding client that fails for the texts in `fail`"""
+
+    def __init__(self, base_url, fail=()):
+        super().__init__(base_url)
+        self.fail = set(fail)
+
+    def embed(self, text):
+        if text in self.fail:
+            return None
+        return super().embed(text)
+
+
+def test_index_and_search_with_mock_embeddings(tmp_path, mock_ollama):
+    index = SemanticIndex(str(tmp_path), EmbeddingClient(mock_ollama))
+    index.index_summary(0, make_summary(0, 'A man carried a parcel to the door.'))
+    index.index_summary(0, make_summary(5, 'Two cars parked on the street.'))
+
+    hits = index.search('person holding a package', [0], k=2)
+
+    assert [hit['timestamp'] for hit in hits][0] == '2024-01-01T12:00:00'
+    assert hits[0]['semantic_score'] > hits[1]['semantic_score']
+    assert 'captions' not in hits[0]
+
+
+def test_index_summary_skips_stored_rows_and_retries_failed_ones(tmp_path, mock_ollama):
+    summary = make_summary(0, 'A cyclist rode past.', ['bicycle on the road', 'person on a bike'])
+    client = FlakyClient(mock_ollama, fail={'A cyclist rode past.'})
+    index = SemanticIndex(str(tmp_path), client)
+
+    assert index.index_summary(0, summary) == 2  # Captions only, the summary embed failed
+
+    client.fail.clear()
+    assert index.index_summary(0, summary) == 1  # Only the missing summary row
+    assert index.index_summary(0, summary) == 0
+    assert [row['kind'] for row in index.get_store(0).rows] == ['caption', 'caption', 'summary']
+
+
+def test_concurrent_indexing_adds_no_duplicate_rows(tmp_path, mock_ollama):
+    index = SemanticIndex(str(tmp_path), EmbeddingClient(mock_ollama))
+    summaries = [make_summary(m, f'Event number {m} at the gate.', [f'caption {m}']) for m in range(10)]
+
+    threads = [threading.Thread(target=lambda: [index.index_summary(0, s) for s in summaries])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert index.get_store(0).count == 20
+    assert len(index.search('gate', [0], k=50)) == 10
+
+
+def test_index_store_backfills_only_missing_summaries(tmp_path, mock_ollama):
+    summary_store = SummaryLogStore(str(tmp_path / 'summaries'), auto_compact=False)
+    for minute in (0, 5, 10):
+        summary_store.append(0, '5_minutes', make_summary(minute, f'Delivery van stopped, minute {minute}.'))
+
+    index = SemanticIndex(str(tmp_path / 'index'), EmbeddingClient(mock_ollama))
+    index.index_summary(0, make_summary(5, 'Delivery van stopped, minute 5.'))
+
+    assert index.index_store(summary_store) == 2
+    assert index.index_store(summary_store) == 0
+    assert index.get_store(0).count == 3
+
+
+def test_flushed_rows_survive_reload_and_unflushed_rows_are_dropped(tmp_path):
+    rng = np.random.default_rng(2)
+    store = CameraVectorStore(str(tmp_path))
+    for i in range(3):
+        store.add(rng.standard_normal(8).astype(np.float32), {'key': str(i), 'kind': 'summary', 'text': str(i)})
+    store.flush()
+    store.add(rng.standard_normal(8).astype(np.float32), {'key': '3', 'kind': 'summary', 'text': '3'})
+
+    # Simulates a restart without the last flush
+    reopened = CameraVectorStore(str(tmp_path))
+    assert reopened.count == 3
+    assert [row['key'] for row in reopened.rows] == ['0', '1', '2']
+
+    reopened.add(rng.standard_normal(8).astype(np.float32), {'key': '4', 'kind': 'summary', 'text': '4'})
+    reopened.flush()
+    with open(reopened.rows_path) as f:
+        assert [json.loads(line)['key'] for line in f] == ['0', '1', '2', '4']
+    assert CameraVectorStore(str(tmp_path)).count == 4
+
+
+def test_hybrid_search_blends_keyword_and_semantic_scores(tmp_path, mock_ollama, monkeypatch):
+    import camera_server
+
+    parcel = make_summary(0, 'A woman left a box on the porch.')
+    walker = make_summary(5, 'A package sits by the gate while a man walks past.')
+    index = SemanticIndex(str(tmp_path), EmbeddingClient(mock_ollama))
+    for summary in (parcel, walker):
+        index.index_summary(0, summary)
+
+    # Keyword search only matches the summary that literally says "package"
+    keyword = [{**walker, 'match_score': 1, 'matched_words': ['package'], 'relative_timestamp': walker['timestamp']}]
+    monkeypatch.setattr(camera_server, 'SEMANTIC_INDEX', index)
+    monkeypatch.setattr(camera_server, 'search_ollama_summaries', lambda *args: keyword)
+
+    results = camera_server.search_hybrid_summaries('package', semantic_weight=0.5)
+
+    by_time = {result['timestamp']: result for result in results}
+    assert set(by_time) == {parcel['timestamp'], walker['timestamp']}
+    assert by_time[walker['timestamp']]['keyword_score'] == 1
+    assert by_time[parcel['timestamp']]['keyword_score'] == 0
+    assert by_time[parcel['timestamp']]['semantic_score'] > 0
+    for result in results:
+        assert result['hybrid_score'] == round(0.5 * result['semantic_score'] + 0.5 * result['keyword_score'], 4)
+    assert results[0]['timestamp'] == walker['timestamp']
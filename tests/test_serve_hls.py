@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from segment_cache import SegmentCache
+
+
+@pytest.fixture
+def hls(tmp_path, server, monkeypatch):
+    """HLS_DIR with one camera stream, next to a directory that must stay unreachable"""
+    hls_dir = tmp_path / 'hls'
+    os.makedirs(hls_dir / 'stream_0')
+    (hls_dir / 'stream_0' / 'init.mp4').write_bytes(b'camera init')
+    os.makedirs(tmp_path / 'private')
+    (tmp_path / 'private' / 'secret.mp4').write_bytes(b'not a stream')
+
+    monkeypatch.setattr(server, 'HLS_DIR', str(hls_dir))
+    monkeypatch.setattr(server, 'HLS_CACHE', SegmentCache())
+    return server.app.test_client()
+
+
+def test_serves_files_of_a_camera_stream(hls):
+    response = hls.get('/hls/stream_0/init.mp4')
+
+    assert response.status_code == 200
+    assert response.data == b'camera init'
+
+
+@pytest.mark.parametrize('path', [
+    '/hls/../private/secret.mp4',
+    '/hls/%2E%2E/private/secret.mp4',
+    '/hls/private/secret.mp4',
+    '/hls/stream_0/../../private/secret.mp4',
+])
+def test_paths_outside_stream_directories_are_not_served(hls, path):
+    response = hls.get(path)
+
+    assert response.status_code == 404
+    assert b'not a stream' not in response.data
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ollama_summarizer import OllamaSummarizer
+from summary_store import (SummaryLogStore, SummaryWindow, decode_cursor, encode_cursor, record_sort_key,
+                           since_key)
+
+START = datetime(2024, 1, 1, 10, 0)
+
+
+def record(camera_id, interval, minute):
+    return {
+        'camera_id': camera_id,
+        'interval': interval,
+        'timestamp': (START + timedelta(minutes=minute)).isoformat(),
+        'summary': f'{camera_id}/{interval}/{minute}',
+    }
+
+
+def write(store, window, items):
+    # Same order as the summarizers: publish to the window, then append to the log
+    for item in items:
+        window.append(item['camera_id'], item['interval'], item)
+        store.append(item['camera_id'], item['interval'], item)
+
+
+def all_records():
+    return [record(camera_id, interval, minute)
+            for minute in range(20) for camera_id in (0, 1) for interval in ('minute', 'hour')]
+
+
+def page_through(window, after_key, limit):
+    """Pages from after_key until an empty page, following cursors like a client"""
+    pages = []
+    while True:
+        page = window.page(after_key, limit=limit)
+        if not page:
+            return pages
+        pages.append(page)
+        after_key = decode_cursor(encode_cursor(page[-1]))
+
+
+def test_cursor_round_trip_and_malformed_cursor():
+    item = record(3, 'hour', 7)
+    assert decode_cursor(encode_cursor(item)) == record_sort_key(item)
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_without_cursor_returns_newest_records_oldest_first(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=100)
+    write(store, window, all_records())
+
+    page = window.page(limit=3)
+
+    assert [r['summary'] for r in page] == ['0/minute/19', '1/hour/19', '1/minute/19']
+
+
+def test_paging_from_the_window_visits_every_record_once(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=100)
+    items = all_records()
+    write(store, window, items)
+
+    pages = page_through(window, since_key(START - timedelta(minutes=1)), 7)
+
+    seen = [r['summary'] for page in pages for r in page]
+    assert seen == [r['summary'] for r in sorted(items, key=record_sort_key)]
+
+
+def test_paging_falls_back_to_the_log_once_the_window_evicted(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=3)
+    items = all_records()
+    write(store, window, items)
+
+    after_key = since_key(START + timedelta(minutes=4, seconds=30))
+    assert not window.covers(after_key, [0, 1], ['minute', 'hour'])
+
+    pages = page_through(window, after_key, 10)
+
+    seen = [r['summary'] for page in pages for r in page]
+    expected = [r['summary'] for r in sorted(items, key=record_sort_key) if record_sort_key(r) > after_key]
+    assert seen == expected
+    assert len(seen) == 15 * 4
+
+
+def test_paging_filters_cameras_and_intervals(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=3)
+    write(store, window, all_records())
+
+    page = window.page(since_key(START), camera_ids=[1], intervals=['hour'], limit=100)
+
+    assert [r['summary'] for r in page] == [f'1/hour/{minute}' for minute in range(1, 20)]
+
+
+@pytest.fixture
+def summarizer(tmp_path, mock_ollama):
+    summarizer = OllamaSummarizer(str(tmp_path / 'hls'), ollama_base_url=mock_ollama, summary_window_size=3)
+    write(summarizer.store, summarizer.summaries, all_records())
+    return summarizer
+
+
+def test_summaries_endpoint_pages_with_cursors(server, summarizer, monkeypatch):
+    monkeypatch.setattr(server, 'OLLAMA_SUMMARIZER', summarizer)
+    client = server.app.test_client()
+
+    seen = []
+    response = client.get('/api/ollama/summaries', query_string={'since': START.isoformat(), 'limit': 25})
+    while True:
+        assert response.status_code == 200
+        page = response.get_json()
+        seen.extend(r['summary'] for r in page['records'])
+        if not page['has_more']:
+            break
+        response = client.get('/api/ollama/summaries', query_string={'cursor': page['next_cursor'], 'limit': 25})
+
+    assert len(seen) == 19 * 4
+    assert len(set(seen)) == len(seen)
+
+    # Polling with the last cursor returns nothing and hands the cursor back
+    again = client.get('/api/ollama/summaries', query_string={'cursor': page['next_cursor']}).get_json()
+    assert again['records'] == [] and again['next_cursor'] == page['next_cursor']
+
+
+def test_summaries_endpoint_filters_and_rejects_bad_parameters(server, summarizer, monkeypatch):
+    monkeypatch.setattr(server, 'OLLAMA_SUMMARIZER', summarizer)
+    client = server.app.test_client()
+
+    page = client.get('/api/ollama/summaries', query_string={
+        'since': (START + timedelta(minutes=17, seconds=30)).isoformat(), 'camera_id': 0, 'interval': 'hour',
+    }).get_json()
+    assert [r['summary'] for r in page['records']] == ['0/hour/18', '0/hour/19']
+
+    assert client.get('/api/ollama/summaries?cursor=garbage').status_code == 400
+    assert client.get('/api/ollama/summaries?since=yesterday').status_code == 400
+    assert client.get('/api/ollama/summaries?limit=5&interval=fortnight').status_code == 400
@@ -0,0 +1,72 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from summary_store import MISSING_TIMESTAMP, SummaryLogStore, record_sort_key
+
+
+def summary(hour, minute, second=0, text='scene'):
+    return {
+        'camera_id': 0,
+        'interval': 'minute',
+        'timestamp': datetime(2024, 1, 1, hour, minute, second).isoformat(),
+        'summary': text,
+    }
+
+
+def timestamps(records):
+    return [record['timestamp'][11:] for _, record in records]
+
+
+def test_out_of_order_append_is_found_by_time_window(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    store.append(0, 'minute', summary(10, 30))
+    store.append(0, 'minute', summary(10, 10))
+
+    assert timestamps(store.query(0, datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 1, 10, 20))) == ['10:10:00']
+    assert timestamps(store.query(0)) == ['10:10:00', '10:30:00']
+
+
+def test_out_of_order_append_rebuilds_the_sparse_index(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    # Enough records for several index entries, then one that belongs near the start
+    for second in range(5, 55):
+        store.append(0, 'minute', summary(10, 20, second))
+    store.append(0, 'minute', summary(10, 0, 1))
+
+    start = datetime(2024, 1, 1, 10, 0)
+    assert timestamps(store.query(0, start, datetime(2024, 1, 1, 10, 1))) == ['10:00:01']
+    assert timestamps(store.query(0, datetime(2024, 1, 1, 10, 20, 40)))[:2] == ['10:20:40', '10:20:41']
+    assert len(list(store.query(0, start))) == 51
+
+
+def test_appends_from_another_process_stay_ordered(tmp_path):
+    # Two store instances stand in for the server and migrate_summaries.py
+    server = SummaryLogStore(str(tmp_path), auto_compact=False)
+    migration = SummaryLogStore(str(tmp_path), auto_compact=False)
+
+    server.append(0, 'minute', summary(10, 30))
+    migration.append(0, 'minute', summary(10, 5))
+    server.append(0, 'minute', summary(10, 40))
+    server.append(0, 'minute', summary(10, 20))
+
+    assert timestamps(server.query(0)) == ['10:05:00', '10:20:00', '10:30:00', '10:40:00']
+    assert timestamps(server.query(0, datetime(2024, 1, 1, 10, 15), datetime(2024, 1, 1, 10, 35))) == \
+        ['10:20:00', '10:30:00']
+
+
+def test_append_rejects_summaries_without_timestamp(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    with pytest.raises(ValueError):
+        store.append(0, 'minute', {'summary': 'no time'})
+    with pytest.raises(ValueError):
+        store.append(0, 'minute', {'summary': 'bad time', 'timestamp': 'yesterday'})
+    assert not os.path.exists(os.path.join(store.camera_dir(0), '20240101'))
+
+
+def test_missing_timestamp_orders_deterministically():
+    record = {'camera_id': 1, 'interval': 'minute', 'summary': 'legacy'}
+    assert SummaryLogStore.summary_datetime(record) == MISSING_TIMESTAMP
+    assert record_sort_key(record) == record_sort_key(dict(record))
+    assert record_sort_key(record) < record_sort_key(summary(0, 0))
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from summary_store import SummaryLogStore, SummaryWindow
+
+
+def record(camera_id, interval, dt, text='scene'):
+    return {'camera_id': camera_id, 'interval': interval, 'timestamp': dt.isoformat(), 'summary': text}
+
+
+def fill_store(store, camera_id, count, start=datetime(2024, 1, 1, 10, 0)):
+    records = []
+    for i in range(count):
+        for interval in ('minute', 'hour'):
+            item = record(camera_id, interval, start + timedelta(minutes=i), f'{interval} {i}')
+            store.append(camera_id, interval, item)
+            records.append(item)
+    return records
+
+
+def test_hydrates_newest_records_per_interval_from_the_log(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    fill_store(store, 0, 10)
+
+    window = SummaryWindow(['minute', 'hour'], store, max_items=3)
+
+    assert [r['summary'] for r in window.get(0, 'minute')] == ['minute 7', 'minute 8', 'minute 9']
+    assert [r['summary'] for r in window.get(0, 'hour')] == ['hour 7', 'hour 8', 'hour 9']
+    assert window.latest(0, 'minute')['summary'] == 'minute 9'
+
+
+def test_append_evicts_oldest_beyond_max_items(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    fill_store(store, 0, 3)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=3)
+
+    before = window.snapshot(0)
+    window.append(0, 'minute', record(0, 'minute', datetime(2024, 1, 1, 11, 0), 'new'))
+
+    assert [r['summary'] for r in window.get(0, 'minute')] == ['minute 1', 'minute 2', 'new']
+    # Published snapshots are never mutated
+    assert [r['summary'] for r in before['minute']] == ['minute 0', 'minute 1', 'minute 2']
+
+
+def test_max_age_drops_old_records_on_read_and_hydrate(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    now = datetime.now().replace(microsecond=0)
+    store.append(0, 'minute', record(0, 'minute', now - timedelta(hours=2), 'old'))
+    store.append(0, 'minute', record(0, 'minute', now - timedelta(minutes=1), 'recent'))
+
+    window = SummaryWindow(['minute'], store, max_items=10, max_age_seconds=3600)
+
+    assert [r['summary'] for r in window.get(0, 'minute')] == ['recent']
+
+
+def test_unknown_cameras_are_not_hydrated_or_kept(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    fill_store(store, 0, 2)
+    window = SummaryWindow(['minute', 'hour'], store, max_items=5)
+
+    for camera_id in range(100, 200):
+        assert window.snapshot(camera_id) == {'minute': (), 'hour': ()}
+        assert window.latest(camera_id, 'minute') is None
+    assert window.covers((datetime(2024, 1, 1), 0, ''), [150], ['minute'])
+
+    window.get(0, 'minute')
+    assert set(window._snapshot) == {0}
+    assert window.camera_ids() == [0]
+    assert set(window.memory_usage()['cameras']) == {0}
+
+
+def test_append_publishes_a_new_camera(tmp_path):
+    store = SummaryLogStore(str(tmp_path), auto_compact=False)
+    window = SummaryWindow(['minute'], store, max_items=5)
+
+    window.append(7, 'minute', record(7, 'minute', datetime(2024, 1, 1, 10, 0), 'first'))
+
+    assert [r['summary'] for r in window.get(7, 'minute')] == ['first']
+    assert window.camera_ids() == [7]
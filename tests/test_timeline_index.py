@@ -0,0 +1,59 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from summary_store import SummaryLogStore
+from timeline_index import TimelineIndex
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def make_index(tmp_path, clips, summaries=()):
+    store = SummaryLogStore(str(tmp_path / 'summaries'), auto_compact=False)
+    for minute, text in summaries:
+        store.append(0, 'minute', {'camera_id': 0, 'interval': 'minute', 'summary': text,
+                                   'timestamp': (START + timedelta(minutes=minute)).isoformat()})
+
+    camera_dir = tmp_path / 'clips' / 'camera_0'
+    os.makedirs(camera_dir)
+    with open(camera_dir / 'metadata.json', 'w') as f:
+        json.dump([{'timestamp': (START + timedelta(minutes=minute)).isoformat(), 'description': text}
+                   for minute, text in clips], f)
+    return TimelineIndex(store, str(tmp_path / 'clips'))
+
+
+def test_keyword_query_drops_clips_without_a_match(tmp_path):
+    index = make_index(tmp_path, [(0, 'dog in the yard'), (1, 'car in driveway'), (2, 'dog barking')])
+
+    results = index.search('dog', event_types=('clip',))
+
+    assert [r['record']['description'] for r in results] == ['dog barking', 'dog in the yard']
+    assert all(r['match_score'] == 1 for r in results)
+
+
+def test_time_only_query_keeps_every_clip(tmp_path):
+    index = make_index(tmp_path, [(0, 'dog in the yard'), (1, 'car in driveway'), (2, 'dog barking')])
+
+    results = index.search('', start_dt=START + timedelta(minutes=1), event_types=('clip',))
+
+    assert [r['record']['description'] for r in results] == ['dog barking', 'car in driveway']
+
+
+def test_unmatched_summaries_are_kept_after_matches(tmp_path):
+    index = make_index(tmp_path, [(0, 'car in driveway')], summaries=[(0, 'A dog ran past.'), (1, 'Quiet street.')])
+
+    results = index.search('dog', event_types=('summary', 'clip'))
+
+    assert [(r['type'], r['match_score']) for r in results] == [('summary', 1), ('summary', 0)]
+
+
+def test_chat_counts_only_matching_clips(tmp_path, server, monkeypatch):
+    index = make_index(tmp_path, [(0, 'dog in the yard'), (1, 'car in driveway'), (2, 'cat on fence')])
+    monkeypatch.setattr(server, 'TIMELINE_INDEX', index)
+    server.CHAT_CACHE.clear()
+
+    response = server.app.test_client().post('/api/chat', json={'query': 'dog', 'search_type': 'clips'})
+
+    data = response.get_json()
+    assert data['motion_clips_count'] == 1
+    assert "1 motion events matching 'dog'" in data['summary']
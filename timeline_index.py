@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+timeline_index.py
+Unified, time-ordered event index over motion clips, clip analyses and
+temporal summaries
+
+Every event is keyed by (timestamp, camera_id, type) and exposed as:
+    {'type': 'summary' | 'clip' | 'analysis', 'camera_id': int,
+     'timestamp': ISO string, 'text': searchable text, 'record': source record}
+
+Summaries are read straight from the SummaryLogStore, which already prunes
+segments by time. Clip metadata (clips/camera_<id>/metadata.json) is loaded
+into per-camera sorted arrays and reloaded only when the file changes, so
+time windows are resolved with a bisect instead of a full scan.
+"""
+
+import os
+import json
+import heapq
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from summary_store import SummaryLogStore, to_local_naive
+
+EVENT_TYPES = ('summary', 'clip', 'analysis')
+
+# Summaries whose text is a generation failure rather than a description
+FAILED_SUMMARY_MARKERS = ('error', 'timeout', 'connection')
+
+
+def parse_event_time(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return to_local_naive(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def event_sort_key(event: Dict) -> Tuple[datetime, int, str]:
+    return event['_dt'], event['camera_id'], event['type']
+
+
+class TimelineIndex:
+    """Merge-ordered, time-windowed, ranked access to all camera events"""
+
+    def __init__(self, summary_store: SummaryLogStore, clips_dir: str):
+        """
+        Initialize timeline index
+
+        Args:
+            summary_store: Summary log to read summary events from
+            clips_dir: Directory holding one camera_<id>/metadata.json per camera
+        """
+        self.summary_store = summary_store
+        self.clips_dir = clips_dir
+        self.lock = threading.Lock()
+
+        # camera_id -> (metadata mtime, {type: (sorted datetimes, events)})
+        self._clip_events: Dict[int, Tuple[float, Dict[str, Tuple[List[datetime], List[Dict]]]]] = {}
+
+    def camera_ids(self) -> List[int]:
+        """Cameras with summaries or clips on disk"""
+        camera_ids = set(self.summary_store.cameras())
+        if os.path.exists(self.clips_dir):
+            for name in os.listdir(self.clips_dir):
+                if name.startswith('camera_'):
+                    try:
+                        camera_ids.add(int(name.split('_', 1)[1]))
+                    except ValueError:
+                        continue
+        return sorted(camera_ids)
+
+    # ------------------------------------------------------------------
+    # Per-source event streams
+    # ------------------------------------------------------------------
+
+    def _load_clips(self, camera_id: int) -> Dict[str, Tuple[List[datetime], List[Dict]]]:
+        """Sorted clip and analysis events for a camera, reloaded when metadata.json changes"""
+        metadata_file = os.path.join(self.clips_dir, f'camera_{camera_id}', 'metadata.json')
+        try:
+            mtime = os.path.getmtime(metadata_file)
+        except OSError:
+            return {}
+
+        cached = self._clip_events.get(camera_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(metadata_file, 'r') as f:
+                clips = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Could not read clip metadata for camera {camera_id}: {e}")
+            return cached[1] if cached else {}
+
+        events = {'clip': [], 'analysis': []}
+        for clip in clips:
+            clip_dt = parse_event_time(clip.get('timestamp'))
+            if clip_dt is None:
+                continue
+            text = clip.get('description', '')
+            events['clip'].append({
+                'type': 'clip',
+                'camera_id': camera_id,
+                'timestamp': clip_dt.isoformat(),
+                'text': text,
+                'record': {**clip, 'camera_id': camera_id},
+                '_dt': clip_dt
+            })
+
+            # The analysis is its own event, placed when it was produced
+            analysis_dt = parse_event_time(clip.get('analysis_time'))
+            if clip.get('status') == 'analyzed' and analysis_dt is not None:
+                events['analysis'].append({
+                    'type': 'analysis',
+                    'camera_id': camera_id,
+                    'timestamp': analysis_dt.isoformat(),
+                    'text': text,
+                    'record': {**clip, 'camera_id': camera_id},
+                    '_dt': analysis_dt
+                })
+
+        indexed = {}
+        for event_type, items in events.items():
+            items.sort(key=event_sort_key)
+            indexed[event_type] = ([e['_dt'] for e in items], items)
+
+        with self.lock:
+            self._clip_events[camera_id] = (mtime, indexed)
+        return indexed
+
+    def _iter_clip_events(self, camera_id: int, event_type: str, start_dt: datetime = None,
+                          end_dt: datetime = None) -> Iterator[Dict]:
+        times, items = self._load_clips(camera_id).get(event_type, ([], []))
+        lo = bisect_left(times, start_dt) if start_dt else 0
+        hi = bisect_right(times, end_dt) if end_dt else len(items)
+        return iter(items[lo:hi])
+
+    def _iter_summary_events(self, camera_id: int, start_dt: datetime = None,
+                             end_dt: datetime = None) -> Iterator[Dict]:
+        for summary_file, summary in self.summary_store.query(camera_id, start_dt, end_dt):
+            text = summary.get('summary', '')
+            if any(marker in text.lower() for marker in FAILED_SUMMARY_MARKERS):
+                continue
+            dt = self.summary_store.summary_datetime(summary)
+            yield {
+                'type': 'summary',
+                'camera_id': camera_id,
+                'timestamp': dt.isoformat(),
+                'text': text,
+                'record': {**summary, 'file_name': summary_file},
+                '_dt': dt
+            }
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def iter_events(self, camera_ids: Iterable[int] = None, start_dt: datetime = None,
+                    end_dt: datetime = None, event_types: Iterable[str] = EVENT_TYPES) -> Iterator[Dict]:
+        """
+        Yield events from every camera and source in [start_dt, end_dt], oldest first
+
+        Args:
+            camera_ids: Cameras to include (default: all cameras with data)
+            start_dt: Window start (inclusive)
+            end_dt: Window end (inclusive)
+            event_types: Subset of EVENT_TYPES to include
+        """
+        start_dt = to_local_naive(start_dt)
+        end_dt = to_local_naive(end_dt)
+        if camera_ids is None:
+            camera_ids = self.camera_ids()
+
+        streams = []
+        for camera_id in camera_ids:
+            for event_type in event_types:
+                if event_type == 'summary':
+                    streams.append(self._iter_summary_events(camera_id, start_dt, end_dt))
+                else:
+                    streams.append(self._iter_clip_events(camera_id, event_type, start_dt, end_dt))
+
+        for event in heapq.merge(*streams, key=event_sort_key):
+            yield event
+
+    @staticmethod
+    def query_terms(query: str) -> List[str]:
+        return [w for w in re.findall(r"\w+", (query or '').lower()) if len(w) > 2]
+
+    def search(self, query: str, camera_ids: Iterable[int] = None, start_dt: datetime = None,
+               end_dt: datetime = None, event_types: Iterable[str] = EVENT_TYPES,
+               limit: int = None) -> List[Dict]:
+        """
+        Rank events in a time window by keyword matches, newest first among ties
+
+        Summaries in the window are always returned (time-only questions still
+        get context). Clips and analyses must match a query word unless the
+        query has none. Each result carries 'match_score' and 'matched_words'.
+        """
+        terms = self.query_terms(query)
+        ranked = []
+        for seq, event in enumerate(self.iter_events(camera_ids, start_dt, end_dt, event_types)):
+            text = event['text'].lower()
+            matched = [term for term in terms if term in text]
+            if terms and not matched and event['type'] != 'summary':
+                continue
+            # seq follows time order, so it breaks score ties newest first
+            ranked.append((len(matched), seq, matched, event))
+
+        if limit is not None:
+            top = heapq.nlargest(limit, ranked, key=lambda item: (item[0], item[1]))
+        else:
+            top = sorted(ranked, key=lambda item: (item[0], item[1]), reverse=True)
+
+        results = []
+        for score, _, matched, event in top:
+            result = self.public_event(event)
+            result['match_score'] = score
+            result['matched_words'] = matched
+            results.append(result)
+        return results
+
+    @staticmethod
+    def public_event(event: Dict) -> Dict:
+        """Event without internal fields, for JSON responses"""
+        return {k: v for k, v in event.items() if k != '_dt'}
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+tracing.py
+Per-stage timing spans for the frame-to-summary path
+
+A trace is opened around one unit of work (one camera in a capture cycle)
+with `TRACER.trace(...)`; code it calls marks stages with `span(...)`. The
+open trace is thread-local, so callees deep in the summarizer add spans
+without it being passed around, and `span()` outside a trace is a no-op.
+
+Finished traces are kept in a ring buffer when they were sampled
+(`sample_rate`) or ran longer than `slow_threshold`, so every slow summary
+is kept however low the sample rate. Traces are exported as JSON (with the
+critical path: the slowest child at every level) or as Chrome trace events
+for chrome://tracing / Perfetto.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+_local = threading.local()
+
+
+class Trace:
+    """Spans of one traced unit of work, all on one thread"""
+
+    __slots__ = ('name', 'attrs', 'started_at', 'start', 'spans', 'stack', 'duration_ms', 'thread_id', 'sampled')
+
+    def __init__(self, name: str, attrs: Dict, sampled: bool):
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.stack: List[int] = []
+        self.duration_ms = None
+        self.thread_id = threading.get_ident()
+        self.sampled = sampled
+
+    def open(self, name: str, attrs: Dict) -> int:
+        self.spans.append({
+            'name': name,
+            'start_ms': (time.perf_counter() - self.start) * 1000,
+            'duration_ms': None,
+            'parent': self.stack[-1] if self.stack else None,
+            'attrs': attrs,
+        })
+        index = len(self.spans) - 1
+        self.stack.append(index)
+        return index
+
+    def close(self, index: int):
+        span = self.spans[index]
+        span['duration_ms'] = (time.perf_counter() - self.start) * 1000 - span['start_ms']
+        self.stack.pop()
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+    def critical_path(self) -> List[Dict]:
+        """The slowest span at each nesting level, from the root down"""
+        path = []
+        parent = None
+        while True:
+            children = [index for index, span in enumerate(self.spans) if span['parent'] == parent]
+            if not children:
+                return path
+            parent = max(children, key=lambda index: self.spans[index]['duration_ms'] or 0)
+            slowest = self.spans[parent]
+            path.append({
+                'name': slowest['name'],
+                'duration_ms': round(slowest['duration_ms'] or 0, 3),
+                'attrs': slowest['attrs'],
+            })
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'attrs': self.attrs,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'timestamp': self.started_at,
+            'pid': os.getpid(),
+            'thread_id': self.thread_id,
+            'duration_ms': round(self.duration_ms, 3),
+            'sampled': self.sampled,
+            'critical_path': self.critical_path(),
+            'spans': [{
+                'name': span['name'],
+                'start_ms': round(span['start_ms'], 3),
+                'duration_ms': round(span['duration_ms'], 3) if span['duration_ms'] is not None else None,
+                'parent': span['parent'],
+                'attrs': span['attrs'],
+            } for span in self.spans],
+        }
+
+
+class Tracer:
+    """Starts traces and keeps the recent sampled or slow ones"""
+
+    def __init__(self, capacity: int = 200, sample_rate: float = 0.1, slow_threshold: float = 30.0):
+        """
+        Initialize tracer
+
+        Args:
+            capacity: Finished traces kept (oldest dropped first)
+            sample_rate: Fraction of traces kept regardless of duration
+            slow_threshold: Traces at least this many seconds long are always kept
+        """
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.traces = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.kept = 0
+        self.discarded = 0
+
+    @contextmanager
+    def trace(self, name: str, **attrs):
+        """Open a trace on this thread (a span if one is already open)"""
+        if getattr(_local, 'trace', None) is not None:
+            with span(name, **attrs):
+                yield
+            return
+
+        trace = Trace(name, attrs, random.random() < self.sample_rate)
+        _local.trace = trace
+        try:
+            yield trace
+        finally:
+            _local.trace = None
+            trace.finish()
+            with self.lock:
+                if trace.sampled or trace.duration_ms >= self.slow_threshold * 1000:
+                    self.traces.append(trace)
+                    self.kept += 1
+                else:
+                    self.discarded += 1
+
+    def recent(self) -> List[Dict]:
+        """Kept traces as dicts, newest first"""
+        with self.lock:
+            traces = list(self.traces)
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'sample_rate': self.sample_rate,
+                'slow_threshold_seconds': self.slow_threshold,
+                'capacity': self.traces.maxlen,
+                'buffered': len(self.traces),
+                'kept': self.kept,
+                'discarded': self.discarded,
+            }
+
+
+TRACER = Tracer()
+
+
+def filter_traces(traces: List[Dict], limit: int = 50, min_duration_ms: float = 0,
+                  camera_id: int = None) -> List[Dict]:
+    """Traces (as returned by Tracer.recent) of at least min_duration_ms, optionally for one camera"""
+    result = []
+    for trace in traces:
+        if trace['duration_ms'] < min_duration_ms:
+            continue
+        if camera_id is not None and trace['attrs'].get('camera_id') != camera_id:
+            continue
+        result.append(trace)
+        if len(result) == limit:
+            break
+    return result
+
+
+def chrome_trace(traces: List[Dict]) -> Dict:
+    """Chrome trace-event JSON of trace dicts (load in chrome://tracing or ui.perfetto.dev)"""
+    events = []
+    for trace in traces:
+        base_us = trace['timestamp'] * 1e6
+        common = {'ph': 'X', 'pid': trace['pid'], 'tid': trace['thread_id']}
+        events.append(dict(common, name=trace['name'], ts=base_us, dur=trace['duration_ms'] * 1000,
+                           args=trace['attrs']))
+        for span in trace['spans']:
+            events.append(dict(common, name=span['name'], ts=base_us + span['start_ms'] * 1000,
+                               dur=(span['duration_ms'] or 0) * 1000, args=span['attrs']))
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage of the trace open on this thread (no-op without one)"""
+    trace: Optional[Trace] = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    index = trace.open(name, attrs)
+    try:
+        yield
+    finally:
+        trace.close(index)
+
+
+def annotate(**attrs):
+    """Add attributes to the trace open on this thread"""
+    trace = getattr(_local, 'trace', None)
+    if trace is not None:
+        trace.attrs.update(attrs)
+
+
+@contextmanager
+def traced_lock(lock, name: str = 'lock_wait'):
+    """Hold a lock, with the time spent waiting for it recorded as a span"""
+    with span(name):
+        lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
@@ -12,11 +12,16 @@ import threading
 import time
 from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Tuple
 import base64
 from io import BytesIO
 import requests
 
+from memory_report import frame_buffers_usage
+from metrics import FRAME_BUFFER_DEPTH, SUMMARIES_GENERATED, record_llm_request
+from summary_store import SummaryLogStore, SummaryWindow
+from summary_analytics import STRUCTURED_PROMPT, parse_structured_summary
+
 try:
     from openai import OpenAI
     OPENAI_AVAILABLE = True
@@ -37,18 +42,22 @@ class VideoSummarizer:
         'hour': 3600
     }
     
-    def __init__(self, hls_dir: str, output_dir: str = None):
+    def __init__(self, hls_dir: str, output_dir: str = None, summary_window_size: int = 100):
         """
         Initialize video summarizer
         
         Args:
             hls_dir: Directory containing HLS streams
             output_dir: Directory to save summaries (default: hls_dir/summaries)
+            summary_window_size: Recent summaries kept in memory per camera and interval
         """
         self.hls_dir = hls_dir
         self.output_dir = output_dir or os.path.join(hls_dir, 'summaries')
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # Append-only per-camera summary log
+        self.store = SummaryLogStore(self.output_dir)
+        
         # Setup OpenAI client if available
         self.client = None
         self.api_key = os.getenv('OPENAI_API_KEY')
@@ -65,14 +74,8 @@ class VideoSummarizer:
             'hour': []
         })
         
-        # Storage for generated summaries
-        self.summaries: Dict[int, Dict[str, List]] = defaultdict(lambda: {
-            'minute': [],
-            '5_minutes': [],
-            '10_minutes': [],
-            '30_minutes': [],
-            'hour': []
-        })
+        # Bounded window of recent summaries, warm-started from the summary log
+        self.summaries = SummaryWindow(self.INTERVALS.keys(), self.store, max_items=summary_window_size)
         
         # Last summary generation times
         self.last_summary_times: Dict[int, Dict[str, float]] = defaultdict(lambda: {
@@ -84,6 +87,9 @@ class VideoSummarizer:
         })
         
         self.lock = threading.Lock()
+        
+        # Callables invoked as listener(camera_id, summary) after a summary is saved
+        self.summary_listeners: List[Callable[[int, Dict], None]] = []
     
     def frame_to_base64(self, frame) -> str:
         """Convert OpenCV frame to base64 string for API submission"""
@@ -109,7 +115,7 @@ class VideoSummarizer:
             print(f"Error capturing frame from {segment_path}: {e}")
             return False, None
     
-    def analyze_frames_with_llm(self, frames: List, camera_id: int, interval: str) -> str:
+    def analyze_frames_with_llm(self, frames: List, camera_id: int, interval: str, structured_out: Dict = None) -> str:
         """
         Use LLM to analyze captured frames and generate summary
         
@@ -117,6 +123,7 @@ class VideoSummarizer:
             frames: List of frames to analyze
             camera_id: ID of the camera
             interval: Time interval ('minute', '5_minutes', etc)
+            structured_out: Optional dict that receives counts, object classes and activity level
         
         Returns:
             Summary text from LLM
@@ -146,24 +153,35 @@ Provide a concise summary including:
 4. Any anomalies or notable changes
 5. Overall scene description
 
-Keep it concise and factual."""
+Keep it concise and factual.
+
+{STRUCTURED_PROMPT}"""
             
             # Call GPT-4V (gpt-4-turbo with vision)
-            response = self.client.messages.create(
-                model="gpt-4-turbo",
-                max_tokens=500,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            *frame_descriptions
-                        ]
-                    }
-                ]
-            )
+            started = time.time()
+            ok = False
+            try:
+                response = self.client.messages.create(
+                    model="gpt-4-turbo",
+                    max_tokens=500,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": prompt},
+                                *frame_descriptions
+                            ]
+                        }
+                    ]
+                )
+                ok = True
+            finally:
+                record_llm_request('openai', camera_id, interval, 'summary', started, ok)
             
-            return response.content[0].text
+            summary_text, structured = parse_structured_summary(response.content[0].text)
+            if structured and structured_out is not None:
+                structured_out.update(structured)
+            return summary_text
         
         except Exception as e:
             return f"LLM Analysis Error: {str(e)}"
@@ -187,6 +205,25 @@ Keep it concise and factual."""
                     'frame': frame,
                     'timestamp': timestamp
                 })
+                FRAME_BUFFER_DEPTH.labels('openai', camera_id, interval).set(
+                    len(self.frame_buffers[camera_id][interval]))
+    
+    def drop_frames(self, camera_id: int):
+        """Discard the buffered frames of a camera removed from the configuration"""
+        with self.lock:
+            self.frame_buffers.pop(camera_id, None)
+        for interval in self.INTERVALS:
+            FRAME_BUFFER_DEPTH.remove('openai', camera_id, interval)
+    
+    def memory_usage(self) -> Dict:
+        """Frames held in the interval buffers and the summary window (polled by /api/debug/memory)"""
+        buffers = frame_buffers_usage(self.frame_buffers)
+        summaries = self.summaries.memory_usage()
+        return {
+            'bytes': buffers['bytes'] + summaries['approx_bytes'],
+            'frame_buffers': buffers,
+            'summaries': summaries,
+        }
     
     def should_generate_summary(self, camera_id: int, interval: str) -> bool:
         """Check if it's time to generate summary for this interval"""
@@ -225,7 +262,8 @@ Keep it concise and factual."""
                 sample_frames.append(frames_data[i]['frame'])
             
             # Generate LLM summary
-            llm_summary = self.analyze_frames_with_llm(sample_frames, camera_id, interval)
+            structured = {}
+            llm_summary = self.analyze_frames_with_llm(sample_frames, camera_id, interval, structured)
             
             # Create summary record
             summary_record = {
@@ -235,18 +273,21 @@ Keep it concise and factual."""
                 'interval': interval,
                 'frames_analyzed': len(frames_data),
                 'summary': llm_summary,
+                'structured': structured or None,
                 'start_time': frames_data[0]['timestamp'].isoformat() if frames_data else None,
                 'end_time': frames_data[-1]['timestamp'].isoformat() if frames_data else None,
             }
             
             # Store summary
-            self.summaries[camera_id][interval].append(summary_record)
+            self.summaries.append(camera_id, interval, summary_record)
             
             # Update last generation time
             self.last_summary_times[camera_id][interval] = time.time()
             
             # Clear frame buffer for this interval
             self.frame_buffers[camera_id][interval] = []
+            FRAME_BUFFER_DEPTH.labels('openai', camera_id, interval).set(0)
+            SUMMARIES_GENERATED.labels('openai', camera_id, interval).inc()
             
             # Save to file
             self.save_summary(camera_id, interval, summary_record)
@@ -254,36 +295,51 @@ Keep it concise and factual."""
             return summary_record
     
     def save_summary(self, camera_id: int, interval: str, summary: Dict):
-        """Save summary to file"""
+        """Append summary to the per-camera summary log"""
         try:
-            summary_dir = os.path.join(self.output_dir, f'camera_{camera_id}')
-            os.makedirs(summary_dir, exist_ok=True)
-            
-            filename = os.path.join(
-                summary_dir,
-                f"{interval}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            )
-            
-            with open(filename, 'w') as f:
-                json.dump(summary, f, indent=2)
+            filename = self.store.append(camera_id, interval, summary)
             
             print(f"✓ Saved {interval} summary for camera {camera_id}: {filename}")
         
         except Exception as e:
             print(f"Error saving summary: {e}")
+        
+        for listener in self.summary_listeners:
+            try:
+                listener(camera_id, summary)
+            except Exception as e:
+                print(f"Error in summary listener: {e}")
     
     def get_all_summaries(self, camera_id: int = None) -> Dict:
-        """Get all generated summaries"""
-        with self.lock:
-            if camera_id is not None:
-                return self.summaries.get(camera_id, {})
-            return dict(self.summaries)
+        """
+        Get recent summaries held in the in-memory window
+        
+        Returns an immutable snapshot (tuples per interval) that is safe to
+        serialize without holding any lock while new summaries are appended
+        """
+        if camera_id is not None:
+            summaries = self.summaries.snapshot(camera_id)
+            return summaries if any(summaries.values()) else {}
+        return self.summaries.snapshot()
+    
+    def get_summaries_page(self, camera_id: int = None, interval: str = None, after_key: tuple = None,
+                           limit: int = 100) -> List[Dict]:
+        """
+        Get summaries oldest first, strictly after a cursor key (see summary_store.encode_cursor),
+        or the newest `limit` summaries when no cursor is given
+        """
+        camera_ids = [camera_id] if camera_id is not None else None
+        intervals = [interval] if interval else None
+        return self.summaries.page(after_key, camera_ids, intervals, limit)
+    
+    def get_summary_history(self, camera_id: int, start_time: datetime = None, end_time: datetime = None,
+                            interval: str = None) -> List[Dict]:
+        """Get summaries in a time range from the persisted summary log"""
+        return [summary for _, summary in self.store.query(camera_id, start_time, end_time, interval)]
     
     def get_latest_summary(self, camera_id: int, interval: str) -> Dict:
         """Get the most recent summary for a camera and interval"""
-        with self.lock:
-            summaries = self.summaries[camera_id][interval]
-            return summaries[-1] if summaries else None
+        return self.summaries.latest(camera_id, interval)
     
     def export_summaries_report(self, camera_id: int = None) -> str:
         """Generate a text report of all summaries"""
@@ -295,8 +351,8 @@ Keep it concise and factual."""
             ""
         ]
         
-        with self.lock:
-            summaries_data = self.summaries.get(camera_id) if camera_id else self.summaries
+        with self.summaries.lock:
+            summaries_data = self.summaries.snapshot(camera_id) if camera_id else self.summaries.snapshot()
             
             if isinstance(summaries_data, dict) and 'minute' in summaries_data:
                 # Single camera
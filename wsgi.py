@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+wsgi.py
+Production entry point for camera_server
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Services (ffmpeg streams, summarizers, frame capture) are started when the
+worker imports this module instead of on the first request; the startup
+lock in camera_server makes sure only one worker runs them.
+"""
+
+from camera_server import app, start_services
+
+start_services()